@@ -15,6 +15,13 @@ class Arm:
 			if isinstance(link, Link):
 				self.control_links.append(link)
 
+		#Link parameters as arrays, for batch forward kinematics. Entries of link_angles for controllable links are placeholders.
+		self.link_lengths = np.array([link.length for link in self.links], dtype=float)
+		self.link_angles = np.array([0.0 if isinstance(link, Link) else link.angle for link in self.links], dtype=float)
+		self.control_idx = np.array([i for i, link in enumerate(self.links) if isinstance(link, Link)], dtype=int)
+		self.joint_min = np.array([link.min_angle for link in self.control_links], dtype=float)
+		self.joint_max = np.array([link.max_angle for link in self.control_links], dtype=float)
+
 	def set_joint_space(self, angles):
 		"""
 		Sets the joints of the arm (from bottom to top) to the angles specified in the argument. Note that the number of angles must equal the number of joints in the arm.
@@ -107,6 +114,38 @@ class Arm:
 		"""
 		return self.get_joint_poses_from(angles)[-1]
 
+	def get_joint_poses_batch(self, angles):
+		"""
+		Vectorized forward kinematics for many joint configurations at once. Unlike get_joint_poses_from, this does not modify the arm's links.
+
+		Args:
+			angles: A (N, dof) array of joint angles, one configuration per row. Angles are clipped to the joint limits, as in set_joint_space.
+
+		Returns:
+			A (N, n+1, 3) numpy array where the i-th entry is the result of get_joint_poses_from for the i-th configuration.
+		"""
+		angles = np.atleast_2d(np.asarray(angles, dtype=float))
+		th = np.tile(self.link_angles, (angles.shape[0], 1))
+		th[:, self.control_idx] = np.clip(angles, self.joint_min, self.joint_max)
+		th = np.cumsum(th, axis=1)
+		poses = np.zeros((angles.shape[0], len(self.links) + 1, 3))
+		poses[:, 1:, 0] = np.cumsum(self.link_lengths * cos(th), axis=1)
+		poses[:, 1:, 1] = np.cumsum(self.link_lengths * sin(th), axis=1)
+		poses[:, 1:, 2] = th
+		return poses
+
+	def get_end_effector_poses_batch(self, angles):
+		"""
+		Vectorized version of get_end_effector_pose_from.
+
+		Args:
+			angles: A (N, dof) array of joint angles, one configuration per row.
+
+		Returns:
+			A (N, 3) numpy array of end-effector poses (x, y, theta).
+		"""
+		return self.get_joint_poses_batch(angles)[:, -1]
+
 	def __repr__(self):
 		out = ''
 		for link in self.links:
@@ -0,0 +1,53 @@
+"""
+Benchmarks the exact MDP solvers on the bundled mazes.
+
+Solves every maze in mazes/ (deterministic and slippery) with value iteration (Jacobi, Gauss-Seidel and prioritized sweeps,
+stopping at --tol) and policy iteration (direct and iterative linear solves). Reports iterations, backups, wall time
+and the largest difference from the policy iteration V.
+
+Usage:
+	python benchmark.py
+	python benchmark.py --discounts 0.95 0.97 --slip_chance 0.2
+"""
+import argparse
+import contextlib
+import io
+import os
+import numpy as np
+
+from env import Env
+from slippery_env import SlipperyEnv
+from value_iteration import ValueEstimation, PolicyIteration
+
+def load(fp, slip_chance):
+	with contextlib.redirect_stdout(io.StringIO()): #load_from_fp prints the maze.
+		if slip_chance:
+			return SlipperyEnv(fp = fp, slip_chance = slip_chance)
+		return Env(fp = fp)
+
+def main():
+	parser = argparse.ArgumentParser(description='Benchmark the MDP solvers')
+	parser.add_argument('--maze_dir', type=str, default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mazes'), help='directory of maze files')
+	parser.add_argument('--discounts', type=float, nargs='+', default=[0.95, 0.97], help='discount factors')
+	parser.add_argument('--slip_chance', type=float, default=0.1, help='slip chance for the slippery runs')
+	parser.add_argument('--tol', type=float, default=1e-8, help='value iteration stopping tolerance')
+	parser.add_argument('--max_itrs', type=int, default=100000, help='most value iteration sweeps')
+	args = parser.parse_args()
+
+	for name in sorted(os.listdir(args.maze_dir)):
+		for slip_chance in (0.0, args.slip_chance):
+			env = load(os.path.join(args.maze_dir, name), slip_chance)
+			for discount in args.discounts:
+				print('{} {}x{} slip = {} discount = {}'.format(name, env.n, env.m, slip_chance, discount))
+				Q, V_pi, stats = PolicyIteration.policy_iteration(env, discount = discount, return_stats = True)
+				runs = [('policy iteration (direct)', V_pi, stats)]
+				Q, V, stats = PolicyIteration.policy_iteration(env, discount = discount, solver = 'iterative', return_stats = True)
+				runs.append(('policy iteration (iterative)', V, stats))
+				for sweep in ('jacobi', 'gauss_seidel', 'prioritized'):
+					V, stats = ValueEstimation.compute_V(env, None, discount, args.max_itrs, exact = True, tol = args.tol, sweep = sweep, return_stats = True)
+					runs.append(('value iteration ({})'.format(sweep), V, stats))
+				for label, V, stats in runs:
+					print('  {:<30} iterations = {:<7} backups = {:<8} time = {:8.4f}s  max |V - V_pi| = {:.1e}'.format(label, stats.iterations, stats.backups, stats.time_total, np.abs(V - V_pi).max()))
+
+if __name__ == '__main__':
+	main()
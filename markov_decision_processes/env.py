@@ -89,6 +89,14 @@ class Env:
 
 		return s_new, reward, terminal, {'prob':1.0}
 
+	def transition_outcomes(self, action):
+		"""
+		Exact version of step_from's randomness: every move taking action can result in, as a list of (probability, move) pairs.
+		The cell reached is state + move, clipped to the grid as in step_from.
+		"""
+		assert action in self.action_map, 'invalid action {}'.format(action)
+		return [(1.0, self.action_map[action])]
+
 	@property
 	def action_space(self):
 		return np.zeros(len(self.action_map.keys()))
@@ -109,6 +117,22 @@ class Env:
 		else:
 			return np.zeros(1)
 
+	def reward_map(self):
+		"""
+		reward_from for every cell, as an (n, m) array.
+		"""
+		rew = np.where(self.obstacles == 1, -10.0, 0.0)
+		rew[self.goal[0], self.goal[1]] = 10.0
+		return rew
+
+	def terminal_map(self):
+		"""
+		terminal_from for every cell, as an (n, m) boolean array.
+		"""
+		term = self.obstacles == 1
+		term[self.goal[0], self.goal[1]] = True
+		return term
+
 	@property
 	def terminal(self):
 		t_term = self.steps >= self.max_steps
@@ -5,7 +5,7 @@ import subprocess
 import argparse
 
 from policies import ArgmaxQPolicy
-from value_iteration import ValueIteration
+from value_iteration import ValueIteration, print_progress
 from env import Env
 from slippery_env import SlipperyEnv
 
@@ -20,6 +20,7 @@ parser.add_argument('--max_steps', type=int, required=False, default=100, help='
 parser.add_argument('--discount', type=float, required=False, default=0.95, help='the discount factor for the env')
 parser.add_argument('--itrs', type=int, required=False, default=100, help='the amount of iterations of value iteration')
 parser.add_argument('--samples', type=int, required=False, default=50, help='the number of state tranisitions to sample at each state for value iteration')
+parser.add_argument('--show_values', action='store_true', help='show the solved values and policy before making the videos')
 
 args = parser.parse_args()
 
@@ -34,7 +35,10 @@ policy = ArgmaxQPolicy(env)
 
 
 print('running value iteration...')
-ValueIteration.value_iteration(env, policy, discount = args.discount, v_itrs=args.itrs, n_samples=args.samples)
+Q, V, stats = ValueIteration.value_iteration(env, policy, discount = args.discount, v_itrs=args.itrs, n_samples=args.samples, progress = print_progress)
+print(stats)
+if args.show_values:
+	ValueIteration.render(env, policy, V)
 
 for run in range(args.n_runs):
 	subprocess.call(['mkdir', 'tmp'])
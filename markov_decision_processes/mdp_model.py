@@ -0,0 +1,101 @@
+import hashlib
+import numpy as np
+from scipy.sparse import csr_matrix, vstack
+
+class MDPModel:
+	"""
+	Explicit transition model of a gridworld Env, compiled once and shared by the solvers.
+
+	States are the grid cells, numbered s = i * m + j (the order of V.ravel() for an (n, m) V).
+	P[a] is a scipy.sparse CSR matrix of shape (S, S) with P[a][s, s'] the probability that action a moves s to s',
+	so memory grows linearly with the number of cells. R[s'] and T[s'] are the reward and terminal flag of arriving in s'
+	(reward_from and terminal_from, which only depend on the cell reached).
+	"""
+	def __init__(self, env):
+		"""
+		Compiles env's obstacles, goal, action_map, clipping and transition_outcomes (e.g. SlipperyEnv's slip) into P, R and T.
+		"""
+		self.n = env.n
+		self.m = env.m
+		self.n_states = env.n * env.m
+		self.n_acts = env.action_space.shape[0]
+
+		I, J = np.indices((env.n, env.m))
+		src = np.arange(self.n_states)
+		self.P = []
+		for a in range(self.n_acts):
+			outcomes = env.transition_outcomes(a)
+			rows = np.concatenate([src] * len(outcomes))
+			cols = np.concatenate([(np.clip(I + act[0], 0, env.n-1) * env.m + np.clip(J + act[1], 0, env.m-1)).ravel() for _, act in outcomes])
+			data = np.concatenate([np.full(self.n_states, prob, dtype=float) for prob, _ in outcomes])
+			self.P.append(csr_matrix((data, (rows, cols)), shape = (self.n_states, self.n_states))) #Outcomes clipped to the same cell are summed.
+
+		self.R = env.reward_map().ravel().astype(float)
+		self.T = env.terminal_map().ravel()
+		self.P_stacked = None #All P[a] stacked vertically, built on first use by policy_matrix.
+
+	def index(self, state):
+		"""
+		State number of the [i, j] cell state.
+		"""
+		return int(state[0]) * self.m + int(state[1])
+
+	def cell(self, s):
+		"""
+		[i, j] cell of state number s.
+		"""
+		return np.array(divmod(int(s), self.m))
+
+	def Q(self, V, discount):
+		"""
+		Expected value of every action from every state, E[R(s') + discount * V(s') * (1 - T(s'))], as an (S, A) array.
+		V is a length S vector (or an (n, m) grid).
+		"""
+		target = self.R + discount * np.ravel(V) * ~self.T
+		return np.stack([P_a @ target for P_a in self.P], axis=1)
+
+	def policy_matrix(self, actions, states = None):
+		"""
+		Transition rows of a deterministic policy: row k is P[actions[s]][s] for the k-th of states (default all states).
+		Returns a CSR matrix of shape (len(states), S).
+		"""
+		if self.P_stacked is None:
+			self.P_stacked = vstack(self.P, format = 'csr')
+		if states is None:
+			states = np.arange(self.n_states)
+		return self.P_stacked[np.asarray(actions)[states] * self.n_states + states]
+
+	def sample(self, s, a, rng = np.random):
+		"""
+		Samples the next state number after taking action a in state number s, e.g. for rollouts.
+		"""
+		P_a = self.P[a]
+		lo, hi = P_a.indptr[s], P_a.indptr[s + 1]
+		return int(rng.choice(P_a.indices[lo:hi], p = P_a.data[lo:hi]))
+
+def model_hash(env):
+	"""
+	Hex digest identifying everything MDPModel compiles from env: grid size, obstacles, goal and each action's outcomes.
+	"""
+	h = hashlib.sha1()
+	h.update(np.ascontiguousarray(env.obstacles, dtype=np.int8).tobytes())
+	h.update(repr((env.n, env.m, np.asarray(env.goal).tolist())).encode())
+	for a in range(env.action_space.shape[0]):
+		h.update(repr([(float(prob), np.asarray(act).tolist()) for prob, act in env.transition_outcomes(a)]).encode())
+	return h.hexdigest()
+
+_models = {}
+
+def compile_model(env, max_cached = 8):
+	"""
+	Returns the MDPModel of env, reusing a cached one if a model with the same model_hash was compiled before.
+	At most max_cached models are kept; the oldest is dropped first.
+	"""
+	key = model_hash(env)
+	model = _models.pop(key, None)
+	if model is None:
+		model = MDPModel(env)
+	_models[key] = model #Most recently used last.
+	while len(_models) > max_cached:
+		del _models[next(iter(_models))]
+	return model
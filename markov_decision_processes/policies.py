@@ -104,10 +104,14 @@ class TabularPolicy(Policy):
 		return self.policy[obs[0], obs[1]]
 
 if __name__ == '__main__':
+	from value_iteration import ValueIteration, print_progress
+
 	n = 20
-	env = Env(n=n, max_steps = 2 * n)
+	env = Env(n=n, m=n, max_steps = 2 * n)
 	policy = ArgmaxQPolicy(env)
 	env.obstacles = np.random.choice(2, size = (n, n), p = [0.75, 0.25])
 	o = env.reset()
 
-	ValueIteration.value_iteration(env, policy, discount = 0.97, n_itrs = 100)
+	Q, V, stats = ValueIteration.value_iteration(env, policy, discount = 0.97, v_itrs = 100, n_samples = 10, exact = True, progress = print_progress)
+	print(stats)
+	ValueIteration.render(env, policy, V)
@@ -47,3 +47,21 @@ class SlipperyEnv(Env):
 		term = self.terminal_from(s_new)
 
 		return s_new, rew, term, {'prob':prob}
+
+	def transition_outcomes(self, action):
+		"""
+		The intended move with probability 1 - slip_chance, and each perpendicular move with probability slip_chance/2, as step_from samples them.
+		"""
+		assert action in self.action_map, 'invalid action {}'.format(action)
+		old_act = self.action_map[action]
+
+		if action == 4:
+			return super().transition_outcomes(action)
+
+		outcomes = [(1 - self.slip_chance, old_act)]
+		maxidx = np.argmax(np.abs(old_act))
+		for slip in (1, -1):
+			act = old_act + slip
+			act[maxidx] = 0
+			outcomes.append((self.slip_chance/2, act))
+		return outcomes
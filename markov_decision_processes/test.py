@@ -4,7 +4,7 @@ from env import Env
 from slippery_env import SlipperyEnv
 
 from policies import ArgmaxQPolicy
-from value_iteration import ValueIteration
+from value_iteration import ValueIteration, print_progress
 
 
 n = 15
@@ -31,4 +31,5 @@ env.goal = np.array([2, 2])
 
 env.obstacles[1, 1] = 1
 
-ValueIteration.value_iteration(env, policy, discount = 0.97, v_itrs=50, n_samples=100)
+Q, V, stats = ValueIteration.value_iteration(env, policy, discount = 0.97, v_itrs=50, n_samples=100, progress = print_progress)
+ValueIteration.render(env, policy, V)
@@ -0,0 +1,87 @@
+import random
+import numpy as np
+import pytest
+
+from env import Env
+from slippery_env import SlipperyEnv
+from mdp_model import MDPModel, compile_model, model_hash
+from test_value_iteration import make_env
+
+def test_deterministic_model_matches_env():
+	env = make_env(Env, 6, 4, 0)
+	model = MDPModel(env)
+	for s in range(model.n_states):
+		state = model.cell(s)
+		assert model.index(state) == s
+		for a in range(model.n_acts):
+			s_new, r, t, _ = env.step_from(a, state.copy())
+			row = model.P[a][s].toarray().ravel()
+			assert row[model.index(s_new)] == 1.0 and row.sum() == 1.0
+			s_new = model.index(s_new)
+			assert model.R[s_new] == float(r[0])
+			assert model.T[s_new] == t
+
+@pytest.mark.parametrize('slip_chance', [0.0, 0.2, 0.5])
+def test_slippery_model_matches_sampling(slip_chance):
+	env = make_env(SlipperyEnv, 5, 5, 1, slip_chance = slip_chance)
+	model = MDPModel(env)
+	for P_a in model.P:
+		assert np.allclose(np.asarray(P_a.sum(axis=1)).ravel(), 1.0)
+
+	# Corner and edge cells, where slips clipped to the same cell are merged.
+	random.seed(0)
+	for state in ([0, 0], [0, 2], [4, 4], [2, 2]):
+		s = model.index(state)
+		for a in range(model.n_acts):
+			counts = np.zeros(model.n_states)
+			for _ in range(4000):
+				counts[model.index(env.step_from(a, np.array(state))[0])] += 1
+			assert np.allclose(counts / 4000, model.P[a][s].toarray().ravel(), atol = 0.03)
+
+def test_q_and_policy_matrix():
+	env = make_env(SlipperyEnv, 5, 6, 2)
+	model = MDPModel(env)
+	V = np.random.RandomState(3).random_sample(model.n_states)
+	Q = model.Q(V, 0.9)
+	target = model.R + 0.9 * V * ~model.T
+	for a in range(model.n_acts):
+		assert np.allclose(Q[:, a], model.P[a].toarray() @ target)
+
+	actions = np.random.RandomState(4).randint(model.n_acts, size = model.n_states)
+	P_pi = model.policy_matrix(actions).toarray()
+	for s in range(model.n_states):
+		assert np.array_equal(P_pi[s], model.P[actions[s]][s].toarray().ravel())
+	states = np.array([3, 0, 7])
+	assert np.array_equal(model.policy_matrix(actions, states).toarray(), P_pi[states])
+
+def test_sample():
+	env = make_env(SlipperyEnv, 4, 4, 5)
+	model = MDPModel(env)
+	rng = np.random.RandomState(6)
+	s = model.index([1, 1])
+	reachable = set(model.P[0][s].indices.tolist())
+	assert {model.sample(s, 0, rng) for _ in range(200)} == reachable
+
+def test_compile_model_cache():
+	env = make_env(SlipperyEnv, 5, 5, 7)
+	model = compile_model(env)
+	same = make_env(SlipperyEnv, 5, 5, 7)
+	assert model_hash(same) == model_hash(env)
+	assert compile_model(same) is model
+
+	# Anything the model depends on changes the hash.
+	for change in ('obstacles', 'goal', 'slip'):
+		other = make_env(SlipperyEnv, 5, 5, 7)
+		if change == 'obstacles':
+			other.obstacles[0, 0] = 1 - other.obstacles[0, 0]
+		elif change == 'goal':
+			other.goal = (other.goal + 1) % 5
+		else:
+			other.slip_chance = 0.3
+		assert model_hash(other) != model_hash(env)
+		assert compile_model(other) is not model
+
+	# The least recently used model is dropped.
+	for seed in range(10, 20):
+		compile_model(make_env(Env, 3, 3, seed), max_cached = 2)
+	assert compile_model(env) is not model
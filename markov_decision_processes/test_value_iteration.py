@@ -0,0 +1,77 @@
+import sys
+import numpy as np
+import pytest
+
+from env import Env
+from slippery_env import SlipperyEnv
+from mdp_model import compile_model
+from policies import ArgmaxQPolicy, TabularPolicy
+from value_iteration import ValueEstimation, ValueIteration, PolicyIteration
+
+def make_env(cls, n, m, seed, **kwargs):
+	rng = np.random.RandomState(seed)
+	env = cls(n, m, **kwargs)
+	env.obstacles = (rng.random_sample((n, m)) < 0.2).astype(int)
+	env.goal = np.array([rng.randint(n), rng.randint(m)])
+	env.obstacles[env.goal[0], env.goal[1]] = 0
+	return env
+
+ENVS = [(Env, 7, 5, 0, {}), (SlipperyEnv, 8, 8, 1, {'slip_chance': 0.2}), (SlipperyEnv, 12, 6, 2, {'slip_chance': 0.5})]
+
+def solve(env, discount, sweep = 'jacobi', tol = 1e-13):
+	return ValueEstimation.compute_V(env, None, discount, n_itrs = 5000, exact = True, tol = tol, sweep = sweep, return_stats = True)
+
+@pytest.mark.parametrize('cls, n, m, seed, kwargs', ENVS)
+def test_bellman_fixed_point(cls, n, m, seed, kwargs):
+	env = make_env(cls, n, m, seed, **kwargs)
+	V, stats = solve(env, 0.9)
+	assert stats.converged
+	model = compile_model(env)
+	backup = 0.9 * model.Q(V, 0.9).max(axis=1)
+	backup[model.T] = 0.0
+	assert np.allclose(backup, V.ravel(), atol = 1e-10)
+
+@pytest.mark.parametrize('cls, n, m, seed, kwargs', ENVS)
+def test_sweeps_agree(cls, n, m, seed, kwargs):
+	env = make_env(cls, n, m, seed, **kwargs)
+	V, stats = solve(env, 0.95)
+	gs_V, gs_stats = solve(env, 0.95, 'gauss_seidel')
+	p_V, p_stats = solve(env, 0.95, 'prioritized', tol = 1e-12)
+	assert gs_stats.converged and p_stats.converged
+	assert np.allclose(gs_V, V, atol = 1e-9)
+	assert np.allclose(p_V, V, atol = 1e-9)
+	assert gs_stats.iterations <= stats.iterations
+
+@pytest.mark.parametrize('solver', ['direct', 'iterative'])
+@pytest.mark.parametrize('cls, n, m, seed, kwargs', ENVS)
+def test_policy_iteration_matches_value_iteration(cls, n, m, seed, kwargs, solver):
+	env = make_env(cls, n, m, seed, **kwargs)
+	Q, V, stats = ValueEstimation.compute_Q(env, None, 0.95, n_itrs = 5000, exact = True, tol = 1e-14, return_stats = True)
+	assert stats.converged
+	policy = ArgmaxQPolicy(env)
+	pi_Q, pi_V, pi_stats = PolicyIteration.policy_iteration(env, policy, 0.95, solver = solver, return_stats = True)
+	assert pi_stats.converged
+	assert pi_V.shape == V.shape and pi_Q.shape == Q.shape
+	assert np.max(np.abs(pi_V - V)) < 1e-8
+	assert np.max(np.abs(pi_Q - Q)) < 1e-8
+	assert policy.Q is pi_Q
+
+	# Warm starting from the optimal greedy policy converges in one improvement step.
+	table = TabularPolicy(env)
+	table.policy = np.eye(Q.shape[2])[np.argmax(pi_Q, axis=2)]
+	_, warm_V, warm_stats = PolicyIteration.policy_iteration(env, table, 0.95, solver = solver, return_stats = True)
+	assert warm_stats.iterations == 1
+	assert np.max(np.abs(warm_V - pi_V)) < 1e-8
+
+def test_value_iteration_sets_policy(capsys):
+	env = make_env(SlipperyEnv, 6, 6, 3)
+	policy = ArgmaxQPolicy(env)
+	calls = []
+	Q, V, stats = ValueIteration.value_iteration(env, policy, 0.9, 2000, 0, exact = True, tol = 1e-12, progress = lambda itr, n_itrs, stats: calls.append(itr))
+	assert policy.Q is Q
+	for i in range(env.n):
+		for j in range(env.m):
+			assert V[i, j] == 0.0 or np.isclose(0.9 * Q[i, j].max(), V[i, j])
+	assert calls and calls[-1] == stats.iterations
+	assert capsys.readouterr().out == '' # Headless: progress only goes to the callback.
+	assert 'matplotlib.pyplot' not in sys.modules or not sys.modules['matplotlib.pyplot'].get_fignums()
@@ -1,15 +1,194 @@
+import heapq
+import time
 import numpy as np
-import matplotlib.pyplot as plt
+
+from scipy.sparse import identity
+from scipy.sparse.linalg import spsolve, bicgstab
+
+from mdp_model import compile_model
+
+class SolverStats:
+	"""
+	What a value estimation call cost.
+
+	Fields:
+		iterations: Sweeps over the grid (for prioritized sweeping, states popped off the priority queue).
+		backups: Single-state Bellman backups computed.
+		residual: Largest change to V in the last sweep (for prioritized sweeping, the largest residual left on the queue).
+		converged: Whether the residual fell to tol before the iteration limit.
+		time_total: Wall time in seconds.
+	"""
+	def __init__(self):
+		self.iterations = 0
+		self.backups = 0
+		self.residual = float('inf')
+		self.converged = False
+		self.time_total = 0.0
+
+	def as_dict(self):
+		return dict(vars(self))
+
+	def __repr__(self):
+		return 'iterations = {}, backups = {}, residual = {:.2e}, converged = {}, time = {:.4f}s'.format(self.iterations, self.backups, self.residual, self.converged, self.time_total)
+
+def print_progress(itr, n_itrs, stats):
+	"""
+	Progress callback for the solvers that prints the iteration count on one line, as the scripts used to.
+	"""
+	print('ITR {}/{}'.format(itr, n_itrs), end='\r')
 
 class ValueEstimation:
 	"""
 	Collection of functions for doing value estimation for gridworld MDPs.
 	"""
-	def compute_V(env, policy, discount = 1.0, n_itrs = 3, n_samples=10):
+	def transition_model(env):
+		"""
+		Compiled transition model of env (see mdp_model.MDPModel), shared with any other solver working on the same maze.
+		"""
+		return compile_model(env)
+
+	def exact_Q(model, V, discount):
+		"""
+		Expected value of each action from each cell under the transition model, E[r + discount * V(s') * (1 - t)], as an (n, m, A) array.
+		This is what the sampled estimates in compute_V and compute_Q average towards.
+		"""
+		return model.Q(V, discount).reshape(model.n, model.m, model.n_acts)
+
+	def exact_V(model, discount, n_itrs, tol = None, sweep = 'jacobi', stats = None, progress = None):
+		"""
+		Value iteration on a compiled model. Returns V as a length S vector.
+
+		Args:
+			model (MDPModel): The compiled model.
+			discount: Discount factor.
+			n_itrs: Most sweeps to run. Prioritized sweeping stops after n_itrs * S updates instead.
+			tol: Optional. Stop once no state's value changes by more than tol in a sweep. Prioritized sweeping defaults to 1e-6.
+			sweep: 'jacobi' backs every state up from the previous sweep's values in one expression. 'gauss_seidel' updates in place,
+				in red-black order: every move reaches a cell of the other color (or stays put), so each half sweep is a single
+				expression that already sees the other half's new values. 'prioritized' keeps a heap of Bellman residuals and
+				always backs up the state whose value is most out of date, then rechecks the states that can move into it.
+			stats (SolverStats): Optional. Filled in with iterations, backups and the final residual.
+			progress (function): Optional. Called as progress(itr, n_itrs, stats) after every sweep (once at the end for
+				prioritized sweeping), e.g. print_progress or a logging hook.
+		"""
+		assert sweep in ('jacobi', 'gauss_seidel', 'prioritized'), 'unknown sweep {}'.format(sweep)
+		if stats is None:
+			stats = SolverStats()
+		if sweep == 'prioritized':
+			V = ValueEstimation.prioritized_V(model, discount, n_itrs * model.n_states, 1e-6 if tol is None else tol, stats)
+			if progress is not None:
+				progress(stats.iterations, n_itrs * model.n_states, stats)
+			return V
+
+		V = np.zeros(model.n_states)
+		live = np.flatnonzero(~model.T) #Terminal states keep V = 0 and are never backed up.
+		if sweep == 'gauss_seidel':
+			even = (np.add(*np.indices((model.n, model.m))).ravel() % 2 == 0)[live]
+			parts = [live[even], live[~even]]
+		else:
+			parts = [live]
+		parts = [(idx, [P_a[idx] for P_a in model.P]) for idx in parts if len(idx)]
+
+		for itr in range(n_itrs):
+			residual = 0.0
+			for idx, P in parts:
+				target = model.R + discount * V * ~model.T
+				v = discount * np.max(np.stack([P_a @ target for P_a in P], axis=1), axis=1)
+				residual = max(residual, np.abs(v - V[idx]).max())
+				V[idx] = v
+			stats.iterations += 1
+			stats.backups += len(live)
+			stats.residual = residual
+			if progress is not None:
+				progress(itr + 1, n_itrs, stats)
+			if tol is not None and residual <= tol:
+				stats.converged = True
+				break
+		return V
+
+	def prioritized_V(model, discount, max_backups, tol, stats):
+		"""
+		Prioritized sweeping for exact_V. Each state whose residual |backup - V| exceeds tol is on a heap keyed on that residual.
+		Popping a state backs it up, and every state that can move into it gets its residual recomputed.
+		"""
+		P = model.P
+		pred = sum(P_a for P_a in P).T.tocsr() #pred[s] lists the states with some action reaching s.
+		pred_ptr = pred.indptr.tolist()
+		pred_idx = pred.indices.tolist()
+		terminal = model.T.tolist()
+		R = model.R.tolist()
+		#Single-state backups read a few entries at a time, which is faster on plain lists than on numpy arrays.
+		rows = [(P_a.indptr.tolist(), P_a.indices.tolist(), P_a.data.tolist()) for P_a in P]
+		V = [0.0] * model.n_states
+		target = list(R) #R + discount * V * (1 - T), kept current as V changes.
+
+		def backup(s):
+			best = -float('inf')
+			for indptr, indices, data in rows:
+				q = 0.0
+				for k in range(indptr[s], indptr[s + 1]):
+					q += data[k] * target[indices[k]]
+				if q > best:
+					best = q
+			return discount * best
+
+		live = np.flatnonzero(~model.T)
+		first = discount * np.max(np.stack([P_a[live] @ model.R for P_a in P], axis=1), axis=1)
+		priority = [0.0] * model.n_states
+		for s, v in zip(live.tolist(), np.abs(first).tolist()):
+			priority[s] = v
+		heap = [(-priority[s], s) for s in live.tolist() if priority[s] > tol]
+		heapq.heapify(heap)
+		pops = 0
+		backups = len(live)
+		while heap and backups < max_backups:
+			neg, s = heapq.heappop(heap)
+			if -neg != priority[s]:
+				continue #Stale entry, s was requeued with a new residual.
+			V[s] = backup(s)
+			target[s] = R[s] + discount * V[s]
+			priority[s] = 0.0
+			pops += 1
+			backups += 1
+			for p in pred_idx[pred_ptr[s]:pred_ptr[s + 1]]:
+				if terminal[p]:
+					continue
+				r = abs(backup(p) - V[p])
+				backups += 1
+				if r > tol:
+					if r != priority[p]:
+						priority[p] = r
+						heapq.heappush(heap, (-r, p))
+				else:
+					priority[p] = 0.0
+		stats.iterations += pops
+		stats.backups += backups
+		stats.residual = max((-neg for neg, s in heap if -neg == priority[s]), default = 0.0)
+		stats.converged = stats.residual <= tol
+		return np.array(V)
+
+	def compute_V(env, policy, discount = 1.0, n_itrs = 3, n_samples=10, exact = False, tol = None, sweep = 'jacobi', return_stats = False, progress = None):
+		"""
+		Estimates V(s) = discount * max_a E[r + discount * V(s')] with up to n_itrs sweeps over the grid (V = 0 at terminal cells).
+		By default each expectation is averaged from n_samples calls to env.step_from, updating cells in place in raster order.
+		With exact = True the expectations are computed exactly from the compiled transition model instead (see exact_V for
+		the sweep orders). With tol, sweeps stop once no value changes by more than tol.
+		Nothing is printed: pass progress (called as progress(itr, n_itrs, stats) after each sweep) to follow along.
+		If return_stats, returns (V, SolverStats).
+		"""
+		stats = SolverStats()
+		t0 = time.perf_counter()
+		if exact:
+			model = ValueEstimation.transition_model(env)
+			V = ValueEstimation.exact_V(model, discount, n_itrs, tol, sweep, stats, progress).reshape(env.n, env.m)
+			stats.time_total = time.perf_counter() - t0
+			return (V, stats) if return_stats else V
+
+		assert sweep == 'jacobi', 'sampled estimates only support the default sweep'
 		V = np.zeros((env.n, env.m))
 
 		for itr in range(n_itrs):
-			print('ITR {}/{}'.format(itr, n_itrs), end='\r')
+			V_old = V.copy()
 			for i in range(V.shape[0]):
 				for j in range(V.shape[1]):
 #					import pdb;pdb.set_trace()
@@ -25,15 +204,28 @@ class ValueEstimation:
 					V[i, j] = discount * (v_max / n_samples)
 					if env.terminal_from(state):
 						V[i, j] = 0.0
-					
+			stats.iterations += 1
+			stats.backups += V.size
+			stats.residual = np.abs(V - V_old).max()
+			if progress is not None:
+				progress(itr + 1, n_itrs, stats)
+			if tol is not None and stats.residual <= tol:
+				stats.converged = True
+				break
 
-		return V
+		stats.time_total = time.perf_counter() - t0
+		return (V, stats) if return_stats else V
 
-	def compute_Q(env, policy, discount, n_itrs = 3, n_samples=10):
+	def compute_Q(env, policy, discount, n_itrs = 3, n_samples=10, exact = False, tol = None, sweep = 'jacobi', return_stats = False, progress = None):
 		"""
 		Q(s, a) = r(s, a, s') + gamma * E[V(s')]
+		Other arguments as in compute_V. If return_stats, returns (Q, V, SolverStats).
 		"""	
-		V = ValueEstimation.compute_V(env, policy, discount, n_itrs, n_samples)
+		V, stats = ValueEstimation.compute_V(env, policy, discount, n_itrs, n_samples, exact, tol, sweep, return_stats = True, progress = progress)
+		if exact:
+			Q = ValueEstimation.exact_Q(ValueEstimation.transition_model(env), V, discount)
+			return (Q, V, stats) if return_stats else (Q, V)
+
 		Q = np.zeros((V.shape[0], V.shape[1], env.action_space.shape[0]))
 
 		for i in range(Q.shape[0]):
@@ -45,18 +237,129 @@ class ValueEstimation:
 						Q[i, j, a] += r + discount * V[s_new[0], s_new[1]]
 					Q[i, j, a] /= n_samples
 
-		return Q, V
+		return (Q, V, stats) if return_stats else (Q, V)
 
 class ValueIteration:
 	"""
-	Perform value iteration
+	Perform value iteration. Solving is headless; render draws a solution separately, so batch jobs and worker processes
+	never touch matplotlib.
 	"""
-	def value_iteration(env, policy, discount, v_itrs, n_samples):
-		Q, V = ValueEstimation.compute_Q(env, policy, discount, v_itrs, n_samples)
+	def value_iteration(env, policy, discount, v_itrs, n_samples, exact = False, tol = None, sweep = 'jacobi', progress = None):
+		"""
+		Solves env with ValueEstimation.compute_Q (arguments as there) and sets policy.Q to the result.
+
+		Returns:
+			Q, V, stats: (n, m, A) and (n, m) arrays and the SolverStats of the solve.
+		"""
+		Q, V, stats = ValueEstimation.compute_Q(env, policy, discount, v_itrs, n_samples, exact, tol, sweep, return_stats = True, progress = progress)
 		policy.Q = Q
+		return Q, V, stats
 
+	def render(env, policy, V, show = True):
+		"""
+		Draws env with policy's actions and the values V on top, as returned by value_iteration or policy_iteration.
+		Returns (fig, ax). With show, blocks on plt.show() first.
+		"""
+		import matplotlib.pyplot as plt
 		fig, ax = env.render()
 		fig, ax = env.render_policy(policy, fig, ax)
 		fig, ax = env.render_reward(V, True, fig, ax)
-		plt.show()
-		
+		if show:
+			plt.show()
+		return fig, ax
+
+class PolicyIteration:
+	"""
+	Policy iteration on the compiled transition model. Headless: nothing is rendered.
+	"""
+	def evaluate(model, actions, discount, solver = 'direct', V0 = None):
+		"""
+		Exact value of following actions (one per state), with the same definitions as ValueEstimation:
+		V(s) = discount * E[r + discount * V(s') * (1 - t)] for the chosen action, and V = 0 at terminal states.
+		Over the non-terminal states L this is the sparse linear system (I - discount^2 P_pi[L, L]) V = discount * P_pi[L, :] R.
+
+		Args:
+			model (MDPModel): The compiled model.
+			actions: Length S int array of the action taken in each state.
+			discount: Discount factor. Below 1, so the system is nonsingular.
+			solver: 'direct' (sparse LU via spsolve) or 'iterative' (BiCGSTAB, warm started from V0, with spsolve as the fallback
+				if it breaks down or does not converge).
+			V0: Optional. Starting guess for the iterative solver, e.g. the previous policy's V.
+
+		Returns:
+			V: Length S vector.
+		"""
+		assert solver in ('direct', 'iterative'), 'unknown solver {}'.format(solver)
+		live = np.flatnonzero(~model.T)
+		P_pi = model.policy_matrix(actions, live)
+		A = identity(len(live), format = 'csr') - discount**2 * P_pi[:, live]
+		b = discount * (P_pi @ model.R)
+
+		V = np.zeros(model.n_states)
+		if solver == 'direct':
+			V[live] = spsolve(A.tocsc(), b)
+		else:
+			V[live], info = bicgstab(A, b, x0 = None if V0 is None else V0[live], rtol = 1e-12, atol = 0.0)
+			if info != 0:
+				#BiCGSTAB can break down on these nonsymmetric systems (e.g. deterministic moves), fall back to the direct solve.
+				V[live] = spsolve(A.tocsc(), b)
+		return V
+
+	def policy_iteration(env, policy = None, discount = 0.95, max_itrs = 100, solver = 'direct', return_stats = False, progress = None):
+		"""
+		Alternates exact policy evaluation (a sparse linear solve, see evaluate) with greedy improvement (a vectorized argmax
+		over Q) until the policy stops changing. Converges to the same V and Q as ValueEstimation.compute_Q run to convergence.
+
+		Args:
+			env: The Env or SlipperyEnv to solve.
+			policy: Optional. An ArgmaxQPolicy, whose Q is set to the result, or a TabularPolicy, whose table is set to the
+				greedy policy. Its current greedy actions are the starting policy.
+			discount: Discount factor.
+			max_itrs: Most improvement steps.
+			solver: 'direct' or 'iterative', as in evaluate.
+			return_stats: If True, also return SolverStats (iterations are improvement steps, backups are single-state Q
+				evaluations in the improvement steps, residual is the largest change to V in the last evaluation).
+			progress (function): Optional. Called as progress(itr, max_itrs, stats) after every improvement step.
+
+		Returns:
+			Q, V: (n, m, A) and (n, m) arrays, as compute_Q returns them. (Q, V, stats) with return_stats.
+		"""
+		stats = SolverStats()
+		t0 = time.perf_counter()
+		model = compile_model(env)
+		if hasattr(policy, 'Q'):
+			actions = np.argmax(policy.Q, axis=2).ravel()
+		elif hasattr(policy, 'policy'):
+			actions = np.argmax(policy.policy, axis=2).ravel()
+		else:
+			actions = np.zeros(model.n_states, dtype=int)
+
+		V = np.zeros(model.n_states)
+		rows = np.arange(model.n_states)
+		live = ~model.T
+		for itr in range(max_itrs):
+			V_new = PolicyIteration.evaluate(model, actions, discount, solver, V)
+			stats.residual = np.abs(V_new - V).max()
+			V = V_new
+			Q = model.Q(V, discount)
+			stats.iterations += 1
+			stats.backups += int(live.sum())
+			if progress is not None:
+				progress(itr + 1, max_itrs, stats)
+
+			#Only switch actions that are strictly better, so ties can't make the policy cycle.
+			best = np.argmax(Q, axis=1)
+			better = live & (Q[rows, best] > Q[rows, actions] + 1e-12 * np.maximum(1.0, np.abs(Q[rows, actions])))
+			if not better.any():
+				stats.converged = True
+				break
+			actions = np.where(better, best, actions)
+
+		Q = Q.reshape(env.n, env.m, model.n_acts)
+		V = V.reshape(env.n, env.m)
+		if hasattr(policy, 'Q'):
+			policy.Q = Q
+		elif hasattr(policy, 'policy'):
+			policy.policy = np.eye(model.n_acts)[actions.reshape(env.n, env.m)]
+		stats.time_total = time.perf_counter() - t0
+		return (Q, V, stats) if return_stats else (Q, V)
@@ -1,18 +1,18 @@
+import hashlib
 import numpy as np
 from numpy import sin, cos, pi
 
 from link import Link, FixedLink
-
-from stepper_motors.stepper import Stepper
-from stepper_motors.stepper_array import StepperArray
+from obstacles import circle_array, box_array, segments_hit_circles, segments_hit_boxes
 
 class Arm:
 	"""
 	2D arm class that is comprised of a list of links. (And exactly two degrees of freedom for plotting).
 	"""
-	def __init__(self, link_list, steppers = None):
+	def __init__(self, link_list, steppers = None, obstacles = None):
 		"""
-		Uses a list of links to initialize an arm. Optionally, can also specify a set of stepper motors for control of a physical arm.
+		Uses a list of links to initialize an arm. Optionally, can also specify a set of stepper motors for control of a physical arm,
+		and a list of workspace obstacles (Circles and Boxes from obstacles.py) that no link may touch.
 		"""
 		self.links = []
 		self.control_links = []
@@ -20,7 +20,17 @@ class Arm:
 			self.links.append(link)
 			if isinstance(link, Link):
 				self.control_links.append(link)
+
+		#Link parameters as arrays, for batch forward kinematics. Entries of link_angles for controllable links are placeholders.
+		self.link_lengths = np.array([link.length for link in self.links], dtype=float)
+		self.link_angles = np.array([0.0 if isinstance(link, Link) else link.angle for link in self.links], dtype=float)
+		self.control_idx = np.array([i for i, link in enumerate(self.links) if isinstance(link, Link)], dtype=int)
+		self.joint_min = np.array([link.min_angle for link in self.control_links], dtype=float)
+		self.joint_max = np.array([link.max_angle for link in self.control_links], dtype=float)
+		self.set_obstacles(obstacles or [])
+
 		if steppers:
+		    from stepper_motors.stepper_array import StepperArray #Only needed to drive a physical arm, so planning works without the stepper drivers installed.
 		    assert len(steppers) == len(self.control_links), 'Expected {} steppers, recieved {}.'.format(len(self.control_links), len(steppers))
 		    self.steppers = StepperArray(steppers)
 		else:
@@ -100,11 +110,8 @@ class Arm:
 		Returns:
 			A (n+1)x3 numpy array where each row is the pose (x, y, theta) of the orig    in of the n-th link of the arm. The (n+1)-th row is the pose of the end-effector. (Equivalent to get_joint_poses)
 		"""
-		old_angles = self.get_joint_space()
-		self.set_joint_space(angles)
-		out = self.get_joint_poses()
-		self.set_joint_space(old_angles)
-		return out
+		assert len(angles) == len(self.control_links), 'Tried to assign {} angles to a {}DOF arm'.format(len(angles), len(self.control_links))
+		return self.get_joint_poses_batch(angles)[0]
 
 	def get_end_effector_pose_from(self, angles):
 		"""
@@ -118,6 +125,38 @@ class Arm:
 		"""
 		return self.get_joint_poses_from(angles)[-1]
 
+	def get_joint_poses_batch(self, angles):
+		"""
+		Vectorized forward kinematics for many joint configurations at once. Unlike get_joint_poses_from, this does not modify the arm's links.
+
+		Args:
+			angles: A (N, dof) array of joint angles, one configuration per row. Angles are clipped to the joint limits, as in set_joint_space.
+
+		Returns:
+			A (N, n+1, 3) numpy array where the i-th entry is the result of get_joint_poses_from for the i-th configuration.
+		"""
+		angles = np.atleast_2d(np.asarray(angles, dtype=float))
+		th = np.tile(self.link_angles, (angles.shape[0], 1))
+		th[:, self.control_idx] = np.clip(angles, self.joint_min, self.joint_max)
+		th = np.cumsum(th, axis=1)
+		poses = np.zeros((angles.shape[0], len(self.links) + 1, 3))
+		poses[:, 1:, 0] = np.cumsum(self.link_lengths * cos(th), axis=1)
+		poses[:, 1:, 1] = np.cumsum(self.link_lengths * sin(th), axis=1)
+		poses[:, 1:, 2] = th
+		return poses
+
+	def get_end_effector_poses_batch(self, angles):
+		"""
+		Vectorized version of get_end_effector_pose_from.
+
+		Args:
+			angles: A (N, dof) array of joint angles, one configuration per row.
+
+		Returns:
+			A (N, 3) numpy array of end-effector poses (x, y, theta).
+		"""
+		return self.get_joint_poses_batch(angles)[:, -1]
+
 	def valid_configuration(self, angles):
 		"""
 		Checks if the set of angles given fall within joint limits.
@@ -129,6 +168,66 @@ class Arm:
 				return False			
 		return True
 
+	def valid_configurations(self, angles):
+		"""
+		Vectorized version of valid_configuration.
+
+		Args:
+			angles: A (N, dof) array of joint angles, one configuration per row.
+
+		Returns:
+			A (N,) boolean numpy array that is True for configurations within joint limits.
+		"""
+		angles = np.atleast_2d(angles)
+		if angles.shape[1] != len(self.control_links):
+			return np.zeros(angles.shape[0], dtype=bool)
+		return np.all((angles >= self.joint_min) & (angles <= self.joint_max), axis=1)
+
+	def set_obstacles(self, obstacles):
+		"""
+		Replaces the workspace obstacles. They are also kept as arrays (one per obstacle type) for collision_free.
+		"""
+		self.obstacles = list(obstacles)
+		self.circles = circle_array(self.obstacles)
+		self.boxes = box_array(self.obstacles)
+
+	def collision_free(self, angles):
+		"""
+		Checks every link segment (from get_joint_poses) of many configurations against the workspace obstacles at once.
+
+		Args:
+			angles: A (N, dof) array of joint angles, one configuration per row.
+
+		Returns:
+			A (N,) boolean numpy array that is True for configurations where no link touches an obstacle.
+		"""
+		angles = np.atleast_2d(angles)
+		free = np.ones(angles.shape[0], dtype=bool)
+		if not self.obstacles:
+			return free
+		pts = self.get_joint_poses_batch(angles)[:, :, :2]
+		p0 = pts[:, :-1]
+		p1 = pts[:, 1:]
+		if len(self.circles):
+			free &= ~np.any(segments_hit_circles(p0, p1, self.circles), axis=1)
+		if len(self.boxes):
+			free &= ~np.any(segments_hit_boxes(p0, p1, self.boxes), axis=1)
+		return free
+
+	def geometry_hash(self):
+		"""
+		Returns a hex digest that identifies the arm's geometry: link lengths, fixed link angles, which links are controllable, the joint limits and any obstacles.
+		Arms with equal hashes have identical forward kinematics, joint limits and collisions, so results computed for one (tabulated kinematics, cached plans) can be reused for the other.
+		"""
+		h = hashlib.sha1()
+		for arr in (self.link_lengths, self.link_angles, self.control_idx, self.joint_min, self.joint_max):
+			h.update(np.ascontiguousarray(arr, dtype=float).tobytes())
+		if self.obstacles: #Obstacle-free arms keep the hashes they had before obstacles existed.
+			h.update(b'obstacles')
+			h.update(np.ascontiguousarray(self.circles).tobytes())
+			h.update(np.ascontiguousarray(self.boxes).tobytes())
+		return h.hexdigest()
+
 	def __repr__(self):
 		out = ''
 		for link in self.links:
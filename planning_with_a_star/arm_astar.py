@@ -1,26 +1,62 @@
 from numpy import sin, cos, pi
 import numpy as np
+import time
 import matplotlib.pyplot as plt
 
 from link import Link, FixedLink
 from arm import Arm
 from arm_gui import ArmGUI
-from general_astar import AStarPlanner, Node
+from general_astar import AStarPlanner, Node, SearchStats
+from cspace import CSpaceMap
+from plan_cache import PlanCache
 
 class ArmAStar(AStarPlanner):
 
-	def __init__(self, arm, discretization = 5 * pi / 180, min_dist = 0.15):
+	def __init__(self, arm, discretization = 5 * pi / 180, min_dist = 0.15, cspace = False, cspace_dir = None, plan_cache = None, lazy = False):
 		"""
 		Intitializes an A* planner with an arm
 		Args:
 			arm: The arm to plan with
 			discretization: How far to move joint angles for neighboring nodes.
 			min_dist: How close to the goal point a pose needs to be to be consideres a goal.
+			cspace: If True, tabulate forward kinematics over the whole joint lattice up front (see CSpaceMap) and look end-effector positions up during search. For 2-3 DOF arms.
+			cspace_dir: Where to keep the memory-mapped C-space tables. Defaults to the system temp directory.
+			plan_cache: Optional PlanCache. plan() looks queries up in it before searching and stores new paths in it.
+			lazy: If True, configurations are only checked against the arm's obstacles when they are popped for expansion (see AStarPlanner.validate),
+				not when they are generated. Pays off when collision checks dominate the cost of an expansion.
 		"""
 		self.arm = arm
 		self.goal_pt = None
 		self.discretization = discretization
 		self.min_dist = min_dist
+		self.cspace = CSpaceMap(arm, discretization, cspace_dir) if cspace else None
+		self.plan_cache = plan_cache
+		self.lazy = lazy
+
+		#Neighborhood offsets in lattice units, in the same order expand_1n/expand_2n have always generated them.
+		dof = len(arm.control_links)
+		offsets = []
+		for d in range(dof):
+			for sign in (1, -1):
+				offset = np.zeros(dof, dtype=int)
+				offset[d] = sign
+				offsets.append(offset)
+		self.n_1n = len(offsets)
+		for d in range(dof):
+			for d2 in range(d+1, dof):
+				for sign, sign2 in ((1, 1), (1, -1), (-1, 1), (-1, -1)):
+					offset = np.zeros(dof, dtype=int)
+					offset[d] = sign
+					offset[d2] = sign2
+					offsets.append(offset)
+		self.lattice_offsets = np.stack(offsets).reshape(-1, dof)
+		self.offsets = self.lattice_offsets * discretization
+
+	def key(self, state):
+		"""
+		Snaps a joint configuration to the lattice set by discretization. Configurations that differ only by floating point drift (from repeatedly adding discretization) share a key.
+		"""
+		return tuple(np.rint(np.asarray(state) / self.discretization).astype(int).tolist())
 
 	def goal_fn(self, state):
 		"""
@@ -36,21 +72,58 @@ class ArmAStar(AStarPlanner):
 		gui.closedlist = cl
 		gui.update()
 		plt.pause(1e-10)
-		print('ol = {}, cl = {}'.format(len(gui.openlist), len(gui.closedlist)))
 
 	def h(self, node, G):
 		"""
-		Heuristic is Euclidean distance to the goal point
+		Heuristic is Euclidean distance to the goal point.
+		If G is a list of goal configurations instead (as bidirectional_a_star passes), it is the joint space distance to the nearest one.
 		"""
+		if type(G) is list:
+			return min(self.joint_dist(node.state, g) for g in G)
 		return self.dist_to_goal(node.state)
+
+	def joint_dist(self, a, b):
+		"""
+		Lower bound on the cost of moving between two joint configurations. Every 2-neighborhood step moves at most two joints by one
+		discretization each, so it takes at least max(largest joint change, half the total joint change) steps.
+		"""
+		steps = np.abs(np.asarray(a) - np.asarray(b)) / self.discretization
+		return max(steps.max(), steps.sum() / 2) * self.discretization
+
+	def h_batch(self, nodes, G):
+		"""
+		Heuristic for all new neighbors of an expansion with one batch forward kinematics call (or one C-space lookup).
+		"""
+		if not nodes:
+			return []
+		if type(G) is list:
+			return [self.h(n, G) for n in nodes]
+		if self.cspace is not None:
+			ee = self.cspace.lookup([n.key for n in nodes])[0]
+			return np.hypot(ee[:, 0] - self.goal_pt[0], ee[:, 1] - self.goal_pt[1]).tolist()
+		return self.dists_to_goal(np.stack([n.state for n in nodes])).tolist()
 		
 	def dist_to_goal(self, state):
 		"""
 		Use arm's built-in end-effector pose func and use Euclidean dist to goal pose.
+		With a C-space map, the end-effector position of the nearest lattice point is looked up instead.
 		"""
-		ee = self.arm.get_end_effector_pose_from(state)[:-1]
+		if self.cspace is not None:
+			ee = self.cspace.lookup([self.key(state)])[0][0]
+		else:
+			ee = self.arm.get_end_effector_pose_from(state)[:-1]
 		return ((ee[0] - self.goal_pt[0])**2 + (ee[1] - self.goal_pt[1])**2)**0.5
 
+	def dists_to_goal(self, states):
+		"""
+		Batch version of dist_to_goal. Takes a (N, dof) array of states and returns a (N,) array of distances using one forward kinematics call.
+		"""
+		if self.cspace is not None:
+			ee = self.cspace.lookup([self.key(s) for s in states])[0]
+		else:
+			ee = self.arm.get_end_effector_poses_batch(states)
+		return np.hypot(ee[:, 0] - self.goal_pt[0], ee[:, 1] - self.goal_pt[1])
+
 	def cost(self, curr, n):
 		"""
 		All node costs are discretization
@@ -61,69 +134,122 @@ class ArmAStar(AStarPlanner):
 		"""
 		Compute neighbor nodes from current state.
 		Neighbors are valid expansions from the current state.
-		An expansion is obtained by adding or subtracting discretizations from the current state. This function also prunes out invalid configurations as computed by the arm.
+		An expansion is obtained by adding or subtracting discretizations from the current state. This function also prunes out invalid configurations as computed by the arm
+		(joint limits, and collisions with the arm's obstacles unless the planner is lazy).
 		"""
-		curr_state = curr.state
+		#Get all expansions in one broadcast add and filter invalid ones in one comparison
+		states = curr.state + self.offsets
+		valid = self.arm.valid_configurations(states)
+
+		#Neighbor keys are offsets from the current key, so they never drift off the lattice
+		if curr.key is not None:
+			keys = np.array(curr.key) + self.lattice_offsets
+			if self.cspace is not None:
+				valid &= self.cspace.lookup(keys)[1] #Tabulated collisions are cheap enough to check even when lazy.
+			elif self.arm.obstacles and not self.lazy:
+				valid[valid] = self.arm.collision_free(states[valid])
+			keys = keys[valid].tolist()
+		else:
+			if self.arm.obstacles and not self.lazy:
+				valid[valid] = self.arm.collision_free(states[valid])
+			keys = [None] * int(valid.sum())
 
-		#Get all expansions
-		expansions = self.expand_2n(curr_state)
-		#Filter invalid expansions
 		valid_expansions = []
+		for state, key in zip(states[valid], keys):
+			node = Node(state)
+			if key is not None:
+				node.key = tuple(key)
+			valid_expansions.append(node)
 
-		for node in expansions:
-			if self.arm.valid_configuration(node.state):
-				valid_expansions.append(node)
+		return valid_expansions
 
-		#print([n.state for n in valid_expansions])
+	def validate(self, n):
+		"""
+		Lazy collision check of a popped node against the arm's obstacles.
+		"""
+		if self.cspace is not None or not self.arm.obstacles:
+			return True #Already checked in neighbors.
+		return bool(self.arm.collision_free(n.state)[0])
 
-		return valid_expansions
+	def plan(self, start, goal_pt, **kwargs):
+		"""
+		Plans from the start configuration to goal_pt. With a plan cache, a cached path for the same query is reused if it is still valid
+		(within joint limits and ending within min_dist of goal_pt); otherwise a_star runs and its path is cached.
+		Keyword arguments go to a_star. as_array and return_stats shape the result the same way whether or not the cache was hit,
+		and self.stats is set either way (a cache hit expands nothing).
+
+		Returns:
+			path (list of Nodes): Same as a_star, including (path, stats) with return_stats and an array of States with as_array.
+		"""
+		as_array = kwargs.pop('as_array', False)
+		return_stats = kwargs.pop('return_stats', False)
+		self.goal_pt = goal_pt
+		start = np.asarray(start, dtype=float)
+
+		path = None
+		if self.plan_cache is not None:
+			key = self.plan_cache.key(self, start)
+			steps = self.plan_cache.get(key)
+			if steps is not None:
+				path = self.path_from_steps(start, steps)
+
+		if path is None:
+			path = self.a_star(start, self.goal_fn, **kwargs)
+			if path and self.plan_cache is not None:
+				keys = np.array([self.key(n.state) for n in path])
+				self.plan_cache.put(key, np.diff(keys, axis=0))
+
+		if as_array:
+			path = self.path_array(path)
+		return (path, self.stats) if return_stats else path
+
+	def path_from_steps(self, start, steps):
+		"""
+		Rebuilds a cached path from start and its lattice steps. Returns None if the path is no longer valid for the current goal.
+		"""
+		t0 = time.perf_counter()
+		states = [start]
+		for step in steps:
+			states.append(states[-1] + step * self.discretization) #Same additions as neighbors(), so states match a fresh search.
+		states = np.stack(states)
+		if not self.arm.valid_configurations(states).all() or not self.arm.collision_free(states[1:]).all() or not self.goal_fn(states[-1]):
+			return None
+
+		path = []
+		for i, state in enumerate(states):
+			node = Node(state)
+			node.key = self.key(state)
+			node.g = i * self.discretization
+			node.f = node.g
+			node.prev = path[-1] if path else None
+			path.append(node)
+
+		stats = SearchStats()
+		stats.found = True
+		stats.path_length = len(path)
+		stats.path_cost = path[-1].g
+		stats.time_total = time.perf_counter() - t0
+		self.stats = stats
+		return path
 
 	def expand_1n(self, state):
 		"""
 		Compute the 1-neighborhood from a node. (Add/subtract 1 discretization from each dimension of state).
 		"""
-		expansions = []
-
-		for d in range(state.shape[0]):
-			new_state = state.copy()
-			new_state[d] += self.discretization
-			expansions.append(Node(new_state))
-			new_state = state.copy()
-			new_state[d] -= self.discretization
-			expansions.append(Node(new_state))
+		return [Node(s) for s in state + self.offsets[:self.n_1n]]
 
-		return expansions
-	
-	#There should be a better way to do this than copy-paste the combos of plus/minus	
 	def expand_2n(self, state):
 		"""
 		Compute the 2-neighborhood from a node (Add/subtract discreizations from every pair of dimensions of state).
 		"""
-		expansions = self.expand_1n(state)
-
-		for d in range(state.shape[0]):
-			for d2 in range(d+1, state.shape[0]):
-				#4 options
-				new_state = state.copy()
-				new_state[d] += self.discretization
-				new_state[d2] += self.discretization
-				expansions.append(Node(new_state))
-				new_state = state.copy()
-				new_state[d] += self.discretization
-				new_state[d2] -= self.discretization
-				expansions.append(Node(new_state))
-				new_state = state.copy()
-				new_state[d] -= self.discretization
-				new_state[d2] += self.discretization
-				expansions.append(Node(new_state))
-				new_state = state.copy()
-				new_state[d] -= self.discretization
-				new_state[d2] -= self.discretization
-				expansions.append(Node(new_state))
-
-		return expansions
+		return [Node(s) for s in state + self.offsets]
 
 if __name__ == '__main__':
+	import argparse
+	parser = argparse.ArgumentParser(description='Plan for a 3 DOF arm in the GUI')
+	parser.add_argument('--plan_cache', nargs='?', const='', default=None, metavar='DIR', help='reuse solved plans across runs, cached in DIR (default: arm_plans in the system temp directory)')
+	args = parser.parse_args()
+
 	l1 = FixedLink(length = 5, angle = pi/2)
 	l2 = FixedLink(length = 0, angle = -pi/2)
 	l3 = Link(length = 3, min_angle = -1e4, max_angle=1e4, angle = pi/2)
@@ -133,5 +259,8 @@ if __name__ == '__main__':
 	l7 = Link(length = 3, min_angle = -1e4, max_angle=1e4, angle = pi/2)
 	arm = Arm([l1, l2, l3, l4, l5, l6, l7])
 	print(arm)
-	astar = ArmAStar(arm)
+	plan_cache = None if args.plan_cache is None else PlanCache(args.plan_cache or None)
+	astar = ArmAStar(arm, plan_cache = plan_cache)
 	gui = ArmGUI(arm, astar)
+	if plan_cache is not None:
+		plan_cache.close()
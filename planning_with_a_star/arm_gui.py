@@ -3,9 +3,12 @@ from matplotlib.widgets import Button
 import numpy as np
 from math import pi
 import time
+import threading
 
 from link import Link, FixedLink
 from arm import Arm
+from obstacles import Circle, Box
+from general_astar import GUIObserver
 
 class ArmGUI:
 	"""
@@ -25,6 +28,7 @@ class ArmGUI:
 		self.closedlist = None
 
 		self.move_goal_pt = False
+		self.cancel = threading.Event() # Set to abandon the plan in progress, e.g. when the goal is dragged away.
 
 		fig, ax = plt.subplots(1, 2, figsize = (9, 4))
 		self.config_ax = ax[0]
@@ -68,17 +72,24 @@ class ArmGUI:
 		self.op_ax.scatter(locs[1:-1, 0], locs[1:-1, 1], marker='o', c='k')
 		self.op_ax.scatter(ee[0], ee[1], marker='x', c='r')
 
+	def draw_obstacles(self):
+		for o in self.arm.obstacles:
+			if isinstance(o, Circle):
+				self.op_ax.add_patch(plt.Circle((o.x, o.y), o.radius, color='gray', alpha=0.5))
+			elif isinstance(o, Box):
+				self.op_ax.add_patch(plt.Rectangle((o.x_min, o.y_min), o.x_max - o.x_min, o.y_max - o.y_min, color='gray', alpha=0.5))
+
 	def draw_path(self):
 		if self.path:
-			op_pts = np.stack([self.arm.get_end_effector_pose_from(n.state) for n in self.path])
+			op_pts = self.arm.get_end_effector_poses_batch(np.stack([n.state for n in self.path]))
 			self.op_ax.plot(op_pts[:, 0], op_pts[:, 1], color='b')
 
 	def draw_lists(self):
 		if self.openlist:
-			pts = np.stack([self.arm.get_end_effector_pose_from(n.state) for n in self.openlist])
+			pts = self.arm.get_end_effector_poses_batch(np.stack([n.state for n in self.openlist]))
 			self.op_ax.scatter(pts[:, 0], pts[:, 1], alpha=0.25, c='k', marker='.', s=4)
 		if self.closedlist:
-			pts = np.stack([self.arm.get_end_effector_pose_from(n.state) for n in self.closedlist])
+			pts = self.arm.get_end_effector_poses_batch(np.stack([n.state for n in self.closedlist]))
 			self.op_ax.scatter(pts[:, 0], pts[:, 1], alpha=0.5, c='k', marker='.', s=4)
 
 	def handle_plan(self, event):
@@ -87,10 +98,18 @@ class ArmGUI:
 		self.planner.goal_pt = self.goal_pt
 		print(self.planner.goal_pt)
 		print(self.planner.goal_fn(np.zeros(len(self.arm.control_links))))
-		path = self.planner.a_star(s = self.config_pt, G = self.planner.goal_fn, gui = self)
+		observer = GUIObserver(self.planner, self, interval = 0.1) # Redraw at most 10 times a second
+		self.cancel = threading.Event()
+		path = self.planner.plan(self.config_pt, self.goal_pt, observer = observer, cancel = self.cancel) # Reuses cached plans if the planner has a PlanCache
+		print(self.planner.stats)
+		if self.cancel.is_set():
+			self.move_goal_pt = True
+			return
 		self.path = path
 		pathlen = len(path)
 		for i, node in enumerate(path):
+			if self.cancel.is_set():
+				break
 			print('path node {}/{}'.format(i, pathlen))
 			print(node)
 			self.config_pt = node.state
@@ -112,6 +131,7 @@ class ArmGUI:
 	def move_point(self, event):
 		if event.inaxes == self.op_ax and self.move_goal_pt:
 			self.goal_pt = (event.xdata, event.ydata)
+			self.cancel.set() # The goal moved, so drop the plan for the old one. Redraws during search let this run mid-search.
 		self.update()
 
 	def update(self):
@@ -121,6 +141,7 @@ class ArmGUI:
 
 		self.arm.set_joint_space(list(self.config_pt))
 
+		self.draw_obstacles()
 		self.arm_obj = self.draw_arm()
 		self.goal_obj = self.draw_op_point(self.goal_pt)
 		self.config_obj = self.draw_config_point(self.config_pt)
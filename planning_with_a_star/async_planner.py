@@ -0,0 +1,142 @@
+# Asyncio front-end for the A* planners.
+# Searches run on a worker thread so the event loop stays responsive. Each
+# search gets a threading.Event that a_star checks before every expansion,
+# so cancelling the awaiting task (or submitting a newer query) stops the
+# search within one expansion instead of letting it run to completion.
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from general_astar import SearchObserver
+
+class ProgressObserver(SearchObserver):
+	"""
+	Reports search progress to a callback on the event loop, and forwards every event to an optional inner observer
+	(e.g. a GUIObserver). Progress is rate limited like any observer's draw: at most once per every expansions and interval seconds.
+	"""
+	def __init__(self, planner, loop, callback, inner = None, every = 100, interval = 0.0):
+		"""
+		Args:
+			planner: The planner being run. callback receives planner.stats.as_dict(), the live stats of the search.
+			loop: Event loop to call callback on.
+			callback (function): Called as callback(stats) on the loop thread.
+			inner (SearchObserver): Optional. Receives all events as if it were passed to a_star directly.
+			every (int), interval (float): Rate limits for progress reports, as in SearchObserver.
+		"""
+		super().__init__(every, interval)
+		self.planner = planner
+		self.loop = loop
+		self.callback = callback
+		self.inner = inner
+
+	def node_opened(self, n):
+		if self.inner is not None:
+			self.inner.node_opened(n)
+
+	def node_closed(self, n):
+		if self.inner is not None:
+			self.inner.node_closed(n)
+
+	def path_found(self, path):
+		if self.inner is not None:
+			self.inner.path_found(path)
+
+	def search_failed(self):
+		if self.inner is not None:
+			self.inner.search_failed()
+
+	def expanded(self):
+		super().expanded()
+		if self.inner is not None:
+			self.inner.expanded()
+
+	def draw(self):
+		if self.callback is not None:
+			self.loop.call_soon_threadsafe(self.callback, self.planner.stats.as_dict())
+
+class AsyncPlanner:
+	"""
+	Runs searches of a planner (any AStarPlanner) from asyncio code.
+
+		planner = AsyncPlanner(ArmAStar(arm), method = 'plan')
+		path, stats = await planner.plan(start, goal_pt, deadline = loop.time() + 2.0)
+
+	Searches run one at a time on a single worker thread, since planners keep per-search state (goal_pt, stats).
+	submit() starts a search as a task and cancels the one in flight, so only the latest query (e.g. the latest goal
+	while the operator drags it) is ever worked on.
+	"""
+	def __init__(self, planner, method = 'a_star', executor = None, progress_every = 100):
+		"""
+		Args:
+			planner: The planner to run.
+			method (str): Name of the planner method that searches, e.g. 'a_star', 'anytime_a_star', or ArmAStar's 'plan'.
+				It must accept the cancel, observer and time_limit keyword arguments of a_star and set planner.stats.
+			executor: Optional. Executor to search on. Defaults to a single-thread ThreadPoolExecutor.
+			progress_every (int): Expansions between progress reports.
+		"""
+		self.planner = planner
+		self.search = getattr(planner, method)
+		self.executor = executor if executor is not None else ThreadPoolExecutor(max_workers = 1)
+		self.progress_every = progress_every
+		self.task = None
+
+	async def plan(self, *args, deadline = None, progress = None, observer = None, **kwargs):
+		"""
+		Searches on the worker thread and waits for the result.
+
+		Args:
+			args: Positional arguments of the search method, e.g. (s, G) for a_star or (start, goal_pt) for ArmAStar.plan.
+			deadline (float): Optional. Time on the event loop's clock (loop.time()) by which to give up. Becomes time_limit.
+			progress (function): Optional. Called on the loop as progress(stats) every progress_every expansions,
+				with the search's SearchStats as a dict.
+			observer (SearchObserver): Optional. Receives the search's events on the worker thread.
+			kwargs: Passed on to the search method.
+
+		Returns:
+			(path, stats): The search's result and SearchStats. If the deadline passed first, path is empty
+			and stats.budget_exhausted is set. Cancelling the awaiting task stops the search and raises CancelledError.
+		"""
+		loop = asyncio.get_running_loop()
+		cancel = threading.Event()
+		if progress is not None:
+			observer = ProgressObserver(self.planner, loop, progress, observer, every = self.progress_every)
+		if deadline is not None:
+			kwargs['time_limit'] = max(0.0, deadline - loop.time())
+
+		def run():
+			path = self.search(*args, cancel = cancel, observer = observer, **kwargs)
+			return path, self.planner.stats
+
+		future = loop.run_in_executor(self.executor, run)
+		try:
+			return await asyncio.shield(future)
+		except asyncio.CancelledError:
+			cancel.set() # The search stops at its next expansion. Its result is dropped.
+			raise
+
+	def submit(self, *args, **kwargs):
+		"""
+		Starts plan(*args, **kwargs) as a task, cancelling the search in flight if there is one. Must be called from the loop.
+
+		Returns:
+			task (asyncio.Task): Resolves to (path, stats), or is cancelled if a newer query is submitted first.
+		"""
+		self.cancel()
+		self.task = asyncio.ensure_future(self.plan(*args, **kwargs))
+		return self.task
+
+	def cancel(self):
+		"""
+		Cancels the search started by the last submit, if it is still running.
+		"""
+		if self.task is not None and not self.task.done():
+			self.task.cancel()
+		self.task = None
+
+	def close(self):
+		"""
+		Cancels any search in flight and shuts the worker thread down.
+		"""
+		self.cancel()
+		self.executor.shutdown(wait = False)
@@ -0,0 +1,172 @@
+# Batch planning of many independent queries over a process pool.
+# The map (an occupancy grid, or an arm's link geometry) is written once to
+# a shared memory block. Each worker process builds its planner from that
+# block when it starts, and tasks only carry their start and goals.
+
+import os
+import time
+import numpy as np
+from numpy import pi
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from general_astar import SearchStats
+from grid_planner import GridPlanner
+
+_planner = None # The worker process's planner, built by its pool initializer.
+
+def _share(array):
+	"""Copies an array into a new shared memory block. Returns the block."""
+	block = shared_memory.SharedMemory(create = True, size = max(array.nbytes, 1))
+	np.ndarray(array.shape, dtype = array.dtype, buffer = block.buf)[...] = array
+	return block
+
+def _attach(name, shape, dtype):
+	"""Copies an array out of the shared memory block called name."""
+	block = shared_memory.SharedMemory(name = name)
+	try:
+		return np.ndarray(shape, dtype = dtype, buffer = block.buf).copy()
+	finally:
+		block.close()
+
+def _init_grid(name, shape, connectivity, jump_points):
+	global _planner
+	_planner = GridPlanner(_attach(name, shape, np.uint8), connectivity, jump_points)
+
+def _plan_grid(query):
+	start, goals = query
+	t0 = time.perf_counter()
+	path = _planner.plan(start, goals)
+	stats = SearchStats()
+	stats.found = len(path) > 0
+	stats.path_length = len(path)
+	stats.path_cost = _planner.path_cost(path) if stats.found else float('inf')
+	stats.expanded = _planner.expanded
+	stats.bound = 1.0 if stats.found else float('inf')
+	stats.time_total = time.perf_counter() - t0
+	return path, stats
+
+def _init_arm(name, shape, discretization, min_dist, obstacles, lazy):
+	global _planner
+	from link import Link, FixedLink
+	from arm import Arm
+	from arm_astar import ArmAStar
+
+	links = []
+	for length, angle, control, min_angle, max_angle in _attach(name, shape, np.float64):
+		if control:
+			links.append(Link(length, min_angle = min_angle, max_angle = max_angle, angle = np.clip(0.0, min_angle, max_angle)))
+		else:
+			links.append(FixedLink(length, angle))
+	_planner = ArmAStar(Arm(links, obstacles = obstacles), discretization = discretization, min_dist = min_dist, lazy = lazy)
+
+def _plan_arm(query):
+	start, goal_pt, kwargs = query
+	_planner.goal_pt = goal_pt
+	return _planner.a_star(np.asarray(start, dtype=float), _planner.goal_fn, as_array = True, return_stats = True, **kwargs)
+
+class BatchPlanner:
+	"""
+	Base class for the batch planners below. Owns the shared memory block and the process pool.
+	Use as a context manager, or call close() when done, so the pool shuts down and the block is freed.
+	"""
+	def __init__(self, data, initializer, initargs, max_workers = None):
+		"""
+		Args:
+			data: Array describing the problem. Copied once into shared memory.
+			initializer: Builds the worker's planner. Called with the block's name, data.shape and initargs.
+			max_workers: Number of processes. Defaults to the number of CPUs.
+		"""
+		self.max_workers = max_workers or os.cpu_count() or 1
+		self.block = _share(data)
+		self.pool = ProcessPoolExecutor(max_workers = self.max_workers, initializer = initializer, initargs = (self.block.name, data.shape) + tuple(initargs))
+
+	def run(self, task, queries, chunksize = None):
+		"""
+		Maps task over queries in the pool. Returns the results in query order.
+		"""
+		queries = list(queries)
+		if chunksize is None:
+			chunksize = max(1, len(queries) // (4 * self.max_workers))
+		return list(self.pool.map(task, queries, chunksize = chunksize))
+
+	def close(self):
+		"""
+		Shuts the pool down and frees the shared memory block.
+		"""
+		if self.pool is not None:
+			self.pool.shutdown()
+			self.pool = None
+			self.block.close()
+			self.block.unlink()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+class GridBatchPlanner(BatchPlanner):
+	"""
+	Plans many start/goal queries on one occupancy grid (as grid_astar.GRID, cells equal to 1 are obstacles) with GridPlanner.
+
+		with GridBatchPlanner(GRID, connectivity = 8) as planner:
+			results = planner.plan([(start, [goal]), ...])
+	"""
+	def __init__(self, grid, connectivity = 4, jump_points = False, max_workers = None):
+		"""
+		Args:
+			grid (2D array): Occupancy grid. Only which cells are blocked is shared.
+			connectivity, jump_points: As in GridPlanner.
+			max_workers: Number of processes. Defaults to the number of CPUs.
+		"""
+		blocked = (np.asarray(grid) == 1).astype(np.uint8)
+		super().__init__(blocked, _init_grid, (connectivity, jump_points), max_workers)
+
+	def plan(self, queries, chunksize = None):
+		"""
+		Args:
+			queries: (start, goals) pairs, with start an [r,c] cell and goals a list of [r,c] cells.
+			chunksize: Queries sent to a worker at a time. Defaults to a quarter of an even share per worker.
+
+		Returns:
+			results (list): (path, stats) per query, in query order. path is a (N, 2) array as GridPlanner.plan
+			returns, stats a SearchStats with found, path_length, path_cost, expanded and time_total filled in.
+		"""
+		return self.run(_plan_grid, queries, chunksize)
+
+class ArmBatchPlanner(BatchPlanner):
+	"""
+	Plans many start configuration/goal point queries for one arm with ArmAStar.
+
+		with ArmBatchPlanner(arm) as planner:
+			results = planner.plan([(start, goal_pt), ...])
+	"""
+	def __init__(self, arm, discretization = 5 * pi / 180, min_dist = 0.15, lazy = False, max_workers = None):
+		"""
+		Args:
+			arm: The arm to plan with. Its link geometry and joint limits are shared, not its current angles or steppers.
+				Its obstacles (a few small objects) are passed to each worker once, with the pool initializer.
+			discretization, min_dist, lazy: As in ArmAStar.
+			max_workers: Number of processes. Defaults to the number of CPUs.
+		"""
+		geometry = np.zeros((len(arm.links), 5))
+		geometry[:, 0] = arm.link_lengths
+		geometry[:, 1] = arm.link_angles
+		geometry[arm.control_idx, 2] = 1
+		geometry[arm.control_idx, 3] = arm.joint_min
+		geometry[arm.control_idx, 4] = arm.joint_max
+		super().__init__(geometry, _init_arm, (discretization, min_dist, arm.obstacles, lazy), max_workers)
+
+	def plan(self, queries, chunksize = None, **kwargs):
+		"""
+		Args:
+			queries: (start, goal_pt) pairs, with start a joint configuration and goal_pt an end-effector [x, y] point.
+			chunksize: Queries sent to a worker at a time. Defaults to a quarter of an even share per worker.
+			Other keyword arguments (weight, max_expansions, time_limit, ...) go to every a_star call.
+
+		Returns:
+			results (list): (path, stats) per query, in query order. path is a (N, dof) array of joint
+			configurations (empty if the search failed), stats the SearchStats of the search.
+		"""
+		return self.run(_plan_arm, [(start, goal_pt, kwargs) for start, goal_pt in queries], chunksize)
@@ -0,0 +1,247 @@
+"""
+Reproducible benchmarks for the planners in this directory.
+
+Runs seeded random grid problems (several sizes and obstacle densities) through AStarPlanner and GridPlanner (including Jump Point Search),
+and fixed obstacle scenes for the arm configurations used in arm_astar.py, arm_gui.py and arm_driver.py through ArmAStar.
+Reports expansions/sec, wall time, peak memory and path cost, and can save results as a JSON baseline or compare against one.
+
+Usage:
+	python benchmark.py                               # run and print
+	python benchmark.py --save benchmark_baseline.json
+	python benchmark.py --compare benchmark_baseline.json
+"""
+import argparse
+import json
+import time
+import tracemalloc
+import numpy as np
+from numpy import pi
+
+from general_astar import AStarPlanner, Node
+from grid_planner import GridPlanner, ACTIONS4, ACTIONS8
+
+class GridProblem(AStarPlanner):
+	"""
+	Occupancy grid planner built on AStarPlanner, with grid_astar's actions4 or actions8. States are (r, c) tuples.
+	Moves cost their Euclidean length and h is the Euclidean distance to the nearest goal.
+	"""
+	def __init__(self, grid, connectivity = 4):
+		assert connectivity in (4, 8), 'connectivity must be 4 or 8, got {}'.format(connectivity)
+		self.grid = grid
+		self.actions = ACTIONS8 if connectivity == 8 else ACTIONS4
+
+	def neighbors(self, n):
+		out = []
+		r, c = n.state
+		for dr, dc in self.actions:
+			new_r = r + dr
+			new_c = c + dc
+			if new_r < 0 or new_c < 0 or new_r >= self.grid.shape[0] or new_c >= self.grid.shape[1]:
+				continue
+			if self.grid[new_r, new_c] == 1:
+				continue
+			out.append(Node((new_r, new_c)))
+		return out
+
+	def cost(self, curr, n):
+		return ((curr.state[0] - n.state[0])**2 + (curr.state[1] - n.state[1])**2)**0.5
+
+	def h(self, n, G):
+		return min(((n.state[0] - g[0])**2 + (n.state[1] - g[1])**2)**0.5 for g in G)
+
+def random_grid(size, density, seed):
+	"""
+	Random occupancy grid like grid_astar.reset_grid makes, without pygame. Each cell is an obstacle with probability density.
+	The start (top left) and goal (bottom right) corners are kept free.
+	"""
+	rng = np.random.RandomState(seed)
+	grid = (rng.random_sample((size, size)) < density).astype(np.int32)
+	grid[0, 0] = 0
+	grid[-1, -1] = 0
+	return grid
+
+### PROBLEMS ###
+
+def grid_cases(sizes, densities, seed):
+	"""
+	Yields (name, run) pairs. run() solves the problem and returns (expanded, path cost, found).
+	"""
+	for size in sizes:
+		for density in densities:
+			grid = random_grid(size, density, seed)
+			start, goal = (0, 0), (size-1, size-1)
+			prefix = 'grid{}_d{:.2f}'.format(size, density)
+
+			def astar(grid = grid, start = start, goal = goal):
+				path, stats = GridProblem(grid).a_star(start, [goal], return_stats=True)
+				return stats.expanded, stats.path_cost, stats.found
+			yield prefix + '_astar4', astar
+
+			for connectivity, jump_points in ((4, False), (8, False), (8, True)):
+				def array_astar(grid = grid, start = start, goal = goal, connectivity = connectivity, jump_points = jump_points):
+					planner = GridPlanner(grid, connectivity, jump_points)
+					path = planner.plan(start, [goal])
+					found = len(path) > 0
+					return planner.expanded, planner.path_cost(path) if found else float('inf'), found
+				yield prefix + '_grid{}'.format(connectivity) + ('_jps' if jump_points else ''), array_astar
+
+def arm_links():
+	"""
+	Link configurations from the __main__ blocks of arm_astar.py, arm_gui.py and arm_driver.py.
+	"""
+	from link import Link, FixedLink
+	return {
+		'arm_astar_3dof': lambda: [
+			FixedLink(length = 5, angle = pi/2),
+			FixedLink(length = 0, angle = -pi/2),
+			Link(length = 3, min_angle = -1e4, max_angle=1e4, angle = pi/2),
+			FixedLink(length = 0, angle = -pi/2),
+			Link(length = 3, min_angle = -1e4, max_angle=1e4, angle = pi/2),
+			FixedLink(length = 0, angle = -pi/2),
+			Link(length = 3, min_angle = -1e4, max_angle=1e4, angle = pi/2),
+		],
+		'arm_gui_3dof': lambda: [
+			FixedLink(length = 5, angle = pi/2),
+			FixedLink(length = 0, angle = -pi/2),
+			Link(length = 6, max_angle=pi),
+			FixedLink(length = 0, angle = -pi/2),
+			Link(length = 4, max_angle=pi),
+			FixedLink(length = 0, angle = -pi/2),
+			Link(length = 4, max_angle=pi),
+		],
+		'arm_driver_2dof': lambda: [
+			FixedLink(length = 0, angle = pi/2),
+			Link(length = 11.8, angle = 0, min_angle = -1e4, max_angle = 1e4),
+			FixedLink(length = .12, angle = pi/2),
+			FixedLink(length = 0, angle = -pi/2),
+			Link(length = 11.8, angle = 0, min_angle = -1e4, max_angle = 1e4),
+		],
+	}
+
+def arm_scenes():
+	"""
+	Fixed obstacle scenes for each arm in arm_links, as (obstacles, goal) pairs. goal is a joint configuration in lattice
+	units (multiples of the arm's discretization), so it is reachable from the start configuration. Each scene needs
+	thousands of expansions: obstacles or joint limits rule out the greedy route towards the goal point.
+	"""
+	from obstacles import Circle, Box
+	return {
+		'arm_astar_3dof': [
+			([Circle(4.3, 9.5, 3.3), Circle(-10.3, -3.8, 2.7)], [30, 6, 10]),
+			([Circle(-4.2, 1.0, 3.3)], [-34, 12, 25]),
+			([Box(1.9, 5.1, 7.0, 5.9)], [21, -1, 14]),
+		],
+		'arm_gui_3dof': [
+			([Circle(7.1, 18.1, 1.4)], [0, 14, 21]),
+			([Box(10.9, -11.6, 12.3, -10.3)], [0, 13, 14]),
+			([Box(8.2, 13.3, 9.7, 14.8), Circle(17.9, -7.4, 0.8), Circle(-2.7, 11.7, 1.0)], [0, 11, 21]),
+		],
+		'arm_driver_2dof': [
+			([Circle(10.2, 15.6, 4.5), Box(-8.8, 10.3, -4.7, 14.3)], [23, -6]),
+			([Circle(-3.8, 2.5, 2.5)], [34, -24]),
+			([Box(5.1, 7.3, 10.3, 12.2)], [-26, 6]),
+		],
+	}
+
+def arm_cases(n_queries):
+	"""
+	Yields (name, run) pairs for the first n_queries scenes of each arm in arm_scenes. Each plans from the arm's zero
+	configuration (clipped to its joint limits) to the end-effector position of the scene's goal configuration.
+	"""
+	from arm import Arm
+	from arm_astar import ArmAStar
+
+	scenes = arm_scenes()
+	for arm_name, links in sorted(arm_links().items()):
+		discretization = 3*pi/180 if arm_name == 'arm_driver_2dof' else 5*pi/180
+		min_dist = 0.5 if arm_name == 'arm_driver_2dof' else 0.15
+		for q, (obstacles, goal) in enumerate(scenes[arm_name][:n_queries]):
+			arm = Arm(links(), obstacles = obstacles)
+			start = np.clip(np.zeros(len(arm.control_links)), arm.joint_min, arm.joint_max)
+			goal_pt = arm.get_end_effector_pose_from(np.array(goal) * discretization)[:2]
+
+			def run(arm = arm, start = start, goal_pt = goal_pt, discretization = discretization, min_dist = min_dist):
+				planner = ArmAStar(arm, discretization = discretization, min_dist = min_dist)
+				planner.goal_pt = goal_pt
+				path, stats = planner.a_star(start, planner.goal_fn, return_stats=True)
+				return stats.expanded, stats.path_cost, stats.found
+			yield '{}_q{}'.format(arm_name, q), run
+
+### HARNESS ###
+
+def measure(run, repeat, memory):
+	"""
+	Runs a problem repeat times and keeps the best wall time. Optionally runs it once more under tracemalloc for peak memory.
+	"""
+	best = float('inf')
+	for _ in range(repeat):
+		t0 = time.perf_counter()
+		expanded, path_cost, found = run()
+		best = min(best, time.perf_counter() - t0)
+
+	peak = None
+	if memory:
+		tracemalloc.start()
+		run()
+		peak = tracemalloc.get_traced_memory()[1]
+		tracemalloc.stop()
+
+	return {
+		'expanded': int(expanded),
+		'time': best,
+		'exp_per_sec': expanded / max(best, 1e-9),
+		'peak_mem_kb': None if peak is None else peak / 1024,
+		'path_cost': float(path_cost) if found else None,
+	}
+
+def report(name, result, baseline = None):
+	line = '{:<28} expanded = {:<8} time = {:8.4f}s {:10.0f} exp/s'.format(name, result['expanded'], result['time'], result['exp_per_sec'])
+	if result['peak_mem_kb'] is not None:
+		line += '  mem = {:9.1f}kB'.format(result['peak_mem_kb'])
+	line += '  cost = {}'.format('-' if result['path_cost'] is None else '{:.3f}'.format(result['path_cost']))
+	if baseline is not None and name in baseline:
+		base = baseline[name]
+		line += '  x{:.2f} speed'.format(base['time'] / max(result['time'], 1e-9))
+		if base['path_cost'] != result['path_cost'] and not (base['path_cost'] and result['path_cost'] and abs(base['path_cost'] - result['path_cost']) < 1e-6):
+			line += '  COST CHANGED (was {})'.format(base['path_cost'])
+	print(line)
+
+def main():
+	parser = argparse.ArgumentParser(description='Benchmark the A* planners')
+	parser.add_argument('--sizes', type=int, nargs='+', default=[25, 50, 100, 200], help='grid side lengths')
+	parser.add_argument('--densities', type=float, nargs='+', default=[0.1, 0.2, 0.3], help='grid obstacle densities (OBSTACLE_DENSITY)')
+	parser.add_argument('--arm_queries', type=int, default=3, help='number of fixed obstacle scenes per arm (see arm_scenes)')
+	parser.add_argument('--seed', type=int, default=0, help='seed for the random grids')
+	parser.add_argument('--repeat', type=int, default=1, help='runs per problem; the best time is kept')
+	parser.add_argument('--no_memory', action='store_true', help='skip the tracemalloc run used to measure peak memory')
+	parser.add_argument('--no_arms', action='store_true', help='only run the grid problems')
+	parser.add_argument('--save', type=str, default=None, help='write results to this JSON file')
+	parser.add_argument('--compare', type=str, default=None, help='compare against results in this JSON file')
+	args = parser.parse_args()
+
+	baseline = None
+	if args.compare:
+		with open(args.compare) as f:
+			baseline = json.load(f)['results']
+
+	cases = list(grid_cases(args.sizes, args.densities, args.seed))
+	if not args.no_arms:
+		cases += list(arm_cases(args.arm_queries))
+
+	results = {}
+	for name, run in cases:
+		results[name] = measure(run, args.repeat, not args.no_memory)
+		report(name, results[name], baseline)
+
+	if baseline is not None:
+		shared = [name for name in results if name in baseline]
+		if shared:
+			speedup = np.exp(np.mean([np.log(baseline[n]['time'] / max(results[n]['time'], 1e-9)) for n in shared]))
+			print('Geometric mean speedup over {} shared problems: x{:.2f}'.format(len(shared), speedup))
+
+	if args.save:
+		with open(args.save, 'w') as f:
+			json.dump({'args': vars(args), 'results': results}, f, indent=1, sort_keys=True)
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,126 @@
+import os
+import tempfile
+import numpy as np
+from numpy import pi
+
+class CSpaceMap:
+	"""
+	Forward kinematics tabulated over an arm's whole joint lattice, for planning repeatedly with the same arm.
+
+	The lattice has one cell per discretization step on each joint, indexed by the same integer keys ArmAStar.key produces.
+	Joints whose limits span a full turn (like the +/-1e4 links in the demos) wrap around every 2pi, so they only need 2pi/discretization cells.
+	Bounded joints get one cell per lattice point within their limits.
+
+	End-effector positions and a validity (collision free) flag for every cell are computed once in vectorized batches and stored in memory-mapped .npy files,
+	named by the arm's geometry hash and the discretization. Later maps for the same arm (in this process or another) just open the files.
+	Only practical for arms with few joints (2-3 DOF at a few degrees per step).
+	"""
+	def __init__(self, arm, discretization, cache_dir = None, batch_size = 2**16, max_cells = 10**7):
+		"""
+		Args:
+			arm: The arm to tabulate.
+			discretization: Joint step, as in ArmAStar.
+			cache_dir: Directory for the memory-mapped tables. Defaults to arm_cspace in the system temp directory.
+			batch_size: Number of configurations per forward kinematics batch while building.
+			max_cells: Refuse to build lattices larger than this.
+		"""
+		self.arm = arm
+		self.discretization = discretization
+
+		#Lattice bounds per joint in key units. Periodic joints use keys mod period.
+		turn = int(round(2*pi / discretization))
+		self.offset = []
+		self.period = []
+		self.shape = []
+		for lo, hi in zip(arm.joint_min, arm.joint_max):
+			if hi - lo >= 2*pi:
+				assert abs(turn * discretization - 2*pi) < 1e-6, 'discretization must divide 2pi to wrap joints with unbounded limits'
+				self.offset.append(0)
+				self.period.append(turn)
+				self.shape.append(turn)
+			else:
+				k_lo = int(np.ceil(lo / discretization - 1e-9))
+				k_hi = int(np.floor(hi / discretization + 1e-9))
+				self.offset.append(k_lo)
+				self.period.append(0)
+				self.shape.append(k_hi - k_lo + 1)
+		self.offset = np.array(self.offset, dtype=np.int64)
+		self.period = np.array(self.period, dtype=np.int64)
+		self.shape = tuple(self.shape)
+		self.size = int(np.prod(self.shape))
+		if self.size > max_cells:
+			raise ValueError('C-space lattice has {} cells (max_cells = {})'.format(self.size, max_cells))
+
+		if cache_dir is None:
+			cache_dir = os.path.join(tempfile.gettempdir(), 'arm_cspace')
+		os.makedirs(cache_dir, exist_ok = True)
+		name = 'cspace_{}_{:.10f}'.format(arm.geometry_hash(), discretization)
+		self.ee_path = os.path.join(cache_dir, name + '_ee.npy')
+		self.valid_path = os.path.join(cache_dir, name + '_valid.npy')
+
+		if not (os.path.exists(self.ee_path) and os.path.exists(self.valid_path)):
+			self.build(batch_size)
+		#Plain ndarray views of the memory maps index faster than np.memmap objects.
+		self.ee = np.asarray(np.load(self.ee_path, mmap_mode = 'r'))
+		self.valid = np.asarray(np.load(self.valid_path, mmap_mode = 'r'))
+		self.strides = np.array([int(np.prod(self.shape[d+1:])) for d in range(len(self.shape))], dtype = np.int64)
+		self.upper = np.array(self.shape, dtype = np.int64)
+		self.periodic = self.period > 0
+
+	def lattice_angles(self, flat):
+		"""
+		Joint angles of the lattice cells with the given flat indices, as a (N, dof) array.
+		"""
+		idx = np.stack(np.unravel_index(flat, self.shape), axis = 1)
+		return (idx + self.offset) * self.discretization
+
+	def build(self, batch_size):
+		"""
+		Evaluates forward kinematics for every lattice cell and writes the tables. Files are written under temporary names
+		and renamed into place, so a concurrent reader never sees a partial table.
+		"""
+		tmp_ee = self.ee_path + '.{}.tmp.npy'.format(os.getpid())
+		tmp_valid = self.valid_path + '.{}.tmp.npy'.format(os.getpid())
+		ee = np.lib.format.open_memmap(tmp_ee, mode = 'w+', dtype = np.float64, shape = (self.size, 2))
+		valid = np.lib.format.open_memmap(tmp_valid, mode = 'w+', dtype = bool, shape = (self.size,))
+		for start in range(0, self.size, batch_size):
+			flat = np.arange(start, min(start + batch_size, self.size))
+			angles = self.lattice_angles(flat)
+			ee[flat] = self.arm.get_end_effector_poses_batch(angles)[:, :2]
+			valid[flat] = self.valid_batch(angles)
+		ee.flush()
+		valid.flush()
+		del ee, valid
+		os.replace(tmp_ee, self.ee_path)
+		os.replace(tmp_valid, self.valid_path)
+
+	def valid_batch(self, angles):
+		"""
+		Validity stored for each lattice cell: whether the arm is clear of its workspace obstacles there.
+		Joint limits are not tabulated (periodic cells stand for many angles), so they are left to the planner.
+		"""
+		return self.arm.collision_free(angles)
+
+	def flat_index(self, keys):
+		"""
+		Maps (N, dof) integer lattice keys to flat table indices. Returns (flat, inside) where inside is False for keys off the table.
+		"""
+		keys = np.asarray(keys, dtype = np.int64).reshape(-1, len(self.shape))
+		idx = keys - self.offset
+		if self.periodic.any():
+			idx = np.where(self.periodic, idx % np.maximum(self.period, 1), idx)
+		inside = np.all((idx >= 0) & (idx < self.upper), axis = 1)
+		flat = idx @ self.strides
+		flat[~inside] = 0
+		return flat, inside
+
+	def lookup(self, keys):
+		"""
+		Looks up end-effector positions and validity for (N, dof) integer lattice keys.
+
+		Returns:
+			ee: (N, 2) array of end-effector (x, y) positions of the lattice points.
+			valid: (N,) boolean array. False for invalid cells and for keys outside the table.
+		"""
+		flat, inside = self.flat_index(keys)
+		return self.ee[flat], self.valid[flat] & inside
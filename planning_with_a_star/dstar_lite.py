@@ -0,0 +1,236 @@
+# Incremental replanning for occupancy grids (D* Lite).
+# Searches backwards from the goals, keeping g and rhs values for every cell
+# between calls. When a few cells change, only the cells whose cost-to-goal
+# actually changes are reprocessed, so replanning work grows with the size
+# of the change instead of the size of the map. Based on the optimized
+# D* Lite of Koenig and Likhachev (2002).
+
+import heapq
+import numpy as np
+
+from grid_planner import GridPlanner
+
+INF = float('inf')
+
+class DStarLite(GridPlanner):
+	"""Incremental A* replanner over an occupancy grid.
+
+	Uses the same padded grid layout, moves and costs as GridPlanner (cells
+	equal to 1 are obstacles, 4- or 8-connectivity). Typical use alongside
+	grid_astar, where GRID is updated in place:
+
+		planner = DStarLite(GRID, [g.data for g in goals])
+		path = planner.plan(start_state.data)
+		...  # some cells of GRID change
+		path = planner.replan(GRID, changed_cells)
+
+	g holds the cost-to-goal of each cell as of the last search and rhs its
+	one-step lookahead value. Cells where they differ are on the open list.
+	Both persist between calls, as flat Python lists (indexed like
+	GridPlanner's flat indices) since they are read one cell at a time.
+	"""
+	def __init__(self, grid, goals, connectivity = 4):
+		"""Builds a planner for the given occupancy grid and goal cells.
+
+		Args:
+			grid (2D array): Occupancy grid. Cells equal to 1 are blocked.
+			goals (list of [r,c]): Goal cells. Assumed non-empty.
+			connectivity (int): 4 or 8, as in GridPlanner.
+		"""
+		super().__init__(grid, connectivity)
+		self.goal_set = set(self.index(goal) for goal in goals)
+		self.start = None
+		self.last = None # Start cell the keys on the open list were computed for.
+		self.reset()
+
+	def reset(self):
+		"""Clears all search state."""
+		super().reset()
+		size = self.blocked.size
+		self.g_list = [INF] * size
+		self.rhs = [INF] * size
+		self.is_blocked = self.blocked_list() # GridPlanner's cached list. replan updates it along with self.blocked.
+		self.open_list = [] # Heap of (k1, k2, index). Entries not matching open_key are stale.
+		self.open_key = {} # Maps indices of open cells to their current key.
+		self.km = 0.0
+
+	def h(self, i):
+		"""Heuristic distance from the current start to flat index i."""
+		r, c = divmod(i, self.width)
+		s_r, s_c = divmod(self.start, self.width)
+		return self.distance(r - s_r, c - s_c)
+
+	def calculate_key(self, i):
+		"""Open list priority of i. The first part is rounded so that sums of sqrt(2) steps
+		taken in different orders still tie exactly, which the termination test relies on."""
+		m = min(self.g_list[i], self.rhs[i])
+		return (round(m + self.h(i) + self.km, 9), m)
+
+	def update_vertex(self, i):
+		"""Pushes i onto the open list if it is inconsistent (g != rhs), otherwise takes it off."""
+		if self.g_list[i] != self.rhs[i]:
+			key = self.calculate_key(i)
+			self.open_key[i] = key
+			heapq.heappush(self.open_list, (key[0], key[1], i))
+		elif i in self.open_key:
+			del self.open_key[i] # Its heap entry is now stale.
+
+	def lookahead(self, i):
+		"""One-step lookahead cost-to-goal of i: 0 for free goals, otherwise the best move into a neighbor's g."""
+		blocked = self.is_blocked
+		if blocked[i]:
+			return INF
+		if i in self.goal_set:
+			return 0.0
+		g = self.g_list
+		best = INF
+		for offset, step in self.moves:
+			j = i + offset
+			if not blocked[j] and step + g[j] < best:
+				best = step + g[j]
+		return best
+
+	def top_key(self):
+		"""Key of the best open cell, dropping stale heap entries. (inf, inf) if the open list is empty."""
+		open_list = self.open_list
+		open_key = self.open_key
+		while open_list:
+			k1, k2, i = open_list[0]
+			if open_key.get(i) == (k1, k2):
+				return (k1, k2)
+			heapq.heappop(open_list)
+		return (INF, INF)
+
+	def compute_shortest_path(self):
+		"""Processes inconsistent cells until the start's cost-to-goal is correct. Counts processed cells in self.expanded."""
+		g = self.g_list
+		rhs = self.rhs
+		blocked = self.is_blocked
+		goal_set = self.goal_set
+		open_key = self.open_key
+		moves = self.moves
+		update_vertex = self.update_vertex
+		s = self.start
+		while True:
+			k_old = self.top_key()
+			if not (k_old < self.calculate_key(s) or rhs[s] > g[s]):
+				break
+			i = heapq.heappop(self.open_list)[2]
+			self.expanded += 1
+			k_new = self.calculate_key(i)
+			if k_old < k_new:
+				# Key grew since it was queued (the start moved), requeue it.
+				open_key[i] = k_new
+				heapq.heappush(self.open_list, (k_new[0], k_new[1], i))
+			elif g[i] > rhs[i]:
+				# Overconsistent: its cost-to-goal dropped. Settle it and relax its neighbors.
+				g[i] = g_i = rhs[i]
+				del open_key[i]
+				for offset, step in moves:
+					j = i + offset
+					if not blocked[j] and step + g_i < rhs[j] and j not in goal_set:
+						rhs[j] = step + g_i
+						update_vertex(j)
+			else:
+				# Underconsistent: its cost-to-goal rose. Reset it and recompute everything that depended on it.
+				g_old = g[i]
+				g[i] = INF
+				rhs[i] = self.lookahead(i)
+				update_vertex(i)
+				for offset, step in moves:
+					j = i + offset
+					if not blocked[j] and rhs[j] == step + g_old:
+						rhs[j] = self.lookahead(j)
+						update_vertex(j)
+
+	def plan(self, start, goals = None):
+		"""Runs the initial search from start. Later changes go through replan.
+
+		Args:
+			start [r,c]: Starting cell.
+			goals (list of [r,c]): Optional. New goal cells. Defaults to the
+				goals the planner was built with.
+
+		Returns:
+			path (numpy array): (N, 2) int array of [r, c] cells from start to
+			a goal. An empty (0, 2) array indicates that the search has failed.
+		"""
+		if goals is not None:
+			self.goal_set = set(self.index(goal) for goal in goals)
+		self.reset()
+		self.start = self.last = self.index(start)
+		for goal in self.goal_set:
+			if not self.is_blocked[goal]:
+				self.rhs[goal] = 0.0
+				self.update_vertex(goal)
+		self.compute_shortest_path()
+		return self.extract_path()
+
+	def replan(self, grid, changed, start = None):
+		"""Repairs the last solution after some cells changed (and optionally the start moved).
+
+		Args:
+			grid (2D array): The updated occupancy grid. Only the changed cells are read.
+			changed (list of [r,c]): Cells whose occupancy may have changed since the last call.
+			start [r,c]: Optional. New starting cell, e.g. where the robot has moved along the path.
+
+		Returns:
+			path (numpy array): Same as plan. self.expanded counts the cells processed by this call only.
+		"""
+		assert self.start is not None, 'call plan before replan'
+		self.expanded = 0
+		if start is not None:
+			self.start = self.index(start)
+			self.km += self.h(self.last) # h from the new start to the old one.
+			self.last = self.start
+
+		grid = np.asarray(grid)
+		affected = set()
+		for cell in changed:
+			i = self.index(cell)
+			value = 1 if grid[int(cell[0]), int(cell[1])] == 1 else 0
+			if self.is_blocked[i] == value:
+				continue
+			self.is_blocked[i] = value
+			self.blocked.flat[i] = value
+			affected.add(i)
+			for offset, step in self.moves:
+				if not self.is_blocked[i + offset]: # Skips blocked cells, including the padding.
+					affected.add(i + offset)
+
+		for i in affected:
+			self.rhs[i] = self.lookahead(i)
+			self.update_vertex(i)
+		self.compute_shortest_path()
+		return self.extract_path()
+
+	def cost_to_goal(self):
+		"""Returns the cost of the current path from the start, inf if no goal is reachable."""
+		return self.rhs[self.start] # The start's own g may be left stale, its rhs is exact.
+
+	def extract_path(self):
+		"""Follows the cheapest moves from the start down the g values to a goal.
+
+		Returns:
+			path (numpy array): (N, 2) int array of [r, c] cells, or an empty (0, 2) array if no goal is reachable.
+		"""
+		g = self.g_list
+		blocked = self.is_blocked
+		i = self.start
+		if blocked[i] or self.cost_to_goal() == INF:
+			return np.zeros((0, 2), dtype=int)
+		path = [i]
+		while i not in self.goal_set:
+			best = INF
+			best_j = -1
+			for offset, step in self.moves:
+				j = i + offset
+				if not blocked[j] and step + g[j] < best:
+					best = step + g[j]
+					best_j = j
+			if best_j == -1 or len(path) > len(g):
+				return np.zeros((0, 2), dtype=int)
+			i = best_j
+			path.append(i)
+		rows, cols = np.divmod(np.array(path, dtype=np.int64), self.width)
+		return np.stack([rows - 1, cols - 1], axis=1)
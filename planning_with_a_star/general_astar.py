@@ -3,6 +3,10 @@
 # Last revised 7/7/2020
 
 import abc
+import heapq
+import itertools
+import time
+import numpy as np
 
 class State:
 	"""A State representation must be explicitly defined."""
@@ -33,6 +37,17 @@ class State:
 		# Check State's data here.
 		pass
 
+	def __hash__(self):
+		"""
+		Overrides the default implementation. NEEDS IMPLEMENTATION
+
+		States that are equal must hash equally, so that AStarPlanner.key can use them directly as dict keys.
+
+		Returns:
+			hash (int): Hash of this State's data.
+		"""
+		pass
+
 	def __repr__(self):
 		"""
 		Overrides the default implementation. OPTIONAL IMPLEMENTATION
@@ -47,6 +62,7 @@ class Node:
 	"""
 	def __init__(self, state):
 		self.state = state
+		self.key = None
 		self.g = 0
 		self.f = 0
 		self.prev = None
@@ -63,14 +79,232 @@ class Node:
 		"""
 		if type(self) != type(other):
 			return False
+		if self.key is not None and other.key is not None:
+			return self.key == other.key
 		equal = (self.state == other.state)
 		return equal if type(equal) is bool else all(equal) #do this to handle numpy arrays as state
 
 	def __repr__(self):
 		return str(self.state)+": g = "+str(self.g)+" f = "+str(self.f)
 
+class OpenList:
+	"""
+	Open list for A*. Nodes are kept in a binary heap ordered by f, with a hash index from State key to the open Node.
+
+	Replacing a Node with a better one for the same State leaves the old heap entry in place. Stale entries are
+	skipped when they reach the top of the heap (lazy deletion), so push and pop are both O(log N).
+	Nodes with equal f are popped in the order they were pushed.
+	"""
+	def __init__(self):
+		self.heap = []
+		self.index = {}
+		self.counter = itertools.count()
+
+	def __len__(self):
+		return len(self.index)
+
+	def __contains__(self, key):
+		return key in self.index
+
+	def get(self, key):
+		"""
+		Returns the open Node with the given State key, or None if there isn't one.
+		"""
+		return self.index.get(key)
+
+	def push(self, n):
+		"""
+		Adds Node n to the open list, replacing any open Node with the same State key.
+
+		Args:
+			n (Node): The Node to add. n.key must be set.
+		"""
+		self.index[n.key] = n
+		heapq.heappush(self.heap, (n.f, next(self.counter), n))
+
+	def pop(self):
+		"""
+		Removes and returns the open Node with the lowest f.
+
+		Returns:
+			n (Node): The best open Node.
+		"""
+		while self.heap:
+			n = heapq.heappop(self.heap)[-1]
+			if self.index.get(n.key) is n: # Otherwise n was replaced by a better Node.
+				del self.index[n.key]
+				return n
+		raise IndexError('pop from an empty OpenList')
+
+	def min_f(self):
+		"""
+		Returns the lowest f on the open list without removing its Node, or inf if the open list is empty.
+		"""
+		heap = self.heap
+		while heap:
+			n = heap[0][-1]
+			if self.index.get(n.key) is n:
+				return n.f
+			heapq.heappop(heap) # Drop the stale entry now, pop would skip it anyway.
+		return float('inf')
+
+	def nodes(self):
+		"""
+		Returns a list of all Nodes currently on the open list.
+		"""
+		return list(self.index.values())
+
+class SearchObserver:
+	"""
+	Receives incremental events from a search, e.g. to visualize it. The event methods are no-ops here; override the ones you need.
+
+	Redraws are rate limited: draw is called after an expansion only if at least every expansions and interval seconds have
+	passed since the last draw. Events themselves should stay cheap. Searches run with observer = None make no calls at all.
+	"""
+	def __init__(self, every = 1, interval = 0.0):
+		"""
+		Args:
+			every (int): Minimum number of expansions between draws.
+			interval (float): Minimum wall time in seconds between draws.
+		"""
+		self.every = every
+		self.interval = interval
+		self.since_draw = 0
+		self.last_draw = -float('inf')
+
+	def node_opened(self, n):
+		"""
+		Called when Node n is pushed onto the open list (including when it replaces a worse Node for the same State).
+		"""
+		pass
+
+	def node_closed(self, n):
+		"""
+		Called when Node n is popped from the open list for expansion.
+		"""
+		pass
+
+	def path_found(self, path):
+		"""
+		Called once with the path (list of Nodes) when the search succeeds.
+		"""
+		pass
+
+	def search_failed(self):
+		"""
+		Called once when the open list runs out without reaching a goal.
+		"""
+		pass
+
+	def draw(self):
+		"""
+		Redraw whatever this observer visualizes. Called at most as often as the rate limits allow.
+		"""
+		pass
+
+	def expanded(self):
+		"""
+		Called by the search after every expansion. Calls draw if the rate limits allow it.
+		"""
+		self.since_draw += 1
+		if self.since_draw < self.every:
+			return
+		now = time.perf_counter()
+		if now - self.last_draw < self.interval:
+			return
+		self.since_draw = 0
+		self.last_draw = now
+		self.draw()
+
+class GUIObserver(SearchObserver):
+	"""
+	Adapts the planner's update_gui hook to the observer interface. Keeps its own open and closed lists from the
+	node events and hands them to planner.update_gui on each (rate limited) draw.
+	"""
+	def __init__(self, planner, gui, every = 1, interval = 0.0):
+		super().__init__(every, interval)
+		self.planner = planner
+		self.gui = gui
+		self.open = {}
+		self.closed = []
+
+	def node_opened(self, n):
+		self.open[n.key] = n
+
+	def node_closed(self, n):
+		self.open.pop(n.key, None)
+		self.closed.append(n)
+
+	def path_found(self, path):
+		self.draw()
+
+	def search_failed(self):
+		self.draw()
+
+	def draw(self):
+		self.planner.update_gui(list(self.open.values()), self.closed, self.gui)
+
+class SearchStats:
+	"""
+	What a single a_star call cost. Counts are always recorded; the per-phase times are only filled in when
+	a_star is run with profile = True (they stay 0 otherwise).
+
+	Fields:
+		found: Whether a path was found.
+		path_length / path_cost: Number of Nodes on the path and its g value.
+		expanded: Nodes popped from the open list and expanded (the goal Node is not counted).
+		generated: Neighbors returned by neighbors().
+		duplicates: Neighbors dropped because their State was closed, or already open with an f at least as good.
+		invalid: Nodes dropped when popped because validate() rejected them (lazy planners only).
+		peak_open: Largest size the open list reached.
+		time_total: Wall time of the whole search in seconds.
+		time_neighbors / time_cost / time_h / time_goal: Seconds spent in neighbors, cost, h_batch and the goal test.
+		weight: Heuristic weight the search ran with (1 for plain A*).
+		bound: Suboptimality bound of the path found: its cost is at most bound times the optimal cost. inf if no path was found.
+		budget_exhausted: Whether the search stopped early because it ran out of time or expansions, or was cancelled.
+		cancelled: Whether the search was stopped through its cancel event.
+	"""
+	def __init__(self):
+		self.found = False
+		self.path_length = 0
+		self.path_cost = float('inf')
+		self.expanded = 0
+		self.generated = 0
+		self.duplicates = 0
+		self.invalid = 0
+		self.peak_open = 0
+		self.time_total = 0.0
+		self.time_neighbors = 0.0
+		self.time_cost = 0.0
+		self.time_h = 0.0
+		self.time_goal = 0.0
+		self.weight = 1.0
+		self.bound = float('inf')
+		self.budget_exhausted = False
+		self.cancelled = False
+
+	def as_dict(self):
+		"""
+		Returns the stats as a plain dict, e.g. for logging or json.
+		"""
+		return dict(vars(self))
+
+	def __repr__(self):
+		out = 'found = {}, path length = {}, path cost = {:.3f}, expanded = {}, generated = {}, duplicates = {}, peak open = {}, time = {:.4f}s'.format(self.found, self.path_length, self.path_cost, self.expanded, self.generated, self.duplicates, self.peak_open, self.time_total)
+		if self.time_neighbors or self.time_cost or self.time_h or self.time_goal:
+			out += ' (neighbors {:.4f}s, cost {:.4f}s, h {:.4f}s, goal {:.4f}s)'.format(self.time_neighbors, self.time_cost, self.time_h, self.time_goal)
+		if self.weight != 1.0:
+			out += ', weight = {}, bound = {}'.format(self.weight, self.bound)
+		if self.cancelled:
+			out += ', cancelled'
+		elif self.budget_exhausted:
+			out += ', budget exhausted'
+		return out
+
 class AStarPlanner(object, metaclass=abc.ABCMeta):
 
+	lazy = False # If True, a_star calls validate on each Node when it is popped (see validate).
+
 	@abc.abstractmethod
 	def neighbors(self, n):
 		"""
@@ -116,55 +350,158 @@ class AStarPlanner(object, metaclass=abc.ABCMeta):
 			min_cost (float): The minimum cost to any goal State from Node n.
 		"""
 		pass
+
+	def h_batch(self, nodes, G = None):
+		"""
+		Evaluates the heuristic on a batch of Nodes. OPTIONAL IMPLEMENTATION
+
+		a_star calls this once per expansion with all the new (not closed) neighbors, so planners with a
+		vectorized heuristic can override it. By default calls h on each Node.
+
+		Args:
+			nodes (list of Nodes): Nodes to evaluate the heuristic on.
+			G (list of States): The set of goal States.
+
+		Returns:
+			costs (list of floats): h(n, G) for each Node in nodes.
+		"""
+		return [self.h(n, G) for n in nodes]
+
+	def validate(self, n):
+		"""
+		Expensive validity check for Node n, e.g. collision checking. OPTIONAL IMPLEMENTATION
+
+		Only called when lazy is True: neighbors may then return Nodes without this check, and a_star runs it when a Node
+		is popped for expansion instead of when it is generated (Lazy Weighted A*). Nodes that fail are closed without being
+		expanded, so most generated Nodes, which are never popped, are never checked. The start Node is not checked.
+
+		Args:
+			n (Node): Node popped from the open list.
+
+		Returns:
+			valid (bool): Whether n may be expanded (or returned as a goal).
+		"""
+		return True
+
+	def reverse_neighbors(self, n):
+		"""
+		Predecessors of Node n: Nodes m such that n is among neighbors(m). OPTIONAL IMPLEMENTATION
+
+		Used by the backward half of bidirectional_a_star. Defaults to neighbors, which is right for symmetric
+		action sets (like actions4, actions8 or ArmAStar's 2-neighborhood), where every action can be undone.
+
+		Args:
+			n (Node): Node we're expanding backwards.
+
+		Returns:
+			predecessors (list of Nodes): Only sets state (and optionally key), like neighbors.
+		"""
+		return self.neighbors(n)
+
+	def reverse_cost(self, curr, n):
+		"""
+		Cost of the action from predecessor n to curr. OPTIONAL IMPLEMENTATION
+
+		Defaults to cost(n, curr).
+		"""
+		return self.cost(n, curr)
+
+	def h_reverse(self, n, s):
+		"""
+		Heuristic for the backward half of bidirectional_a_star: an estimate of the cost from State s to Node n. OPTIONAL IMPLEMENTATION
+
+		Defaults to h(n, [s]), which is right when h is symmetric (e.g. a distance between States).
+		"""
+		return self.h(n, [s])
+
+	def key(self, state):
+		"""
+		Returns a hashable key for the given State. OPTIONAL IMPLEMENTATION
+
+		Keys are used for duplicate detection on the open list, closed list membership and path reconstruction.
+		Two States must have equal keys exactly when they should be treated as the same search node, so planners
+		with continuous States should snap them to a lattice here.
+		By default hashable States are used directly and anything else (lists, numpy arrays) is converted to a tuple.
+
+		Args:
+			state (State): The State to compute a key for.
+
+		Returns:
+			key (hashable): The key for this State.
+		"""
+		try:
+			hash(state)
+			return state
+		except TypeError:
+			return tuple(state)
   
-	def backtrack(self, n, closed_list):
+	def backtrack(self, n, closed_list, parents = None):
 		"""
 		General backtracking function. Works for the above Node format.
 
-		Computes/returns the path preceding Node n by recursively backtracking through the Node.prev pointers.
+		Computes/returns the path preceding Node n by following the Node.prev pointers, or the parents dict when
+		the search was run with compact = True. The path is built back to front and reversed once, so this is O(path length).
 
 		Args:
 			n (Node): The Node we're backtracking from.
+			closed_list (dict): The closed list. Maps State keys to Nodes, or to States in compact mode.
+			parents (dict): Optional. Maps State keys of closed Nodes to the State key of their parent.
 
 		Returns:
 			path (list of Nodes): The entire path leading to this Node.
 		"""
-		curr = n
 		path = [n]
-		while curr.prev != None:
-			path.insert(0, curr.prev)
-			curr = curr.prev
+		if parents is None:
+			curr = n
+			while curr.prev is not None:
+				curr = curr.prev
+				path.append(curr)
+		else:
+			key = n.prev.key if n.prev is not None else None
+			while key is not None:
+				curr = Node(closed_list[key])
+				curr.key = key
+				path.append(curr)
+				key = parents[key]
+		path.reverse()
 		return path
 
-	def push(self, n, l):
+	def path_array(self, path):
 		"""
-		General unique-enforcing Push function.
-
-		Adds Node n to the given list. If another Node in the list has the same State as n, keeps the better Node based on its f value.
+		Stacks the States of a path into a single numpy array, e.g. for sending to the steppers or the GUI.
 
 		Args:
-			n (Node): The Node we're considering adding to the list.
-			list (list of Nodes): List to add the Node to.
+			path (list of Nodes): A path as returned by a_star.
 
 		Returns:
-			Directly edits the given list and thus returns nothing.
+			states (numpy array): A (len(path), ...) array where row i is the State of the i-th Node.
 		"""
-		add_n = True # Add n unless a better Node is found.
+		if len(path) == 0:
+			return np.zeros((0,))
+		return np.stack([np.asarray(n.state) for n in path])
 
-		for i in range(len(l)):
-			if l[i] == n: # list[i] has the same State as n...
-				if (n.f < l[i].f): # but n is better.
-					l.pop(i)
-				else: # but n is worse.
-					add_n = False
-				break
+	def push(self, n, open_list):
+		"""
+		General unique-enforcing Push function.
+
+		Adds Node n to the open list. If another Node on the open list has the same State key as n, keeps the better Node based on its f value.
 
-		if add_n:
-			l.append(n)
+		Args:
+			n (Node): The Node we're considering adding to the open list. n.key must be set.
+			open_list (OpenList): Open list to add the Node to.
+
+		Returns:
+			Directly edits the given open list and thus returns nothing.
+		"""
+		other = open_list.get(n.key)
+		if other is None or n.f < other.f: # Add n unless a better Node is already open.
+			open_list.push(n)
 
 	def update_gui(self, open_list, closed_list, gui):
 		"""
 		Updates the GUI grid based on the current open and closed lists. ENTIRELY OPTIONAL.
+
+		Called through a GUIObserver when a_star is given a gui.
     
 		Interfaces with the chosen GUI object using information from the current open and closed lists.
 	
@@ -175,7 +512,8 @@ class AStarPlanner(object, metaclass=abc.ABCMeta):
 		"""
 		pass
 
-	def a_star(self, s, G, gui=None):
+	def a_star(self, s, G, gui=None, compact=False, as_array=False, observer=None, profile=False, return_stats=False,
+			weight=1.0, max_expansions=None, time_limit=None, cost_bound=None, cancel=None):
 		"""General A* implementation. Works with above functions.
 
 		The corresponding line of pseudocode is labeled throughout.
@@ -183,40 +521,323 @@ class AStarPlanner(object, metaclass=abc.ABCMeta):
 		Args:
 			s (State): Starting State for the algorithm.
 			G (list of States): Goal States for the algorithm.
-			gui (): Optional GUI parameter.
+			gui (): Optional GUI parameter. Shorthand for observer = GUIObserver(self, gui).
+			compact (bool): If True, closed Nodes are not kept. The closed list only maps State keys to States and
+				parents are stored as State keys in a dict, so large searches don't hold the whole Node graph in memory.
+			as_array (bool): If True, return the path as a numpy array of States (see path_array).
+			observer (SearchObserver): Optional. Receives node opened/closed and path found events.
+			profile (bool): If True, also time the neighbors, cost, h and goal test calls (see SearchStats).
+			return_stats (bool): If True, return (path, stats) instead of just the path.
+			weight (float): Heuristic weight. Nodes are ordered by f = g + weight * h, so weights above 1 find a path
+				sooner at the cost of optimality. With an admissible, consistent h the path costs at most weight times the optimum.
+			max_expansions (int): Optional. Give up after expanding this many Nodes.
+			time_limit (float): Optional. Give up after this many seconds.
+			cost_bound (float): Optional. Drop Nodes whose g + h is at least this, i.e. only look for paths cheaper than
+				cost_bound (needs an admissible h). Used by anytime_a_star to skip work that can't improve its best path.
+			cancel (threading.Event): Optional. Checked before every expansion; once it is set the search gives up,
+				so another thread (or a GUI callback) can abandon a search that is no longer wanted.
 
 		Returns:
-			path (list of Nodes): Optimal path for the given planning problem.
-			An empty path indicates that the search has failed.
+			path (list of Nodes): Optimal path for the given planning problem (within weight of optimal if weight > 1).
+			An empty path indicates that the search has failed or ran out of budget (see SearchStats.budget_exhausted).
+			The SearchStats for the call are also stored in self.stats.
 		"""
-		open_list = [Node(s)] # Line 1. Converts starting State to Node.
-		closed_list = [] # Line 2
+		stats = SearchStats()
+		stats.weight = weight
+		self.stats = stats
+		clock = time.perf_counter
+		t_start = clock()
+		deadline = None if time_limit is None else t_start + time_limit
+
+		if observer is None and gui is not None:
+			observer = GUIObserver(self, gui)
+
+		start = Node(s)
+		start.key = self.key(s)
+		open_list = OpenList() # Line 1. Converts starting State to Node.
+		open_list.push(start)
+		if observer is not None:
+			observer.node_opened(start)
+		closed_list = {} # Line 2. Maps State keys to closed Nodes (or States if compact).
+		parents = {} if compact else None # Maps State keys to parent State keys if compact.
 
 		if type(G) is list:
 			g_fn = lambda x: x in G
 		else:
 			g_fn = G
 
+		path = [] # Line 15. Empty path indicates failure.
 		while len(open_list) != 0: # Line 3
-			open_list.sort(key=lambda x: x.f) # Keeps open list sorted by f.
-			self.update_gui(open_list, closed_list, gui) # Update the GUI.
-
-			curr = open_list.pop(0) # Line 4
+			if (max_expansions is not None and stats.expanded >= max_expansions) or (deadline is not None and clock() > deadline):
+				stats.budget_exhausted = True
+				break
+			if cancel is not None and cancel.is_set():
+				stats.budget_exhausted = stats.cancelled = True
+				break
+			stats.peak_open = max(stats.peak_open, len(open_list))
+			curr = open_list.pop() # Line 4. Open list is a heap keyed on f.
+			if observer is not None:
+				observer.node_closed(curr)
+			if self.lazy and curr.prev is not None and not self.validate(curr):
+				closed_list[curr.key] = curr.state if compact else curr # Never reopened, its State stays invalid.
+				stats.invalid += 1
+				continue
 
 			# Line 5. Scans over all goal states checking for equality.
-			if g_fn(curr.state):
-				print('found goal')
-				return self.backtrack(curr, closed_list) # Line 6
-
-			closed_list.append(curr) # Line 7
+			if profile:
+				t0 = clock()
+				is_goal = g_fn(curr.state)
+				stats.time_goal += clock() - t0
+			else:
+				is_goal = g_fn(curr.state)
+			if is_goal:
+				path = self.backtrack(curr, closed_list, parents) # Line 6
+				stats.found = True
+				stats.path_length = len(path)
+				stats.path_cost = curr.g
+				stats.bound = weight
+				if observer is not None:
+					observer.path_found(path)
+				break
 
-			for n in self.neighbors(curr): # Line 8
-			
-				# Line 9. Scans over closed list to ensure new node is not closed.
-				if n not in closed_list:
+			if compact: # Line 7
+				closed_list[curr.key] = curr.state
+				parents[curr.key] = curr.prev.key if curr.prev is not None else None
+				curr.prev = None # Children only reference curr, not the chain behind it.
+			else:
+				closed_list[curr.key] = curr
+			stats.expanded += 1
+
+			if profile:
+				t0 = clock()
+				children = self.neighbors(curr) # Line 8
+				stats.time_neighbors += clock() - t0
+			else:
+				children = self.neighbors(curr) # Line 8
+			stats.generated += len(children)
+
+			new_nodes = []
+			for n in children:
+				if n.key is None:
+					n.key = self.key(n.state)
+
+				# Line 9. Hash lookup to ensure new node is not closed.
+				if n.key not in closed_list:
+					new_nodes.append(n)
+			stats.duplicates += len(children) - len(new_nodes)
+
+			if profile:
+				t0 = clock()
+				new_h = self.h_batch(new_nodes, G)
+				stats.time_h += clock() - t0
+			else:
+				new_h = self.h_batch(new_nodes, G)
+
+			for n, n_h in zip(new_nodes, new_h):
+				if profile:
+					t0 = clock()
 					n.g = curr.g + self.cost(curr, n) # Line 11
-					n.f = n.g + self.h(n, G) # Line 12
-					n.prev = curr # Line 13
-					self.push(n, open_list) # Line 14
+					stats.time_cost += clock() - t0
+				else:
+					n.g = curr.g + self.cost(curr, n) # Line 11
+				if cost_bound is not None and n.g + n_h >= cost_bound:
+					continue # Can't lead to a path cheaper than cost_bound.
+				n.f = n.g + weight * n_h # Line 12
+				n.prev = curr # Line 13
+				self.push(n, open_list) # Line 14
+				if open_list.get(n.key) is n:
+					if observer is not None:
+						observer.node_opened(n)
+				else:
+					stats.duplicates += 1 # A Node at least as good is already open.
+
+			if observer is not None:
+				observer.expanded()
+
+		if observer is not None and not stats.found:
+			observer.search_failed()
+		stats.time_total = clock() - t_start
+
+		if as_array:
+			path = self.path_array(path)
+		return (path, stats) if return_stats else path
+
+	def anytime_a_star(self, s, G, weights=(5.0, 3.0, 2.0, 1.5, 1.25, 1.0), time_limit=None, max_expansions=None, callback=None, **kwargs):
+		"""Anytime A*: weighted A* searches with decreasing weights until the budget runs out.
+
+		The first search uses the largest weight and usually finds a (suboptimal) path quickly. Each later search uses the
+		next weight and only looks for paths cheaper than the best so far (see cost_bound in a_star), so every path it
+		reports is an improvement. The final weight of 1 is plain A*, so if the budget allows, the result is optimal.
 
-		return [] # Line 15. Empty path indicates failure.
+		Args:
+			s (State): Starting State for the algorithm.
+			G (list of States): Goal States for the algorithm.
+			weights (list of floats): Heuristic weights to search with, in decreasing order.
+			time_limit (float): Optional. Total wall time in seconds shared by all the searches.
+			max_expansions (int): Optional. Total Node expansions shared by all the searches.
+			callback (function): Optional. Called as callback(path, stats) each time a better path is found.
+				stats.bound is that path's suboptimality bound. The bounds (and pruning on cost_bound) assume h is admissible.
+			kwargs: Passed on to a_star (e.g. compact, observer, profile).
+
+		Returns:
+			path (list of Nodes): Best path found within the budget. An empty path indicates that no path was found in time.
+			self.stats holds the SearchStats of the search that found the returned path (or of the last search if none did),
+			and self.anytime_stats holds the SearchStats of every search that was run.
+		"""
+		clock = time.perf_counter
+		deadline = None if time_limit is None else clock() + time_limit
+		expansions_left = max_expansions
+		kwargs.pop('return_stats', None)
+		as_array = kwargs.pop('as_array', False)
+
+		best_path = []
+		best_stats = None
+		self.anytime_stats = []
+		for weight in weights:
+			if deadline is not None and clock() >= deadline:
+				break
+			if expansions_left is not None and expansions_left <= 0:
+				break
+			cost_bound = best_stats.path_cost if best_stats is not None else None
+			path, stats = self.a_star(s, G, return_stats=True, weight=weight, cost_bound=cost_bound,
+				max_expansions=expansions_left, time_limit=None if deadline is None else deadline - clock(), **kwargs)
+			self.anytime_stats.append(stats)
+			if expansions_left is not None:
+				expansions_left -= stats.expanded
+
+			if stats.found:
+				best_path = path
+				best_stats = stats
+				if callback is not None:
+					callback(path, stats)
+			elif not stats.budget_exhausted and weight <= 1.0:
+				# The search space holds no path cheaper than the best one (if any), so the best one is optimal.
+				# Only plain A* shows this: closed Nodes are never reopened, so with weight > 1 their g can be too
+				# high and cost_bound can prune Nodes that do lie on cheaper paths. Those searches just move on
+				# to the next weight, and the best path keeps the bound of the weight that found it.
+				if best_stats is not None:
+					best_stats.bound = 1.0
+				break
+			if stats.budget_exhausted or (stats.found and weight <= 1.0):
+				break
+
+		self.stats = best_stats if best_stats is not None else self.anytime_stats[-1] if self.anytime_stats else SearchStats()
+		if as_array:
+			best_path = self.path_array(best_path)
+		return best_path
+
+	def bidirectional_a_star(self, s, t, as_array=False, observer=None, return_stats=False):
+		"""Bidirectional A* between a start State and a single goal State.
+
+		Runs one A* forward from s (neighbors, cost, h(n, [t])) and one backward from t (reverse_neighbors, reverse_cost,
+		h_reverse(n, s)), always expanding the direction with the smaller open list. Whenever a State has been reached
+		from both sides, the path through it is a candidate. The search stops once the best candidate costs no more
+		than max(lowest f forward, lowest f backward): with admissible heuristics every path not found yet costs at
+		least that much, so the best candidate is optimal.
+
+		Args:
+			s (State): Starting State.
+			t (State): Goal State.
+			as_array (bool): If True, return the path as a numpy array of States (see path_array).
+			observer (SearchObserver): Optional. Receives node opened/closed events from both directions.
+			return_stats (bool): If True, return (path, stats) instead of just the path.
+
+		Returns:
+			path (list of Nodes): Optimal path from s to t. g values along it are forward costs from s.
+			An empty path indicates that the search has failed.
+			The SearchStats for the call are also stored in self.stats.
+		"""
+		stats = SearchStats()
+		self.stats = stats
+		clock = time.perf_counter
+		t_start = clock()
+
+		start = Node(s)
+		start.key = self.key(s)
+		goal = Node(t)
+		goal.key = self.key(t)
+
+		# Both directions as [open list, closed dict, neighbors fn, cost fn, heuristic fn].
+		forward = [OpenList(), {}, self.neighbors, self.cost, lambda n: self.h(n, [t])]
+		backward = [OpenList(), {}, self.reverse_neighbors, self.reverse_cost, lambda n: self.h_reverse(n, s)]
+		start.f = forward[4](start)
+		goal.f = backward[4](goal)
+		forward[0].push(start)
+		backward[0].push(goal)
+		if observer is not None:
+			observer.node_opened(start)
+			observer.node_opened(goal)
+
+		best_cost = 0.0 if start.key == goal.key else float('inf')
+		meet = (start, goal) if start.key == goal.key else None # (forward Node, backward Node) at the same State.
+
+		while len(forward[0]) != 0 and len(backward[0]) != 0:
+			if best_cost <= max(forward[0].min_f(), backward[0].min_f()):
+				break
+			stats.peak_open = max(stats.peak_open, len(forward[0]) + len(backward[0]))
+			this, other = (forward, backward) if len(forward[0]) <= len(backward[0]) else (backward, forward)
+			open_list, closed_list, neighbors, cost, h = this
+
+			curr = open_list.pop()
+			closed_list[curr.key] = curr
+			stats.expanded += 1
+			if observer is not None:
+				observer.node_closed(curr)
+
+			children = neighbors(curr)
+			stats.generated += len(children)
+			for n in children:
+				if n.key is None:
+					n.key = self.key(n.state)
+				if n.key in closed_list:
+					stats.duplicates += 1
+					continue
+				n.g = curr.g + cost(curr, n)
+				n.f = n.g + h(n)
+				if n.f >= best_cost:
+					stats.duplicates += 1
+					continue # Every path through n costs at least n.f, so it can't beat the best one.
+				n.prev = curr
+				self.push(n, open_list)
+				if open_list.get(n.key) is not n:
+					stats.duplicates += 1
+					continue
+				if observer is not None:
+					observer.node_opened(n)
+
+				# Has the other direction reached this State?
+				m = other[1].get(n.key)
+				if m is None:
+					m = other[0].get(n.key)
+				if m is not None and n.g + m.g < best_cost:
+					best_cost = n.g + m.g
+					meet = (n, m) if this is forward else (m, n)
+
+			if observer is not None:
+				observer.expanded()
+
+		path = []
+		if meet is not None:
+			path = self.backtrack(meet[0], forward[1])
+			curr = meet[1].prev
+			while curr is not None:
+				n = Node(curr.state)
+				n.key = curr.key
+				n.g = best_cost - curr.g
+				n.f = n.g
+				n.prev = path[-1]
+				path.append(n)
+				curr = curr.prev
+			stats.found = True
+			stats.path_length = len(path)
+			stats.path_cost = best_cost
+			stats.bound = 1.0
+			if observer is not None:
+				observer.path_found(path)
+		elif observer is not None:
+			observer.search_failed()
+		stats.time_total = clock() - t_start
+
+		if as_array:
+			path = self.path_array(path)
+		return (path, stats) if return_stats else path
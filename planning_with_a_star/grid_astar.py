@@ -5,8 +5,13 @@
 import pygame
 import numpy as np
 import random
+import heapq
+import itertools
 from math import sqrt
 
+from grid_planner import GoalIndex
+from general_astar import SearchObserver
+
 ### GLOBAL VARIABLES FOR GUI ###
 SIZE = 800
 CELL_SIZE = 30.0
@@ -70,6 +75,18 @@ class State:
 			return False
 		return ((self.data[0] == other.data[0]) and (self.data[1] == other.data[1]))
 
+	def __hash__(self):
+		"""Overrides the default implementation.
+
+		Equal States hash equally, so States can be stored in sets and dicts.
+		"""
+		return hash(self.key)
+
+	@property
+	def key(self):
+		"""Compact hashable key for this State: an (r, c) tuple of ints."""
+		return (int(self.data[0]), int(self.data[1]))
+
 	def __repr__(self):
 		"""Overrides the default implementation.
 		
@@ -191,11 +208,16 @@ def h(n, G):
 	
 	Args:
 		n (Node): Node to evaluate this heuristic on.
-		G (list of States): The set of goal States. Assumed non-empty.
+		G (GoalIndex or list of States): The set of goal States. Assumed
+			non-empty. a_star passes a GoalIndex so the nearest goal is found
+			without scanning every goal.
     
     Returns:
     	min_cost (float): The minimum cost to any goal State from Node n.
 	"""
+	if isinstance(G, GoalIndex):
+		return G.nearest_distance(n.state.data)
+
 	min_cost = euclidean(n.state, G[0]) # Initializes min safely.
 
 	for g in G: # Loop over all goal states to find which has minimum cost.
@@ -207,8 +229,8 @@ def h(n, G):
 def backtrack(n):
 	"""General backtracking function. Works for the above Node format.
 
-	Computes/returns the path preceding Node n by recursively backtracking
-	through the Node.prev pointers.
+	Computes/returns the path preceding Node n by following the Node.prev
+	pointers. The path is built back to front and reversed once.
 	
 	Args:
 		n (Node): The Node we're backtracking from.
@@ -218,63 +240,67 @@ def backtrack(n):
 	"""
 	curr = n
 	path = [n]
-	while curr.prev != None:
-		path.insert(0, curr.prev)
+	while curr.prev is not None:
 		curr = curr.prev
+		path.append(curr)
+	path.reverse()
 	return path
 
-def push(n, list):
+def push(n, open_list, open_index, counter):
 	"""General unique-enforcing Push function.
 
-	Adds Node n to the given list. If another Node in the list has the
-	same State as n, keeps the better Node based on its f value.
+	Adds Node n to the open list. If another open Node has the same State
+	key as n, keeps the better Node based on its f value. The replaced Node
+	stays in the heap and is skipped when popped.
 	
 	Args:
-		n (Node): The Node we're considering adding to the list.
-		list (list of Nodes): List to add the Node to.
+		n (Node): The Node we're considering adding to the open list.
+		open_list (list): Heap of (f, count, Node) entries.
+		open_index (dict): Maps State keys to the best open Node.
+		counter (itertools.count): Breaks ties in f by insertion order.
 
 	Returns:
-		Directly edits the given list and thus returns nothing.
+		Directly edits the given open list and index and thus returns nothing.
 	"""
-	add_n = True # Add n unless a better Node is found.
-
-	for i in range(len(list)):
-		if list[i] == n: # list[i] has the same State as n...
-			if (n.f < list[i].f): # but n is better.
-				list.pop(i)
-			else: # but n is worse.
-				add_n = False
-			break
-
-	if add_n:
-		list.append(n)
+	key = n.state.key
+	other = open_index.get(key)
+	if other is None or n.f < other.f: # Add n unless a better Node is open.
+		open_index[key] = n
+		heapq.heappush(open_list, (n.f, next(counter), n))
+
+class GridObserver(SearchObserver):
+	"""Draws the search onto the GUI grid as it runs.
+
+	Node events only recolor single GRID cells. The screen is redrawn at
+	most every interval seconds (by default 30 times a second), so
+	visualization cost stays bounded however many nodes are expanded.
+	"""
+	def __init__(self, gui, every = 1, interval = 1/30):
+		"""
+		Args:
+			gui (pygame.Surface): Screen to draw updates to.
+			every (int): Minimum number of expansions between redraws.
+			interval (float): Minimum seconds between redraws.
+		"""
+		super().__init__(every, interval)
+		self.gui = gui
 
-def update_gui(open_list, closed_list, gui):
-	"""Updates the GUI grid based on the current open and closed lists.
+	def node_opened(self, n):
+		GRID[n.state.data[0],n.state.data[1]] = 4
 
-	Interfaces with the GUI using information from the current
-	open and closed lists. Entirely optional but can help debugging.
-	
-	Args:
-		open_list (list of Nodes): Current open list.
-		closed_list (list of Nodes): Current closed list.
-		gui (pygame.Surface): Screen to draw updates to.
-	"""
-	for o in open_list:
-		GRID[o.state.data[0],o.state.data[1]] = 4
-	for c in closed_list:
-		GRID[c.state.data[0],c.state.data[1]] = 5
+	def node_closed(self, n):
+		GRID[n.state.data[0],n.state.data[1]] = 5
 
-	draw_grid(gui)
+	def draw(self):
+		draw_grid(self.gui)
 
-	text = "Currently running A*..."
-	font = pygame.font.SysFont('vira', 32)
-	draw_text(text, font, TEXT_CENTER, gui)
-	pygame.display.flip() # Update screen to display all changes made.
-	clock = pygame.time.Clock()
-	clock.tick(30) # Delays so user can process what's going on.
+		text = "Currently running A*..."
+		font = pygame.font.SysFont('vira', 32)
+		draw_text(text, font, TEXT_CENTER, self.gui)
+		pygame.display.flip() # Update screen to display all changes made.
+		pygame.event.pump() # Keeps the window responsive during long searches.
 
-def a_star(s, G, gui=None):
+def a_star(s, G, gui=None, observer=None):
 	"""General A* implementation. Works with above functions.
 
 	The corresponding line of pseudocode is labeled throughout.
@@ -282,44 +308,62 @@ def a_star(s, G, gui=None):
 	Args:
 		s (State): Starting State for the algorithm.
 		G (list of States): Goal States for the algorithm.
-		gui (): Optional GUI parameter.
+		gui (pygame.Surface): Optional screen. Shorthand for
+			observer = GridObserver(gui).
+		observer (SearchObserver): Optional. Receives node opened/closed
+			and path found events. With neither, the search is headless.
 
 	Returns:
 		path (list of Nodes): Optimal path for the given planning problem.
 		An empty path indicates that the search has failed.
 	"""
-	open_list = [Node(s)] # Line 1. Converts starting State to Node.
-	closed_list = [] # Line 2
-
-	while len(open_list) != 0: # Line 3
-		open_list.sort(key=lambda x: x.f) # Keeps open list sorted by f.
-		update_gui(open_list, closed_list, gui) # Update the GUI.
-
-		curr = open_list.pop(0) # Line 4
-
-		# Line 5. Scans over all goal states checking for equality.
-		for g in G:
-			if curr.state == g:
-				return backtrack(curr) # Line 6
-
-		closed_list.append(curr) # Line 7
+	if observer is None and gui is not None:
+		observer = GridObserver(gui)
+
+	start = Node(s)
+	open_list = [(start.f, 0, start)] # Line 1. Heap of (f, count, Node).
+	open_index = {s.key: start} # Maps State keys to open Nodes.
+	closed_list = {} # Line 2. Maps State keys to closed Nodes.
+	counter = itertools.count(1)
+	goal_index = GoalIndex([g.data for g in G]) # Nearest-goal queries and goal membership.
+	if observer is not None:
+		observer.node_opened(start)
+
+	while len(open_index) != 0: # Line 3
+		curr = heapq.heappop(open_list)[-1] # Line 4
+		while open_index.get(curr.state.key) is not curr: # Skips Nodes replaced by better ones.
+			curr = heapq.heappop(open_list)[-1]
+		del open_index[curr.state.key]
+		if observer is not None:
+			observer.node_closed(curr)
+
+		# Line 5. Hash lookup in the set of goal states.
+		if curr.state.data in goal_index:
+			path = backtrack(curr) # Line 6
+			if observer is not None:
+				observer.path_found(path)
+			return path
+
+		closed_list[curr.state.key] = curr # Line 7
 
 		for next in neighbors(curr): # Line 8
 			
-			# Line 9. Scans over closed list to ensure new node is not closed.
-			skip = False
-			for closed_node in closed_list:
-				if next == closed_node:
-					skip = True
-					break
-			if skip:
+			# Line 9. Hash lookup to ensure new node is not closed.
+			if next.state.key in closed_list:
 				continue # Line 10
 
 			next.g = curr.g + cost(curr, next) # Line 11
-			next.f = next.g + h(next, G) # Line 12
+			next.f = next.g + h(next, goal_index) # Line 12
 			next.prev = curr # Line 13
-			push(next, open_list) # Line 14
+			push(next, open_list, open_index, counter) # Line 14
+			if observer is not None and open_index.get(next.state.key) is next:
+				observer.node_opened(next)
+
+		if observer is not None:
+			observer.expanded()
 
+	if observer is not None:
+		observer.search_failed()
 	return [] # Line 15. Empty path indicates failure.
 
 ### A* CODE END ###
@@ -0,0 +1,486 @@
+# Array-backed A* for occupancy grids.
+# Same search as grid_astar.a_star, but every per-cell quantity lives in a
+# flat array indexed by cell and the open list is a heap of flat cell indices,
+# so it scales to grids with millions of cells. No pygame or GUI globals.
+
+import heapq
+import numpy as np
+from math import sqrt
+
+SQRT2 = sqrt(2)
+INF = float('inf')
+
+ACTIONS4 = [[0,1],[-1,0],[1,0],[0,-1]] # Same actions as grid_astar.actions4
+ACTIONS8 = [[-1,1],[0,1],[1,1],[-1,0],[1,0],[-1,-1],[0,-1],[1,-1]] # Same actions as grid_astar.actions8
+
+def euclidean(dr, dc):
+	"""Euclidean length of the offset (dr, dc)."""
+	return sqrt(float(dr)**2 + float(dc)**2)
+
+class GoalIndex:
+	"""Grid-bucket index over a set of goal cells for nearest-goal queries.
+
+	Goals are hashed into square buckets of side bucket_size. A query scans
+	rings of buckets outward from its own bucket and stops as soon as the
+	best distance found is no more than the distance to the unscanned
+	buckets, so it only looks at goals near the query instead of all |G|.
+	Exact for any metric at least as large as the Chebyshev distance
+	(Euclidean, octile, Manhattan).
+	"""
+	def __init__(self, goals, metric = euclidean, bucket_size = None):
+		"""Builds the index.
+
+		Args:
+			goals (list of [r,c]): Goal cells. Assumed non-empty.
+			metric (function): distance(dr, dc) between two cells.
+			bucket_size (int): Side of a bucket in cells. By default chosen
+				so there is about one goal per bucket.
+		"""
+		goals = np.asarray(goals, dtype=int).reshape(-1, 2)
+		self.metric = metric
+		self.goal_set = set(map(tuple, goals.tolist()))
+		self.lo = goals.min(axis=0)
+		hi = goals.max(axis=0)
+		if bucket_size is None:
+			area = float(np.prod(hi - self.lo + 1))
+			bucket_size = max(1, int(sqrt(area / len(self.goal_set))))
+		self.bucket_size = bucket_size
+		self.n_buckets = (hi - self.lo) // bucket_size + 1
+
+		self.buckets = {}
+		for r, c in self.goal_set:
+			b = ((r - self.lo[0]) // bucket_size, (c - self.lo[1]) // bucket_size)
+			self.buckets.setdefault(b, []).append((r, c))
+
+	def __contains__(self, cell):
+		return (int(cell[0]), int(cell[1])) in self.goal_set
+
+	def __len__(self):
+		return len(self.goal_set)
+
+	def nearest(self, cell):
+		"""Returns (distance, goal) for the goal nearest to the [r, c] cell."""
+		r, c = int(cell[0]), int(cell[1])
+		size = self.bucket_size
+		n_r, n_c = int(self.n_buckets[0]), int(self.n_buckets[1])
+		lo_r, lo_c = int(self.lo[0]), int(self.lo[1])
+		# Query bucket, clamped onto the bucket grid.
+		b_r = min(max((r - lo_r) // size, 0), n_r - 1)
+		b_c = min(max((c - lo_c) // size, 0), n_c - 1)
+
+		best = float('inf')
+		best_goal = None
+		k = 0
+		while True:
+			r0, r1 = b_r - k, b_r + k
+			c0, c1 = b_c - k, b_c + k
+			for i in range(max(r0, 0), min(r1, n_r - 1) + 1):
+				step = 1 if i in (r0, r1) else c1 - c0 # Only the ring's border.
+				for j in range(c0, c1 + 1, max(step, 1)):
+					for goal in self.buckets.get((i, j), ()):
+						d = self.metric(goal[0] - r, goal[1] - c)
+						if d < best:
+							best = d
+							best_goal = goal
+
+			# Any unscanned goal lies past one of the ring's unfinished sides.
+			bound = float('inf')
+			if r0 > 0:
+				bound = min(bound, r - (lo_r + r0*size))
+			if r1 < n_r - 1:
+				bound = min(bound, lo_r + (r1 + 1)*size - r)
+			if c0 > 0:
+				bound = min(bound, c - (lo_c + c0*size))
+			if c1 < n_c - 1:
+				bound = min(bound, lo_c + (c1 + 1)*size - c)
+			if best <= bound or bound == float('inf'):
+				return best, best_goal
+			k += 1
+
+	def nearest_distance(self, cell):
+		"""Returns the distance from the [r, c] cell to the nearest goal."""
+		return self.nearest(cell)[0]
+
+class GridPlanner:
+	"""A* planner over an int32 occupancy array.
+
+	Cells equal to 1 are obstacles, as in grid_astar.GRID. The grid is stored
+	with a one cell border of obstacles so neighbors never need bounds checks.
+	plan keeps g-scores, parents and closed flags in flat Python lists over
+	the padded grid, since its inner loop reads them one cell at a time.
+	They are allocated once and only the cells a search touched are cleared.
+	Jump Point Search keeps them in numpy arrays of the padded grid's shape
+	instead, reset at the start of every search. Those are only allocated
+	for planners built with jump_points = True.
+
+	With jump_points = True (8-connectivity only), plan runs Jump Point
+	Search instead: only jump points, where an optimal path may have to
+	turn, are put on the open list, and straight and diagonal runs between
+	them are scanned without touching the heap. Paths have the same cost as
+	plain A* but far fewer expansions on open maps.
+	"""
+	def __init__(self, grid, connectivity = 4, jump_points = False):
+		"""Builds a planner for the given occupancy grid.
+
+		Args:
+			grid (2D array): Occupancy grid. Cells equal to 1 are blocked.
+			connectivity (int): 4 for actions4, 8 for actions8. Diagonal
+				moves cost sqrt(2), straight moves cost 1.
+			jump_points (bool): Use Jump Point Search. Needs connectivity 8.
+		"""
+		assert connectivity in (4, 8), 'connectivity must be 4 or 8, got {}'.format(connectivity)
+		assert connectivity == 8 or not jump_points, 'jump point search needs connectivity 8'
+		self.connectivity = connectivity
+		self.jump_points = jump_points
+		self.shape = np.shape(grid)
+		self.width = self.shape[1] + 2
+
+		self.blocked = np.ones((self.shape[0] + 2, self.shape[1] + 2), dtype=np.int32)
+		self.blocked_flat = None # self.blocked as a flat list, built on first use by blocked_list.
+		self.set_grid(grid)
+
+		actions = ACTIONS8 if connectivity == 8 else ACTIONS4
+		self.moves = [(a[0]*self.width + a[1], SQRT2 if a[0] and a[1] else 1.0) for a in actions]
+
+		self.g = self.parent = self.closed = None # Jump Point Search's arrays.
+		if jump_points:
+			self.g = np.full(self.blocked.shape, np.inf)
+			self.parent = np.full(self.blocked.shape, -1, dtype=np.int64)
+			self.closed = np.zeros(self.blocked.shape, dtype=bool)
+		self.g_flat = None # plan's flat lists, allocated on its first call.
+		self.parent_flat = None
+		self.closed_flat = None
+		self.expanded = 0
+
+	def set_grid(self, grid):
+		"""Replaces the occupancy grid. Must have the same shape as before.
+
+		Args:
+			grid (2D array): Occupancy grid. Cells equal to 1 are blocked.
+		"""
+		grid = np.asarray(grid)
+		assert grid.shape == self.shape, 'expected grid of shape {}, got {}'.format(self.shape, grid.shape)
+		self.blocked[1:-1, 1:-1] = (grid == 1)
+		self.blocked_flat = None
+
+	def blocked_list(self):
+		"""Returns self.blocked as a flat list, converted once per grid.
+
+		Code that writes to self.blocked directly must set
+		self.blocked_flat = None afterwards (set_grid does this).
+		"""
+		if self.blocked_flat is None:
+			self.blocked_flat = self.blocked.ravel().tolist()
+		return self.blocked_flat
+
+	def index(self, cell):
+		"""Returns the flat (padded) index of the [r, c] cell."""
+		return (int(cell[0]) + 1)*self.width + int(cell[1]) + 1
+
+	def cell(self, i):
+		"""Returns the [r, c] cell of the flat (padded) index i."""
+		r, c = divmod(int(i), self.width)
+		return [r - 1, c - 1]
+
+	def distance(self, dr, dc):
+		"""Cost of the cheapest obstacle-free path covering (dr, dc).
+
+		Manhattan distance for 4-connectivity, octile distance for
+		8-connectivity. Used as the (admissible, consistent) heuristic.
+		"""
+		dr = abs(dr)
+		dc = abs(dc)
+		if self.connectivity == 4:
+			return float(dr + dc)
+		return float(dr + dc) + (SQRT2 - 2)*min(dr, dc)
+
+	def heuristic(self, goals):
+		"""Returns h(i): the distance from flat index i to the nearest goal.
+
+		A single goal is handled directly. Multiple goals go through a
+		GoalIndex built once per search.
+
+		Args:
+			goals (list of [r,c]): Goal cells.
+		"""
+		width = self.width
+		distance = self.distance
+		if len(goals) == 1:
+			# distance, inlined: h is called for every push.
+			gr, gc = goals[0][0] + 1, goals[0][1] + 1
+			if self.connectivity == 4:
+				def h(i):
+					r, c = divmod(i, width)
+					return float(abs(r - gr) + abs(c - gc))
+			else:
+				diagonal = SQRT2 - 2
+				def h(i):
+					r, c = divmod(i, width)
+					dr = abs(r - gr)
+					dc = abs(c - gc)
+					return float(dr + dc) + diagonal*(dr if dr < dc else dc)
+		else:
+			nearest = GoalIndex(goals, metric = distance).nearest
+			def h(i):
+				r, c = divmod(i, width)
+				return nearest((r - 1, c - 1))[0]
+		return h
+
+	def reset(self):
+		"""Clears Jump Point Search's arrays."""
+		if self.g is not None:
+			self.g.fill(np.inf)
+			self.parent.fill(-1)
+			self.closed.fill(False)
+		self.expanded = 0
+
+	def plan(self, start, goals):
+		"""Runs A* from start to the nearest of the goal cells.
+
+		Args:
+			start [r,c]: Starting cell.
+			goals (list of [r,c]): Goal cells. Assumed non-empty.
+
+		Returns:
+			path (numpy array): (N, 2) int array of [r, c] cells from start to
+			a goal. An empty (0, 2) array indicates that the search has failed.
+		"""
+		if self.jump_points:
+			return self.jump_point_search(start, goals)
+		s = self.index(start)
+		goal_set = set(self.index(g) for g in goals)
+		self.expanded = 0
+		if self.blocked.flat[s]:
+			return np.zeros((0, 2), dtype=int)
+
+		# The hot loop reads one cell at a time, which is much faster on flat Python lists than on numpy arrays.
+		# The lists are kept between searches and only the cells a search touched are cleared afterwards,
+		# so short queries on large grids don't pay for the whole grid.
+		if self.g_flat is None:
+			size = self.blocked.size
+			self.g_flat = [INF] * size
+			self.parent_flat = [-1] * size
+			self.closed_flat = bytearray(size)
+		h = self.heuristic(goals)
+		blocked = self.blocked_list()
+		g = self.g_flat
+		parent = self.parent_flat
+		closed = self.closed_flat
+		moves = self.moves
+		heappush = heapq.heappush
+		heappop = heapq.heappop
+
+		g[s] = 0.0
+		touched = [s]
+		h_s = h(s)
+		open_list = [(h_s, h_s, s)] # Heap of (f, h, index). Ties go to the Node closer to a goal.
+		expanded = 0
+		path = np.zeros((0, 2), dtype=int)
+
+		try:
+			while open_list:
+				i = heappop(open_list)[2]
+				if closed[i]:
+					continue # Stale entry, a cheaper one was already expanded.
+				closed[i] = 1
+				expanded += 1
+
+				if i in goal_set:
+					path = self.backtrack(i, parent)
+					break
+
+				g_i = g[i]
+				for offset, step in moves:
+					j = i + offset
+					if blocked[j] or closed[j]:
+						continue
+					g_j = g_i + step
+					if g_j < g[j]:
+						g[j] = g_j
+						parent[j] = i
+						touched.append(j)
+						h_j = h(j)
+						heappush(open_list, (g_j + h_j, h_j, j))
+		finally:
+			for j in touched:
+				g[j] = INF
+				parent[j] = -1
+				closed[j] = 0
+
+		self.expanded = expanded
+		return path
+
+	def jump_point_search(self, start, goals):
+		"""Runs Jump Point Search from start to the nearest of the goal cells.
+
+		Diagonal moves are allowed whenever the target cell is free, as in
+		plan. A Node's successors are pruned to its natural and forced
+		neighbors given the direction it was reached from, and each
+		successor direction is followed with jump until a jump point (a
+		goal, a cell with a forced neighbor, or for diagonal runs a cell
+		whose straight runs reach a jump point).
+
+		Args:
+			start [r,c]: Starting cell.
+			goals (list of [r,c]): Goal cells. Assumed non-empty.
+
+		Returns:
+			path (numpy array): Same as plan. Runs between jump points are
+			filled in, so consecutive cells are always neighbors.
+		"""
+		self.reset()
+		s = self.index(start)
+		goal_set = set(self.index(g) for g in goals)
+		if self.blocked.flat[s]:
+			return np.zeros((0, 2), dtype=int)
+
+		h = self.heuristic(goals)
+		g = self.g.ravel()
+		parent = self.parent.ravel()
+		closed = self.closed.ravel()
+		blocked = self.blocked_list() # List indexing is much faster than numpy in the scan loops.
+		width = self.width
+		jump = self.jump
+
+		g[s] = 0.0
+		h_s = h(s)
+		open_list = [(h_s, h_s, s)] # Heap of (f, h, index), as in plan.
+		expanded = 0
+
+		while open_list:
+			i = heapq.heappop(open_list)[2]
+			if closed[i]:
+				continue
+			closed[i] = True
+			expanded += 1
+
+			if i in goal_set:
+				self.expanded = expanded
+				return self.backtrack(i)
+
+			g_i = g[i]
+			for dr, dc in self.jump_directions(i, parent[i], blocked):
+				j = jump(i, dr, dc, blocked, goal_set)
+				if j == -1 or closed[j]:
+					continue
+				steps = abs(j // width - i // width) if dr else abs(j - i)
+				g_j = g_i + steps * (SQRT2 if dr and dc else 1.0)
+				if g_j < g[j]:
+					g[j] = g_j
+					parent[j] = i
+					h_j = h(j)
+					heapq.heappush(open_list, (g_j + h_j, h_j, j))
+
+		self.expanded = expanded
+		return np.zeros((0, 2), dtype=int)
+
+	def jump_directions(self, i, p, blocked):
+		"""Directions (dr, dc) to jump in from flat index i, reached from jump point p (-1 at the start).
+
+		Natural neighbors continue the incoming direction (and for diagonal
+		moves its two straight components). Forced neighbors are the turns
+		around an obstacle next to i that no path avoiding i takes as cheaply.
+		"""
+		width = self.width
+		if p == -1:
+			return [tuple(a) for a in ACTIONS8 if not blocked[i + a[0]*width + a[1]]]
+
+		r, c = divmod(i, width)
+		p_r, p_c = divmod(int(p), width)
+		dr = (r > p_r) - (r < p_r)
+		dc = (c > p_c) - (c < p_c)
+		dirs = []
+		if dr and dc:
+			if not blocked[i + dr*width]:
+				dirs.append((dr, 0))
+			if not blocked[i + dc]:
+				dirs.append((0, dc))
+			if not blocked[i + dr*width + dc]:
+				dirs.append((dr, dc))
+			if blocked[i - dr*width] and not blocked[i - dr*width + dc]:
+				dirs.append((-dr, dc))
+			if blocked[i - dc] and not blocked[i + dr*width - dc]:
+				dirs.append((dr, -dc))
+		elif dr:
+			if not blocked[i + dr*width]:
+				dirs.append((dr, 0))
+			for side in (-1, 1):
+				if blocked[i + side] and not blocked[i + dr*width + side]:
+					dirs.append((dr, side))
+		else:
+			if not blocked[i + dc]:
+				dirs.append((0, dc))
+			for side in (-1, 1):
+				if blocked[i + side*width] and not blocked[i + side*width + dc]:
+					dirs.append((side, dc))
+		return dirs
+
+	def jump(self, i, dr, dc, blocked, goal_set):
+		"""Scans from flat index i in direction (dr, dc) and returns the first jump point, or -1 if the scan hits an obstacle."""
+		width = self.width
+		step = dr*width + dc
+		j = i
+		if dr and dc:
+			while True:
+				j += step
+				if blocked[j]:
+					return -1
+				if j in goal_set:
+					return j
+				if (blocked[j - dr*width] and not blocked[j - dr*width + dc]) or (blocked[j - dc] and not blocked[j + dr*width - dc]):
+					return j # Forced neighbor.
+				if self.jump(j, dr, 0, blocked, goal_set) != -1 or self.jump(j, 0, dc, blocked, goal_set) != -1:
+					return j # A straight run from j reaches a jump point.
+		elif dr:
+			while True:
+				j += step
+				if blocked[j]:
+					return -1
+				if j in goal_set:
+					return j
+				if (blocked[j - 1] and not blocked[j + step - 1]) or (blocked[j + 1] and not blocked[j + step + 1]):
+					return j
+		else:
+			while True:
+				j += step
+				if blocked[j]:
+					return -1
+				if j in goal_set:
+					return j
+				if (blocked[j - width] and not blocked[j - width + dc]) or (blocked[j + width] and not blocked[j + width + dc]):
+					return j
+
+	def backtrack(self, i, parent = None):
+		"""Follows parent indices from flat index i back to the start.
+
+		Args:
+			i (int): Flat index to backtrack from.
+			parent (list): Optional. Flat parent indices, as plan keeps them.
+				Defaults to self.parent, as Jump Point Search keeps them.
+
+		Returns:
+			path (numpy array): (N, 2) int array of [r, c] cells ending at i.
+		"""
+		if parent is None:
+			parent = self.parent.ravel()
+		path = [i]
+		while parent[path[-1]] != -1:
+			p = int(parent[path[-1]])
+			if self.jump_points:
+				# Fill in the straight or diagonal run between jump points.
+				r, c = divmod(path[-1], self.width)
+				p_r, p_c = divmod(p, self.width)
+				step = ((p_r > r) - (p_r < r))*self.width + (p_c > c) - (p_c < c)
+				while path[-1] + step != p:
+					path.append(path[-1] + step)
+			path.append(p)
+		path.reverse()
+		rows, cols = np.divmod(np.array(path, dtype=np.int64), self.width)
+		return np.stack([rows - 1, cols - 1], axis=1)
+
+	def path_cost(self, path):
+		"""Returns the total cost of a path of [r, c] cells."""
+		if len(path) < 2:
+			return 0.0
+		steps = np.abs(np.diff(path, axis=0))
+		return float(np.sum(np.where(steps.sum(axis=1) == 2, SQRT2, 1.0)))
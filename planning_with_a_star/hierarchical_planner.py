@@ -0,0 +1,405 @@
+# Hierarchical path-finding A* (HPA*) for large occupancy grids.
+# The grid is split into square clusters. Free cells on either side of a
+# shared cluster border (or, with 8-connectivity, diagonally across it or
+# across a cluster corner) form entrances, and the costs between the entrances
+# of each cluster are precomputed. Queries search this small abstract graph
+# and then refine each abstract edge into cells with GridPlanner inside a
+# single cluster, so query cost grows with the number of clusters crossed
+# rather than the area of the map. Based on Botea, Mueller and Schaeffer (2004).
+
+import heapq
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from grid_planner import GridPlanner, GoalIndex, SQRT2, ACTIONS4, ACTIONS8
+
+class HierarchicalPlanner:
+	"""HPA* planner over an occupancy grid, in the layout of grid_astar.GRID.
+
+	Cells equal to 1 are obstacles. Abstract nodes are entrance cells,
+	identified by their flat index r * width + c. Edges between the two
+	cells of an entrance cost the move between them (1, or sqrt(2) for a
+	diagonal entrance). Edges between entrances of the same cluster cost
+	the shortest path between them inside the cluster, and are computed the
+	first time a query reaches the cluster, then cached.
+
+	The planner is complete: it finds a path whenever GridPlanner does with
+	the same connectivity. Paths are not optimal, though, since they cross
+	borders only at entrances, one or two per run of open border. They
+	typically cost a few percent more than GridPlanner's, but detours to an
+	entrance can make short paths on cluttered maps cost up to about 1.5
+	times as much, and more when clusters are only a few cells wide. Use
+	GridPlanner when the optimal path is needed.
+
+	HPA* only pays off on structured maps (rooms, corridors, walls with a
+	few gaps), where the flat search wastes its time flooding dead ends:
+	on one such map a query takes about 1.5 s against 60 s for GridPlanner.
+	On cluttered random maps the heuristic already guides GridPlanner well,
+	and HPA* is no faster: on a 4000 x 4000 map with 20% random obstacles,
+	a query takes about 11 s once the clusters it crosses are cached and
+	26 s before, against 10 s for GridPlanner.
+	"""
+	def __init__(self, grid, cluster_size = 32, connectivity = 4):
+		"""Splits the grid into clusters and finds every entrance.
+
+		Args:
+			grid (2D array): Occupancy grid. Cells equal to 1 are blocked.
+			cluster_size (int): Side of a cluster in cells.
+			connectivity (int): 4 or 8, for moves inside a cluster, as in GridPlanner.
+		"""
+		assert connectivity in (4, 8), 'connectivity must be 4 or 8, got {}'.format(connectivity)
+		self.connectivity = connectivity
+		self.cluster_size = cluster_size
+		self.free = np.asarray(grid) != 1
+		self.shape = self.free.shape
+		self.width = self.shape[1]
+		self.n_clusters = ((self.shape[0] - 1) // cluster_size + 1, (self.shape[1] - 1) // cluster_size + 1)
+		actions = ACTIONS8 if connectivity == 8 else ACTIONS4
+		self.moves = [(a[0], a[1], SQRT2 if a[0] and a[1] else 1.0) for a in actions]
+
+		self.border_pairs = {} # Maps border keys to lists of (cell on one side, cell on the other side) entrances.
+		self.inter = {} # Maps entrance cells to the cells across their borders.
+		self.intra = {} # Maps clusters to cached {entrance: [(entrance, cost), ...]} edges.
+		self.expanded = 0
+		for cr in range(self.n_clusters[0]):
+			for cc in range(self.n_clusters[1]):
+				for key in self.border_keys(cr, cc):
+					self.build_border(key)
+
+	def cluster_of(self, cell):
+		"""Returns the (row, column) of the cluster holding the flat index cell."""
+		r, c = divmod(cell, self.width)
+		return (r // self.cluster_size, c // self.cluster_size)
+
+	def bounds(self, cluster):
+		"""Returns (r0, r1, c0, c1), the cell ranges covered by a cluster."""
+		size = self.cluster_size
+		r0 = cluster[0] * size
+		c0 = cluster[1] * size
+		return r0, min(r0 + size, self.shape[0]), c0, min(c0 + size, self.shape[1])
+
+	def border_keys(self, cr, cc):
+		"""Keys of the borders below and to the right of cluster (cr, cc), and with 8-connectivity of its lower right corner."""
+		if self.connectivity == 8:
+			return (('v', cr, cc), ('h', cr, cc), ('d', cr, cc))
+		return (('v', cr, cc), ('h', cr, cc))
+
+	def build_border(self, key):
+		"""Finds the entrances across one cluster border.
+
+		Border ('v', cr, cc) is between clusters (cr, cc) and (cr, cc + 1),
+		('h', cr, cc) between (cr, cc) and (cr + 1, cc). Every maximal run of
+		cells free on both sides becomes one entrance at its middle, or two
+		at its ends if it is 6 cells or longer.
+
+		With 8-connectivity a move can also cross a border diagonally. Such
+		a pair of cells gets its own entrance when no straight pair next to
+		it is free, since otherwise it is reachable through that pair's run.
+		Corner ('d', cr, cc) is where clusters (cr, cc) and (cr + 1, cc + 1)
+		meet; its diagonals get an entrance when both other corner cells are
+		blocked.
+		"""
+		for a, b in self.border_pairs.pop(key, []):
+			self.inter[a].remove(b)
+			self.inter[b].remove(a)
+			if not self.inter[a]:
+				del self.inter[a]
+			if not self.inter[b]:
+				del self.inter[b]
+
+		kind, cr, cc = key
+		r0, r1, c0, c1 = self.bounds((cr, cc))
+		if kind == 'd':
+			if r1 >= self.shape[0] or c1 >= self.shape[1]:
+				return
+			free = self.free
+			w = self.width
+			pairs = []
+			if free[r1 - 1, c1 - 1] and free[r1, c1] and not free[r1 - 1, c1] and not free[r1, c1 - 1]:
+				pairs.append(((r1 - 1) * w + c1 - 1, r1 * w + c1))
+			if free[r1 - 1, c1] and free[r1, c1 - 1] and not free[r1 - 1, c1 - 1] and not free[r1, c1]:
+				pairs.append(((r1 - 1) * w + c1, r1 * w + c1 - 1))
+			for a, b in pairs:
+				self.inter.setdefault(a, []).append(b)
+				self.inter.setdefault(b, []).append(a)
+			self.border_pairs[key] = pairs
+			return
+		if kind == 'v':
+			if c1 >= self.shape[1]:
+				return
+			near = self.free[r0:r1, c1 - 1]
+			far = self.free[r0:r1, c1]
+			cell = lambda k, side: (r0 + k) * self.width + c1 - 1 + side
+		else:
+			if r1 >= self.shape[0]:
+				return
+			near = self.free[r1 - 1, c0:c1]
+			far = self.free[r1, c0:c1]
+			cell = lambda k, side: (r1 - 1 + side) * self.width + c0 + k
+		cells = lambda k: (cell(k, 0), cell(k, 1))
+		open_pairs = near & far
+
+		padded = np.concatenate([[False], open_pairs, [False]])
+		edges = np.flatnonzero(padded[1:] != padded[:-1])
+		pairs = []
+		for start, end in zip(edges[::2], edges[1::2]):
+			if end - start >= 6:
+				pairs += [cells(start), cells(end - 1)]
+			else:
+				pairs.append(cells((start + end - 1) // 2))
+		if self.connectivity == 8:
+			# Diagonal crossings k -> k + 1 and k + 1 -> k with neither straight pair beside them free.
+			down = near[:-1] & far[1:] & ~near[1:] & ~far[:-1]
+			up = near[1:] & far[:-1] & ~near[:-1] & ~far[1:]
+			pairs += [(cell(k, 0), cell(k + 1, 1)) for k in np.flatnonzero(down).tolist()]
+			pairs += [(cell(k + 1, 0), cell(k, 1)) for k in np.flatnonzero(up).tolist()]
+		for a, b in pairs:
+			self.inter.setdefault(a, []).append(b)
+			self.inter.setdefault(b, []).append(a)
+		self.border_pairs[key] = pairs
+
+	def entrances(self, cluster):
+		"""Returns the entrance cells inside a cluster."""
+		cr, cc = cluster
+		keys = [('v', cr, cc), ('h', cr, cc), ('v', cr, cc - 1), ('h', cr - 1, cc)]
+		if self.connectivity == 8:
+			keys += [('d', cr, cc), ('d', cr, cc - 1), ('d', cr - 1, cc), ('d', cr - 1, cc - 1)]
+		cells = set()
+		for key in keys:
+			for pair in self.border_pairs.get(key, ()):
+				for b in pair:
+					if self.cluster_of(b) == cluster:
+						cells.add(b)
+		return sorted(cells)
+
+	def distances(self, cluster, sources):
+		"""Shortest path costs inside a cluster from each of the source cells.
+
+		Builds the cluster's cell graph as a sparse matrix and runs
+		scipy's Dijkstra from all sources in one call.
+
+		Returns:
+			dist (numpy array): (len(sources), rows, cols) costs, inf where unreachable.
+		"""
+		r0, r1, c0, c1 = self.bounds(cluster)
+		free = self.free[r0:r1, c0:c1]
+		rows, cols = free.shape
+		ids = np.arange(rows * cols).reshape(rows, cols)
+		tails = []
+		heads = []
+		costs = []
+		for dr, dc, step in self.moves:
+			dst = (slice(max(dr, 0), rows + min(dr, 0)), slice(max(dc, 0), cols + min(dc, 0)))
+			src = (slice(max(-dr, 0), rows + min(-dr, 0)), slice(max(-dc, 0), cols + min(-dc, 0)))
+			ok = free[src] & free[dst]
+			tails.append(ids[src][ok])
+			heads.append(ids[dst][ok])
+			costs.append(np.full(int(ok.sum()), step))
+		graph = csr_matrix((np.concatenate(costs), (np.concatenate(tails), np.concatenate(heads))), shape = (rows * cols, rows * cols))
+
+		local = [(cell // self.width - r0) * cols + cell % self.width - c0 for cell in sources]
+		return dijkstra(graph, indices = local).reshape(len(sources), rows, cols)
+
+	def cluster_edges(self, cluster):
+		"""Returns the cached intra-cluster edges of a cluster, computing them if needed."""
+		edges = self.intra.get(cluster)
+		if edges is None:
+			nodes = self.entrances(cluster)
+			r0, r1, c0, c1 = self.bounds(cluster)
+			edges = {}
+			if nodes:
+				rows, cols = np.divmod(np.array(nodes), self.width)
+				costs = self.distances(cluster, nodes)[:, rows - r0, cols - c0].tolist()
+				for a, row in zip(nodes, costs):
+					edges[a] = [(b, cost) for b, cost in zip(nodes, row) if b != a and cost < np.inf]
+			self.intra[cluster] = edges
+		return edges
+
+	def links(self, cell, targets):
+		"""Costs from cell to the entrances of its cluster and to any of targets inside the same cluster."""
+		cluster = self.cluster_of(cell)
+		r0, r1, c0, c1 = self.bounds(cluster)
+		dist = self.distances(cluster, [cell])[0]
+		out = []
+		for b in set(self.entrances(cluster)) | set(t for t in targets if self.cluster_of(t) == cluster):
+			r, c = divmod(b, self.width)
+			cost = dist[r - r0, c - c0]
+			if b != cell and cost < np.inf:
+				out.append((b, float(cost)))
+		return out
+
+	def step(self, a, b):
+		"""Cost of the single move between neighboring cells a and b: sqrt(2) if it is diagonal, else 1."""
+		return SQRT2 if a // self.width != b // self.width and a % self.width != b % self.width else 1.0
+
+	def distance(self, dr, dc):
+		"""Admissible heuristic distance, as GridPlanner.distance."""
+		dr = abs(dr)
+		dc = abs(dc)
+		if self.connectivity == 4:
+			return float(dr + dc)
+		return float(dr + dc) + (SQRT2 - 2)*min(dr, dc)
+
+	def heuristic(self, goals):
+		"""Returns h(cell): the distance from flat index cell to the nearest goal.
+
+		A single goal is handled directly, as in GridPlanner.heuristic.
+		Multiple goals go through a GoalIndex built once per query.
+
+		Args:
+			goals (list of [r,c]): Goal cells.
+		"""
+		width = self.width
+		if len(goals) == 1:
+			# distance, inlined: h is called for every push.
+			gr, gc = int(goals[0][0]), int(goals[0][1])
+			if self.connectivity == 4:
+				def h(cell):
+					r, c = divmod(cell, width)
+					return float(abs(r - gr) + abs(c - gc))
+			else:
+				diagonal = SQRT2 - 2
+				def h(cell):
+					r, c = divmod(cell, width)
+					dr = abs(r - gr)
+					dc = abs(c - gc)
+					return float(dr + dc) + diagonal*(dr if dr < dc else dc)
+		else:
+			nearest = GoalIndex([g for g in np.reshape(goals, (-1, 2))], metric = self.distance).nearest
+			def h(cell):
+				return nearest(divmod(cell, width))[0]
+		return h
+
+	def plan(self, start, goals):
+		"""Plans from start to the nearest of the goal cells.
+
+		Args:
+			start [r,c]: Starting cell.
+			goals (list of [r,c]): Goal cells. Assumed non-empty.
+
+		Returns:
+			path (numpy array): (N, 2) int array of [r, c] cells from start to
+			a goal. An empty (0, 2) array indicates that the search has failed.
+		"""
+		s = int(start[0]) * self.width + int(start[1])
+		goals = [g for g in goals if self.free[int(g[0]), int(g[1])]]
+		goal_cells = [int(g[0]) * self.width + int(g[1]) for g in goals]
+		goal_set = set(goal_cells)
+		if not self.free[int(start[0]), int(start[1])] or not goals:
+			return np.zeros((0, 2), dtype=int)
+
+		# Temporary edges from the start, and from each entrance into the goals of its cluster.
+		start_links = self.links(s, goal_cells)
+		goal_links = {}
+		for goal in goal_cells:
+			for b, cost in self.links(goal, []):
+				goal_links.setdefault(b, []).append((goal, cost))
+
+		h = self.heuristic(goals)
+
+		g = {s: 0.0}
+		parent = {s: None}
+		closed = set()
+		h_s = h(s)
+		open_list = [(h_s, h_s, s)] # Heap of (f, h, cell). Ties go to the node closer to a goal, as in GridPlanner.
+		self.expanded = 0
+		found = None
+		while open_list:
+			u = heapq.heappop(open_list)[2]
+			if u in closed:
+				continue
+			closed.add(u)
+			self.expanded += 1
+			if u in goal_set:
+				found = u
+				break
+
+			succ = [(b, self.step(u, b)) for b in self.inter.get(u, ())]
+			if u in self.inter:
+				succ += self.cluster_edges(self.cluster_of(u)).get(u, [])
+			if u == s:
+				succ += start_links
+			succ += goal_links.get(u, [])
+			for v, cost in succ:
+				g_v = g[u] + cost
+				if v not in closed and g_v < g.get(v, np.inf):
+					g[v] = g_v
+					parent[v] = u
+					h_v = h(v)
+					heapq.heappush(open_list, (g_v + h_v, h_v, v))
+
+		if found is None:
+			return np.zeros((0, 2), dtype=int)
+		abstract = [found]
+		while parent[abstract[-1]] is not None:
+			abstract.append(parent[abstract[-1]])
+		abstract.reverse()
+		self.abstract_path = abstract
+		return self.refine(abstract)
+
+	def refine(self, abstract):
+		"""Turns a path of abstract nodes into cells. Edges inside a cluster are searched with GridPlanner on that cluster only."""
+		path = [divmod(abstract[0], self.width)]
+		for u, v in zip(abstract, abstract[1:]):
+			cluster = self.cluster_of(u)
+			if self.cluster_of(v) != cluster:
+				path.append(divmod(v, self.width)) # Single (straight or diagonal) step across a border.
+				continue
+			r0, r1, c0, c1 = self.bounds(cluster)
+			local = GridPlanner(~self.free[r0:r1, c0:c1], self.connectivity)
+			u_r, u_c = divmod(u, self.width)
+			v_r, v_c = divmod(v, self.width)
+			segment = local.plan([u_r - r0, u_c - c0], [[v_r - r0, v_c - c0]])
+			path += [(r + r0, c + c0) for r, c in segment[1:]]
+		return np.array(path, dtype=int).reshape(-1, 2)
+
+	def update(self, grid, changed):
+		"""Updates the map after some cells changed. Only the clusters holding changed cells (and, for cells on a
+		cluster border, the clusters across it) lose their cached edges, and only the borders and corners holding
+		changed cells are searched for entrances again.
+
+		Args:
+			grid (2D array): The updated occupancy grid. Only the changed cells are read.
+			changed (list of [r,c]): Cells whose occupancy may have changed.
+		"""
+		grid = np.asarray(grid)
+		size = self.cluster_size
+		borders = set()
+		dirty = set()
+		for r, c in changed:
+			r, c = int(r), int(c)
+			self.free[r, c] = grid[r, c] != 1
+			cr, cc = r // size, c // size
+			dirty.add((cr, cc))
+			if r % size == size - 1:
+				borders.add(('h', cr, cc))
+			if r % size == 0 and cr > 0:
+				borders.add(('h', cr - 1, cc))
+			if c % size == size - 1:
+				borders.add(('v', cr, cc))
+			if c % size == 0 and cc > 0:
+				borders.add(('v', cr, cc - 1))
+			if self.connectivity == 8:
+				corner_rows = [cr] * (r % size == size - 1) + [cr - 1] * (r % size == 0 and cr > 0)
+				corner_cols = [cc] * (c % size == size - 1) + [cc - 1] * (c % size == 0 and cc > 0)
+				borders.update(('d', i, j) for i in corner_rows for j in corner_cols)
+		for key in borders:
+			self.build_border(key)
+			kind, cr, cc = key
+			dirty.add((cr, cc))
+			if kind != 'h':
+				dirty.add((cr, cc + 1))
+			if kind != 'v':
+				dirty.add((cr + 1, cc))
+			if kind == 'd':
+				dirty.add((cr + 1, cc + 1))
+		for cluster in dirty:
+			self.intra.pop(cluster, None)
+
+	def path_cost(self, path):
+		"""Returns the total cost of a path of [r, c] cells."""
+		if len(path) < 2:
+			return 0.0
+		steps = np.abs(np.diff(path, axis=0))
+		return float(np.sum(np.where(steps.sum(axis=1) == 2, SQRT2, 1.0)))
@@ -0,0 +1,86 @@
+import numpy as np
+
+class Circle:
+	"""
+	Circular workspace obstacle with center (x, y) and radius.
+	"""
+	def __init__(self, x, y, radius):
+		self.x = x
+		self.y = y
+		self.radius = radius
+
+	def __repr__(self):
+		return 'Circle obstacle center = ({:.2f}, {:.2f}), radius = {:.2f}'.format(self.x, self.y, self.radius)
+
+class Box:
+	"""
+	Axis-aligned box workspace obstacle covering [x_min, x_max] x [y_min, y_max].
+	"""
+	def __init__(self, x_min, y_min, x_max, y_max):
+		assert x_min <= x_max and y_min <= y_max, 'box corners out of order'
+		self.x_min = x_min
+		self.y_min = y_min
+		self.x_max = x_max
+		self.y_max = y_max
+
+	def __repr__(self):
+		return 'Box obstacle x = [{:.2f}, {:.2f}], y = [{:.2f}, {:.2f}]'.format(self.x_min, self.x_max, self.y_min, self.y_max)
+
+def circle_array(obstacles):
+	"""
+	Stacks the Circles among obstacles into a (K, 3) array of (x, y, radius) rows.
+	"""
+	return np.array([[o.x, o.y, o.radius] for o in obstacles if isinstance(o, Circle)], dtype=float).reshape(-1, 3)
+
+def box_array(obstacles):
+	"""
+	Stacks the Boxes among obstacles into a (K, 4) array of (x_min, y_min, x_max, y_max) rows.
+	"""
+	return np.array([[o.x_min, o.y_min, o.x_max, o.y_max] for o in obstacles if isinstance(o, Box)], dtype=float).reshape(-1, 4)
+
+def segments_hit_circles(p0, p1, circles):
+	"""
+	Tests segments against circles, all at once.
+
+	Args:
+		p0, p1: (..., 2) arrays of segment end points.
+		circles: (K, 3) array from circle_array.
+
+	Returns:
+		A (...) boolean array that is True for segments passing within the radius of any circle.
+	"""
+	p0 = p0[..., None, :]
+	d = p1[..., None, :] - p0
+	center = circles[:, :2]
+	length2 = np.maximum(np.sum(d * d, axis=-1), 1e-300) #Zero length segments are points.
+	t = np.clip(np.sum((center - p0) * d, axis=-1) / length2, 0.0, 1.0)
+	closest = p0 + t[..., None] * d
+	dist2 = np.sum((closest - center)**2, axis=-1)
+	return np.any(dist2 <= circles[:, 2]**2, axis=-1)
+
+def segments_hit_boxes(p0, p1, boxes):
+	"""
+	Tests segments against axis-aligned boxes, all at once, by clipping each segment to each box (Liang-Barsky).
+
+	Args:
+		p0, p1: (..., 2) arrays of segment end points.
+		boxes: (K, 4) array from box_array.
+
+	Returns:
+		A (...) boolean array that is True for segments that touch any box.
+	"""
+	p0 = p0[..., None, :]
+	d = p1[..., None, :] - p0
+	lo = boxes[:, :2]
+	hi = boxes[:, 2:]
+	with np.errstate(divide='ignore', invalid='ignore'):
+		t_lo = (lo - p0) / d
+		t_hi = (hi - p0) / d
+	#Segments parallel to an axis either always or never lie within that axis' slab.
+	parallel = d == 0
+	inside = (p0 >= lo) & (p0 <= hi)
+	t_in = np.where(parallel, np.where(inside, -np.inf, np.inf), np.minimum(t_lo, t_hi))
+	t_out = np.where(parallel, np.where(inside, np.inf, -np.inf), np.maximum(t_lo, t_hi))
+	enter = np.maximum(np.max(t_in, axis=-1), 0.0)
+	leave = np.minimum(np.min(t_out, axis=-1), 1.0)
+	return np.any(enter <= leave, axis=-1)
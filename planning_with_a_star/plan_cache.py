@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import tempfile
+import numpy as np
+
+class PlanCache:
+	"""
+	Persistent on-disk cache of solved arm plans, for replanning the same start/goal queries across runs.
+
+	Entries are keyed by the arm's geometry hash (link geometry and joint limits), the discretization, the start configuration
+	snapped to the lattice (ArmAStar.key) and the goal point snapped to a grid of goal_cell * min_dist.
+	Each path is stored as a .npy file of int8 lattice steps between consecutive states (one row per step, entries in {-1, 0, 1}),
+	so a path of N states over D joints takes (N-1)*D bytes plus the .npy header. Paths are rebuilt by adding the steps to the actual start.
+
+	An index.json file tracks entry sizes and last use. When the cache holds more than max_entries paths or max_bytes of path data,
+	the least recently used entries are deleted. Hits only update last use in memory, so reads never write the index; it is
+	written on the next put, clear or close (or when the cache is used as a context manager and the with block ends).
+	"""
+	def __init__(self, cache_dir = None, max_entries = 10000, max_bytes = 64 * 2**20, goal_cell = 0.5):
+		"""
+		Args:
+			cache_dir: Directory for the cache. Defaults to arm_plans in the system temp directory.
+			max_entries: Most paths to keep.
+			max_bytes: Most bytes of path files to keep.
+			goal_cell: Goal points are snapped to a grid with cells of goal_cell * min_dist. Goals in the same cell share an entry.
+		"""
+		if cache_dir is None:
+			cache_dir = os.path.join(tempfile.gettempdir(), 'arm_plans')
+		os.makedirs(cache_dir, exist_ok = True)
+		self.cache_dir = cache_dir
+		self.max_entries = max_entries
+		self.max_bytes = max_bytes
+		self.goal_cell = goal_cell
+		self.index_path = os.path.join(cache_dir, 'index.json')
+		self.hits = 0
+		self.misses = 0
+
+		self.index = {}
+		self.clock = 0
+		self.dirty = False #Whether self.index has changes that are not in index.json yet.
+		if os.path.exists(self.index_path):
+			try:
+				with open(self.index_path) as f:
+					data = json.load(f)
+				self.index = data['entries']
+				self.clock = data['clock']
+			except (ValueError, KeyError):
+				self.index = {} #Corrupt index, start over. Orphaned path files are overwritten as entries are re-added.
+
+	def __len__(self):
+		return len(self.index)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+	def key(self, planner, start):
+		"""
+		Cache key for planning from start to planner.goal_pt with an ArmAStar planner.
+		"""
+		cell = self.goal_cell * planner.min_dist
+		goal = np.floor(np.asarray(planner.goal_pt, dtype=float) / cell).astype(int).tolist()
+		h = hashlib.sha1()
+		h.update(planner.arm.geometry_hash().encode())
+		h.update(repr((float(planner.discretization), float(planner.min_dist), float(self.goal_cell), planner.key(start), goal)).encode())
+		return h.hexdigest()
+
+	def path_file(self, key):
+		return os.path.join(self.cache_dir, key + '.npy')
+
+	def get(self, key):
+		"""
+		Returns the (N-1, dof) int8 step array stored under key, or None.
+		"""
+		if key not in self.index:
+			self.misses += 1
+			return None
+		try:
+			steps = np.load(self.path_file(key))
+		except (IOError, ValueError):
+			del self.index[key]
+			self.dirty = True
+			self.misses += 1
+			return None
+		self.hits += 1
+		self.clock += 1
+		self.index[key]['used'] = self.clock
+		self.dirty = True
+		return steps
+
+	def put(self, key, steps):
+		"""
+		Stores a (N-1, dof) step array under key and evicts least recently used entries over the size caps.
+		"""
+		steps = np.asarray(steps, dtype=np.int8)
+		path = self.path_file(key)
+		tmp = path + '.{}.tmp.npy'.format(os.getpid())
+		np.save(tmp, steps)
+		os.replace(tmp, path)
+		self.clock += 1
+		self.index[key] = {'bytes': os.path.getsize(path), 'used': self.clock}
+		self.evict()
+		self.save_index()
+
+	def evict(self):
+		"""
+		Deletes least recently used entries until the cache is within max_entries and max_bytes.
+		"""
+		total = sum(e['bytes'] for e in self.index.values())
+		if len(self.index) <= self.max_entries and total <= self.max_bytes:
+			return
+		for key in sorted(self.index, key = lambda k: self.index[k]['used']):
+			if len(self.index) <= self.max_entries and total <= self.max_bytes:
+				break
+			total -= self.index.pop(key)['bytes']
+			try:
+				os.remove(self.path_file(key))
+			except OSError:
+				pass
+
+	def clear(self):
+		"""
+		Deletes every entry.
+		"""
+		for key in list(self.index):
+			try:
+				os.remove(self.path_file(key))
+			except OSError:
+				pass
+		self.index = {}
+		self.save_index()
+
+	def close(self):
+		"""
+		Writes the index if hits changed it since it was last written. The cache stays usable.
+		"""
+		if self.dirty:
+			self.save_index()
+
+	def save_index(self):
+		tmp = self.index_path + '.{}.tmp'.format(os.getpid())
+		with open(tmp, 'w') as f:
+			json.dump({'clock': self.clock, 'entries': self.index}, f)
+		os.replace(tmp, self.index_path)
+		self.dirty = False
@@ -0,0 +1,53 @@
+import numpy as np
+from numpy import pi
+
+from arm import Arm
+from link import Link, FixedLink
+from obstacles import Circle, Box
+
+def make_arm(obstacles = None):
+	return Arm([
+		FixedLink(length = 5, angle = pi/2),
+		FixedLink(length = 0, angle = -pi/2),
+		Link(length = 3, min_angle = -1e4, max_angle = 1e4, angle = pi/2),
+		FixedLink(length = 0, angle = -pi/2),
+		Link(length = 3, max_angle = pi),
+		FixedLink(length = 0, angle = -pi/2),
+		Link(length = 2, min_angle = -pi/2, max_angle = pi/2, angle = pi/2),
+	], obstacles = obstacles)
+
+def test_batch_matches_links():
+	arm = make_arm()
+	rng = np.random.RandomState(0)
+	angles = rng.uniform(-4, 4, (50, 3))
+	batch = arm.get_joint_poses_batch(angles)
+	assert batch.shape == (50, len(arm.links) + 1, 3)
+	for config, poses in zip(angles, batch):
+		arm.set_joint_space(config) # Clips to the joint limits, like the batch version.
+		assert np.allclose(poses, arm.get_joint_poses())
+		assert np.allclose(arm.get_joint_poses_from(config), poses)
+	assert np.allclose(arm.get_end_effector_poses_batch(angles), batch[:, -1])
+
+def test_links_are_not_modified():
+	arm = make_arm()
+	before = arm.get_joint_poses()
+	arm.get_joint_poses_batch(np.ones((4, 3)))
+	assert np.array_equal(arm.get_joint_poses(), before)
+
+def test_collision_free_matches_sampling():
+	obstacles = [Circle(3, 6, 1), Box(-4, 2, -2, 9)]
+	arm = make_arm(obstacles)
+	rng = np.random.RandomState(1)
+	angles = rng.uniform(-pi, pi, (300, 3))
+	free = arm.collision_free(angles)
+	assert free.any() and not free.all()
+	t = np.linspace(0.0, 1.0, 401)[:, None]
+	for config, f in zip(angles, free):
+		pts = arm.get_joint_poses_batch(config)[0, :, :2]
+		samples = np.concatenate([a + t * (b - a) for a, b in zip(pts[:-1], pts[1:])])
+		in_circle = np.linalg.norm(samples - [3, 6], axis=1) <= 1
+		in_box = np.all((samples >= [-4, 2]) & (samples <= [-2, 9]), axis=1)
+		if not (in_circle.any() or in_box.any()):
+			continue # Sampling can miss a graze, so only check sampled collisions.
+		assert not f
+	assert make_arm().collision_free(angles).all()
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from general_astar import Node
+from obstacles import Circle, Box
+from arm_astar import ArmAStar
+from test_arm import make_arm
+
+def test_key_snaps_drift():
+	planner = ArmAStar(make_arm(), discretization = 0.1)
+	state = np.zeros(3)
+	for _ in range(3):
+		state = state + [0.1, -0.1, 0.0] # Drifts off 0.3.
+	assert state[0] != 0.3
+	assert planner.key(state) == planner.key([0.3, -0.3, 0.0]) == (3, -3, 0)
+
+def test_node_equality_uses_keys():
+	a = Node(np.array([0.1, 0.2]))
+	b = Node(np.array([0.1 + 1e-12, 0.2]))
+	assert a != b
+	a.key = b.key = (1, 2)
+	assert a == b
+	assert Node((1, 2)) == Node((1, 2))
+
+def test_neighbors_match_expand_2n():
+	arm = make_arm()
+	planner = ArmAStar(arm)
+	curr = Node(np.array([0.3, 0.0, 0.5])) # The second joint is at its lower limit.
+	curr.key = planner.key(curr.state)
+	neighbors = planner.neighbors(curr)
+	expected = [n.state for n in planner.expand_2n(curr.state) if arm.valid_configurations(n.state[None])[0]]
+	assert len(neighbors) == len(expected) == 13 # 18, less the 5 that lower the second joint.
+	for n, state in zip(neighbors, expected):
+		assert np.array_equal(n.state, state)
+		assert n.key == planner.key(state)
+
+def test_lazy_matches_eager():
+	arm = make_arm([Circle(3.3, 6.4, 1.1), Box(-4, 2, -2, 9)])
+	rng = np.random.RandomState(3)
+	found = 0
+	for _ in range(8):
+		goal = np.clip(rng.uniform(-1.5, 1.5, 3), arm.joint_min, arm.joint_max)
+		goal_pt = arm.get_end_effector_pose_from(goal)[:2]
+		eager = ArmAStar(arm, min_dist = 0.3)
+		lazy = ArmAStar(arm, min_dist = 0.3, lazy = True)
+		path, stats = eager.plan(np.zeros(3), goal_pt, return_stats = True, max_expansions = 3000)
+		lazy_path, lazy_stats = lazy.plan(np.zeros(3), goal_pt, return_stats = True, max_expansions = 3000)
+		assert lazy_stats.found == stats.found
+		if stats.found:
+			found += 1
+			assert lazy_stats.path_cost == pytest.approx(stats.path_cost)
+			assert arm.collision_free(lazy.path_array(lazy_path)).all()
+	assert found
@@ -0,0 +1,98 @@
+import asyncio
+import numpy as np
+import pytest
+
+from async_planner import AsyncPlanner
+from benchmark import GridProblem, random_grid
+
+class RecordingProblem(GridProblem):
+	"""GridProblem that keeps the cancel Event and stats of every a_star call."""
+	def __init__(self, grid, connectivity = 4):
+		super().__init__(grid, connectivity)
+		self.calls = []
+
+	def a_star(self, s, G, **kwargs):
+		path = super().a_star(s, G, **kwargs)
+		self.calls.append((kwargs.get('cancel'), self.stats))
+		return path
+
+def walled_grid(n):
+	# The goal corner is walled off, so a search has to exhaust the grid to fail.
+	grid = np.zeros((n, n), dtype=np.int32)
+	grid[n - 2, n - 2:] = 1
+	grid[n - 2:, n - 2] = 1
+	return grid
+
+def test_result_matches_a_star():
+	grid = random_grid(30, 0.2, 0)
+	reference, reference_stats = GridProblem(grid, 8).a_star((0, 0), [(29, 29)], return_stats = True)
+	progress = []
+
+	async def main():
+		planner = AsyncPlanner(GridProblem(grid, 8), progress_every = 10)
+		try:
+			return await planner.plan((0, 0), [(29, 29)], progress = progress.append)
+		finally:
+			planner.close()
+
+	path, stats = asyncio.run(main())
+	assert stats.found and stats.path_cost == pytest.approx(reference_stats.path_cost)
+	assert [n.state for n in path] == [n.state for n in reference]
+	assert progress and all(p['expanded'] <= stats.expanded for p in progress)
+
+def test_submit_cancels_previous():
+	grid = walled_grid(150)
+	problem = RecordingProblem(grid)
+
+	async def main():
+		planner = AsyncPlanner(problem)
+		try:
+			first = planner.submit((0, 0), [(149, 149)])
+			await asyncio.sleep(0.05) # Let the first search start.
+			second = planner.submit((0, 0), [(3, 3)])
+			path, stats = await second
+			with pytest.raises(asyncio.CancelledError):
+				await first
+			return path, stats
+		finally:
+			planner.close()
+
+	path, stats = asyncio.run(main())
+	assert stats.found and stats.path_cost == 6
+	(cancel, first_stats), (second_cancel, second_stats) = problem.calls
+	assert cancel.is_set() and not second_cancel.is_set()
+	assert first_stats.cancelled and first_stats.expanded < 150 * 150 - 4
+
+def test_deadline():
+	grid = walled_grid(150)
+	problem = RecordingProblem(grid)
+
+	async def main():
+		planner = AsyncPlanner(problem)
+		try:
+			loop = asyncio.get_running_loop()
+			return await planner.plan((0, 0), [(149, 149)], deadline = loop.time() + 0.05)
+		finally:
+			planner.close()
+
+	path, stats = asyncio.run(main())
+	assert path == [] and stats.budget_exhausted and not stats.found
+	assert stats.expanded < 150 * 150 - 4
+
+def test_cancel_sets_event():
+	grid = walled_grid(150)
+	problem = RecordingProblem(grid)
+
+	async def main():
+		planner = AsyncPlanner(problem)
+		task = planner.submit((0, 0), [(149, 149)])
+		await asyncio.sleep(0.05)
+		planner.cancel()
+		with pytest.raises(asyncio.CancelledError):
+			await task
+		planner.executor.shutdown(wait = True) # The search returns at its next expansion.
+
+	asyncio.run(main())
+	(cancel, stats), = problem.calls
+	assert cancel.is_set() and stats.cancelled and not stats.found
+	assert stats.expanded < 150 * 150 - 4
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from multiprocessing import shared_memory
+
+from batch_planner import GridBatchPlanner, ArmBatchPlanner
+from grid_planner import GridPlanner
+from arm_astar import ArmAStar
+from benchmark import random_grid
+from obstacles import Circle
+from test_arm import make_arm
+
+def test_grid_batch_matches_serial():
+	grid = random_grid(40, 0.25, 0)
+	rng = np.random.RandomState(0)
+	queries = [(rng.randint(0, 40, 2).tolist(), rng.randint(0, 40, (rng.randint(1, 3), 2)).tolist()) for _ in range(20)]
+	serial = GridPlanner(grid, 8)
+	with GridBatchPlanner(grid, 8, max_workers = 2) as planner:
+		name = planner.block.name
+		results = planner.plan(queries, chunksize = 3)
+	assert len(results) == len(queries) and any(stats.found for path, stats in results)
+	for (start, goals), (path, stats) in zip(queries, results):
+		expected = serial.plan(start, goals)
+		assert stats.found == bool(len(expected))
+		if stats.found:
+			assert list(path[0]) == start # Results come back in query order.
+			assert stats.path_cost == pytest.approx(serial.path_cost(expected))
+	with pytest.raises(FileNotFoundError):
+		shared_memory.SharedMemory(name = name)
+
+def test_arm_batch_matches_serial():
+	arm = make_arm([Circle(3.3, 6.4, 1.1)])
+	rng = np.random.RandomState(1)
+	queries = []
+	for _ in range(6):
+		start = np.clip(rng.uniform(-1, 1, 3), arm.joint_min, arm.joint_max)
+		goal = np.clip(rng.uniform(-1.5, 1.5, 3), arm.joint_min, arm.joint_max)
+		queries.append((start, arm.get_end_effector_pose_from(goal)[:2]))
+	serial = ArmAStar(arm, min_dist = 0.3)
+	planner = ArmBatchPlanner(arm, min_dist = 0.3, max_workers = 2)
+	try:
+		results = planner.plan(queries, max_expansions = 5000)
+	finally:
+		planner.close()
+	assert len(results) == len(queries) and any(stats.found for path, stats in results)
+	for (start, goal_pt), (path, stats) in zip(queries, results):
+		expected, expected_stats = serial.plan(start, goal_pt, as_array = True, return_stats = True, max_expansions = 5000)
+		assert stats.found == expected_stats.found
+		assert stats.path_cost == pytest.approx(expected_stats.path_cost)
+		assert np.allclose(path, expected)
+	with pytest.raises(FileNotFoundError):
+		shared_memory.SharedMemory(name = planner.block.name)
@@ -0,0 +1,39 @@
+import numpy as np
+from numpy import pi
+
+from obstacles import Circle
+from arm_astar import ArmAStar
+from cspace import CSpaceMap
+from test_arm import make_arm
+
+def test_cspace_lookup(tmp_path):
+	arm = make_arm([Circle(3.3, 6.4, 1.1)])
+	discretization = 10 * pi / 180
+	cspace = CSpaceMap(arm, discretization, cache_dir = str(tmp_path), batch_size = 100)
+	planner = ArmAStar(arm, discretization = discretization)
+	rng = np.random.RandomState(2)
+	angles = np.column_stack([rng.uniform(-20, 20, 200), rng.uniform(-0.5, pi + 0.5, 200), rng.uniform(-pi/2 - 0.5, pi/2 + 0.5, 200)])
+	keys = np.array([planner.key(a) for a in angles])
+	snapped = keys * discretization
+	ee, valid = cspace.lookup(keys)
+	# Joint 0 wraps around, the other two are only tabulated within their limits. Keys off the table are invalid.
+	inside = np.all((snapped[:, 1:] >= arm.joint_min[1:] - 1e-9) & (snapped[:, 1:] <= arm.joint_max[1:] + 1e-9), axis=1)
+	assert inside.any() and not inside.all()
+	assert np.array_equal(valid, inside & arm.collision_free(snapped))
+	assert np.allclose(ee[inside], arm.get_end_effector_poses_batch(snapped[inside])[:, :2])
+
+	# A second map for the same arm opens the stored tables instead of rebuilding them.
+	again = CSpaceMap(arm, discretization, cache_dir = str(tmp_path), batch_size = 1)
+	assert np.array_equal(again.ee, cspace.ee) and np.array_equal(again.valid, cspace.valid)
+
+def test_cspace_planner_matches(tmp_path):
+	arm = make_arm([Circle(3.3, 6.4, 1.1)])
+	start = np.zeros(3)
+	goal_pt = arm.get_end_effector_pose_from([1.2, 1.0, -0.6])[:2]
+	plain = ArmAStar(arm, discretization = 10 * pi / 180, min_dist = 0.5)
+	tabled = ArmAStar(arm, discretization = 10 * pi / 180, min_dist = 0.5, cspace = True, cspace_dir = str(tmp_path))
+	path, stats = plain.plan(start, goal_pt, return_stats = True)
+	cspace_path, cspace_stats = tabled.plan(start, goal_pt, return_stats = True)
+	assert stats.found and cspace_stats.found
+	assert cspace_stats.path_cost == stats.path_cost
+	assert np.allclose(plain.path_array(path), tabled.path_array(cspace_path))
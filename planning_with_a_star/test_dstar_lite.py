@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from dstar_lite import DStarLite
+from grid_planner import GridPlanner
+
+@pytest.mark.parametrize('connectivity', [4, 8])
+def test_replan_matches_fresh_plan(connectivity):
+	rng = np.random.RandomState(0)
+	for _ in range(60):
+		n = rng.randint(5, 25)
+		grid = (rng.random_sample((n, n)) < 0.25).astype(np.int32)
+		goal = rng.randint(0, n, 2).tolist()
+		start = rng.randint(0, n, 2).tolist()
+		planner = DStarLite(grid, [goal], connectivity)
+		path = planner.plan(start)
+		for _ in range(5):
+			changed = rng.randint(0, n, (3, 2)).tolist()
+			for r, c in changed:
+				grid[r, c] = 1 - grid[r, c]
+			if len(path) > 2 and rng.rand() < 0.5:
+				start = path[1].tolist() # The robot moved one step along the old path.
+			path = planner.replan(grid, changed, start)
+
+			fresh = GridPlanner(grid, connectivity)
+			optimal = fresh.plan(start, [goal])
+			assert bool(len(path)) == bool(len(optimal))
+			if len(optimal):
+				assert list(path[0]) == start and list(path[-1]) == goal
+				assert all(grid[r, c] != 1 for r, c in path)
+				assert planner.path_cost(path) == pytest.approx(fresh.path_cost(optimal))
+				assert planner.cost_to_goal() == pytest.approx(fresh.path_cost(optimal))
+			else:
+				assert planner.cost_to_goal() == float('inf')
+			assert planner.is_blocked == planner.blocked.ravel().tolist()
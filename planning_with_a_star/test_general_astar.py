@@ -0,0 +1,203 @@
+import numpy as np
+import pytest
+
+from general_astar import Node, OpenList, SearchObserver
+from benchmark import GridProblem, random_grid
+
+@pytest.mark.parametrize('connectivity', [4, 8])
+def test_anytime_matches_a_star(connectivity):
+	# Regression: a failed bounded search with weight > 1 used to be taken as proof that the incumbent was optimal.
+	for seed in range(200):
+		grid = random_grid(15, 0.3, seed)
+		planner = GridProblem(grid, connectivity)
+		start, goal = (0, 0), (14, 14)
+		path, stats = planner.a_star(start, [goal], return_stats = True)
+		best = planner.anytime_a_star(start, [goal], weights = (5.0, 2.0, 1.0))
+		assert planner.stats.found == stats.found
+		if not stats.found:
+			continue
+		assert planner.stats.path_cost == pytest.approx(stats.path_cost)
+		assert planner.stats.bound == 1.0
+		assert best[-1].state == goal
+
+def test_anytime_bound_without_plain_pass():
+	# Without a final weight of 1, every reported path must still be within its bound of the optimum.
+	for seed in range(1000, 1100):
+		grid = random_grid(15, 0.3, seed)
+		planner = GridProblem(grid, 8)
+		path, stats = planner.a_star((0, 0), [(14, 14)], return_stats = True)
+		planner.anytime_a_star((0, 0), [(14, 14)], weights = (5.0, 2.0))
+		if stats.found:
+			assert planner.stats.bound > 1.0
+			assert planner.stats.path_cost <= planner.stats.bound * stats.path_cost + 1e-9
+
+def test_stats(capsys):
+	grid = np.zeros((10, 10), dtype=np.int32)
+	grid[2:8, 4] = 1
+	planner = GridProblem(grid, 4)
+	path, stats = planner.a_star((0, 0), [(9, 9)], return_stats = True)
+	assert capsys.readouterr().out == '' # Searches run in worker processes and benchmarks, so they never print.
+	assert planner.stats is stats
+	assert stats.found and not stats.budget_exhausted
+	assert stats.path_length == len(path) == 19 and stats.path_cost == 18.0
+	assert 0 < stats.expanded <= 100 - 6
+	assert stats.generated >= stats.expanded and stats.duplicates <= stats.generated
+	assert stats.peak_open > 0 and stats.time_total > 0
+	assert stats.time_neighbors == stats.time_h == 0.0 # Only timed with profile.
+	assert stats.as_dict()['expanded'] == stats.expanded
+
+	profiled_path, profiled = planner.a_star((0, 0), [(9, 9)], profile = True, return_stats = True)
+	assert [n.state for n in profiled_path] == [n.state for n in path]
+	assert profiled.expanded == stats.expanded and profiled.generated == stats.generated
+	assert profiled.time_neighbors > 0 and profiled.time_h > 0 and profiled.time_goal > 0
+	assert profiled.time_neighbors + profiled.time_cost + profiled.time_h + profiled.time_goal <= profiled.time_total
+
+	grid[:, 4] = 1
+	path, stats = planner.a_star((0, 0), [(9, 9)], return_stats = True)
+	assert path == [] and not stats.found and stats.expanded == 40 and stats.path_cost == float('inf')
+
+def keyed(state, f):
+	n = Node(state)
+	n.key = state
+	n.f = f
+	return n
+
+def test_open_list_lazy_deletion():
+	open_list = OpenList()
+	for state, f in [('a', 3.0), ('b', 1.0), ('c', 2.0), ('d', 2.0)]:
+		open_list.push(keyed(state, f))
+	better = keyed('a', 0.5)
+	open_list.push(better)
+	assert len(open_list) == 4
+	assert open_list.get('a') is better
+	assert open_list.min_f() == 0.5
+
+	# The replaced Node for 'a' is skipped, and ties pop in push order.
+	assert [open_list.pop().state for _ in range(4)] == ['a', 'b', 'c', 'd']
+	assert len(open_list) == 0 and open_list.min_f() == float('inf')
+	with pytest.raises(IndexError):
+		open_list.pop()
+
+def test_open_list_min_f_skips_stale():
+	open_list = OpenList()
+	open_list.push(keyed('a', 1.0))
+	open_list.push(keyed('b', 2.0))
+	open_list.push(keyed('a', 5.0)) # Worse, but push replaces whatever is open.
+	assert open_list.min_f() == 2.0
+	assert sorted(n.state for n in open_list.nodes()) == ['a', 'b']
+
+def check_path(path, grid, start, goal, connectivity):
+	states = [n.state for n in path]
+	assert states[0] == start and states[-1] == goal
+	assert all(grid[r, c] != 1 for r, c in states)
+	steps = np.abs(np.diff(np.array(states), axis=0))
+	assert np.all(steps.max(axis=1) == 1)
+	if connectivity == 4:
+		assert np.all(steps.sum(axis=1) == 1)
+
+@pytest.mark.parametrize('connectivity', [4, 8])
+def test_compact_matches_a_star(connectivity):
+	rng = np.random.RandomState(2)
+	for seed in range(60):
+		n = rng.randint(5, 20)
+		grid = random_grid(n, rng.uniform(0.1, 0.4), seed)
+		planner = GridProblem(grid, connectivity)
+		start, goal = (0, 0), (n - 1, n - 1)
+		path, stats = planner.a_star(start, [goal], return_stats = True)
+		compact_path, compact_stats = planner.a_star(start, [goal], compact = True, return_stats = True)
+		assert compact_stats.found == stats.found
+		if not stats.found:
+			assert len(compact_path) == 0
+			continue
+		assert compact_stats.path_cost == pytest.approx(stats.path_cost)
+		check_path(path, grid, start, goal, connectivity)
+		check_path(compact_path, grid, start, goal, connectivity)
+
+def test_long_path():
+	# Longer than the default recursion limit.
+	grid = np.zeros((1, 3000), dtype=np.int32)
+	planner = GridProblem(grid, 4)
+	for compact in (False, True):
+		path = planner.a_star((0, 0), [(0, 2999)], compact = compact)
+		assert len(path) == 3000 and path[-1].g == 2999
+
+class RecordingObserver(SearchObserver):
+	def __init__(self, every = 1, interval = 0.0):
+		super().__init__(every, interval)
+		self.opened = []
+		self.closed = []
+		self.paths = []
+		self.failed = 0
+		self.draws = 0
+
+	def node_opened(self, n):
+		self.opened.append(n.state)
+
+	def node_closed(self, n):
+		self.closed.append(n.state)
+
+	def path_found(self, path):
+		self.paths.append(path)
+
+	def search_failed(self):
+		self.failed += 1
+
+	def draw(self):
+		self.draws += 1
+
+def test_observer_events():
+	grid = random_grid(20, 0.2, 3)
+	planner = GridProblem(grid, 4)
+	observer = RecordingObserver(every = 10)
+	path, stats = planner.a_star((0, 0), [(19, 19)], observer = observer, return_stats = True)
+	assert stats.found and observer.paths == [path] and observer.failed == 0
+	assert observer.draws == stats.expanded // 10
+	assert observer.closed[0] == (0, 0) and observer.closed[-1] == (19, 19)
+	assert set(observer.closed) <= set(observer.opened)
+
+	grid[:, 10] = 1
+	observer = RecordingObserver(interval = 1e6)
+	path = planner.a_star((0, 0), [(19, 19)], observer = observer)
+	assert path == [] and observer.failed == 1 and observer.paths == []
+	assert observer.draws == 1 # Only the first expansion; the rest fall inside the interval.
+
+@pytest.mark.parametrize('connectivity', [4, 8])
+def test_weighted_within_bound(connectivity):
+	for seed in range(60):
+		grid = random_grid(15, 0.25, seed)
+		planner = GridProblem(grid, connectivity)
+		path, stats = planner.a_star((0, 0), [(14, 14)], return_stats = True)
+		weighted_path, weighted_stats = planner.a_star((0, 0), [(14, 14)], weight = 2.0, return_stats = True)
+		assert weighted_stats.found == stats.found
+		if stats.found:
+			check_path(weighted_path, grid, (0, 0), (14, 14), connectivity)
+			assert stats.path_cost - 1e-9 <= weighted_stats.path_cost <= 2.0 * stats.path_cost + 1e-9
+			assert weighted_stats.bound == 2.0
+
+def test_budget():
+	grid = np.zeros((30, 30), dtype=np.int32)
+	planner = GridProblem(grid, 4)
+	path, stats = planner.a_star((0, 0), [(29, 29)], max_expansions = 10, return_stats = True)
+	assert path == [] and stats.budget_exhausted and stats.expanded == 10
+
+	path, stats = planner.a_star((0, 0), [(29, 29)], time_limit = 0.0, return_stats = True)
+	assert path == [] and stats.budget_exhausted
+
+	# cost_bound below the optimum (58) prunes every path.
+	path, stats = planner.a_star((0, 0), [(29, 29)], cost_bound = 58.0, return_stats = True)
+	assert path == [] and not stats.found and not stats.budget_exhausted
+
+@pytest.mark.parametrize('connectivity', [4, 8])
+def test_bidirectional_matches_a_star(connectivity):
+	for seed in range(60):
+		grid = random_grid(15, 0.25, seed)
+		planner = GridProblem(grid, connectivity)
+		path, stats = planner.a_star((0, 0), [(14, 14)], return_stats = True)
+		bi_path, bi_stats = planner.bidirectional_a_star((0, 0), (14, 14), return_stats = True)
+		assert bi_stats.found == stats.found
+		if not stats.found:
+			assert len(bi_path) == 0
+			continue
+		check_path(bi_path, grid, (0, 0), (14, 14), connectivity)
+		assert bi_stats.path_cost == pytest.approx(stats.path_cost)
+		assert bi_path[-1].g == pytest.approx(stats.path_cost)
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from grid_planner import GridPlanner, GoalIndex, euclidean
+from benchmark import GridProblem
+
+def check_path(path, grid, start, goals, connectivity):
+	assert list(path[0]) == list(start)
+	assert list(path[-1]) in [list(g) for g in goals]
+	assert all(grid[r, c] != 1 for r, c in path)
+	steps = np.abs(np.diff(path, axis=0))
+	assert np.all(steps.max(axis=1) == 1)
+	if connectivity == 4:
+		assert np.all(steps.sum(axis=1) == 1)
+
+def random_query(rng, n):
+	start = rng.randint(0, n, 2).tolist()
+	goals = rng.randint(0, n, (rng.randint(1, 4), 2)).tolist()
+	return start, goals
+
+@pytest.mark.parametrize('connectivity', [4, 8])
+def test_matches_general_a_star(connectivity):
+	rng = np.random.RandomState(0)
+	for _ in range(60):
+		n = rng.randint(4, 20)
+		grid = (rng.random_sample((n, n)) < rng.uniform(0.0, 0.4)).astype(np.int32)
+		planner = GridPlanner(grid, connectivity) # Reused across queries.
+		reference = GridProblem(grid, connectivity)
+		for _ in range(3):
+			start, goals = random_query(rng, n)
+			path = planner.plan(start, goals)
+			if grid[start[0], start[1]] == 1:
+				assert len(path) == 0
+				continue
+			ref_path, stats = reference.a_star(tuple(start), [tuple(g) for g in goals], return_stats = True)
+			assert bool(len(path)) == stats.found
+			if stats.found:
+				check_path(path, grid, start, goals, connectivity)
+				assert planner.path_cost(path) == pytest.approx(stats.path_cost)
+
+def test_set_grid():
+	grid = np.zeros((5, 5), dtype=np.int32)
+	planner = GridPlanner(grid, 4)
+	assert planner.path_cost(planner.plan([0, 0], [[0, 4]])) == 4
+	grid[:4, 2] = 1
+	planner.set_grid(grid)
+	path = planner.plan([0, 0], [[0, 4]])
+	check_path(path, grid, [0, 0], [[0, 4]], 4)
+	assert planner.path_cost(path) == 12
+	grid[4, 2] = 1
+	planner.set_grid(grid)
+	assert len(planner.plan([0, 0], [[0, 4]])) == 0
+
+def test_search_arrays_only_for_jump_points():
+	grid = np.zeros((6, 6), dtype=np.int32)
+	planner = GridPlanner(grid, 8)
+	assert planner.g is None and planner.parent is None and planner.closed is None
+	planner.reset()
+	assert planner.path_cost(planner.plan([0, 0], [[5, 5]])) == pytest.approx(5 * np.sqrt(2))
+	jps = GridPlanner(grid, 8, jump_points = True)
+	assert jps.g.shape == jps.blocked.shape
+	assert jps.path_cost(jps.plan([0, 0], [[5, 5]])) == pytest.approx(5 * np.sqrt(2))
+
+def test_jump_point_search_matches_plan():
+	rng = np.random.RandomState(1)
+	for _ in range(100):
+		n = rng.randint(4, 30)
+		grid = (rng.random_sample((n, n)) < rng.uniform(0.0, 0.4)).astype(np.int32)
+		planner = GridPlanner(grid, 8)
+		jps = GridPlanner(grid, 8, jump_points = True)
+		for _ in range(3):
+			start, goals = random_query(rng, n)
+			path = planner.plan(start, goals)
+			jps_path = jps.plan(start, goals)
+			assert bool(len(path)) == bool(len(jps_path))
+			if len(path):
+				check_path(jps_path, grid, start, goals, 8)
+				assert jps.path_cost(jps_path) == pytest.approx(planner.path_cost(path))
+
+@pytest.mark.parametrize('metric', [euclidean, lambda dr, dc: float(abs(dr) + abs(dc))])
+def test_goal_index_nearest(metric):
+	rng = np.random.RandomState(2)
+	for _ in range(50):
+		goals = rng.randint(-20, 60, (rng.randint(1, 40), 2))
+		index = GoalIndex(goals.tolist(), metric = metric, bucket_size = rng.choice([None, 1, 3, 10]))
+		for cell in rng.randint(-40, 80, (20, 2)):
+			best = min(metric(g[0] - cell[0], g[1] - cell[1]) for g in goals)
+			distance, goal = index.nearest(cell)
+			assert distance == pytest.approx(best)
+			assert metric(goal[0] - cell[0], goal[1] - cell[1]) == pytest.approx(best)
+		assert list(goals[0]) in index
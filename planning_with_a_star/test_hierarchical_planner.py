@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from grid_planner import GridPlanner
+from hierarchical_planner import HierarchicalPlanner
+
+def check_path(path, grid, start, goals, connectivity):
+	assert list(path[0]) == list(start)
+	assert list(path[-1]) in [list(g) for g in goals]
+	assert all(grid[r, c] != 1 for r, c in path)
+	steps = np.abs(np.diff(path, axis=0))
+	assert np.all(steps.max(axis=1) == 1)
+	if connectivity == 4:
+		assert np.all(steps.sum(axis=1) == 1)
+
+@pytest.mark.parametrize('connectivity', [4, 8])
+def test_complete_against_grid_planner(connectivity):
+	# Small clusters on cluttered maps, where paths often can only cross a border diagonally.
+	rng = np.random.RandomState(0)
+	for _ in range(150):
+		n = rng.randint(6, 30)
+		grid = (rng.random_sample((n, n)) < rng.uniform(0.1, 0.45)).astype(np.int32)
+		ref = GridPlanner(grid, connectivity)
+		hpa = HierarchicalPlanner(grid, rng.randint(2, 10), connectivity)
+		for _ in range(4):
+			start = rng.randint(0, n, 2).tolist()
+			goals = rng.randint(0, n, (rng.randint(1, 3), 2)).tolist()
+			optimal = ref.plan(start, goals)
+			path = hpa.plan(start, goals)
+			assert len(path) > 0 if len(optimal) > 0 else len(path) == 0
+			if len(path):
+				check_path(path, grid, start, goals, connectivity)
+				assert hpa.path_cost(path) >= ref.path_cost(optimal) - 1e-9
+
+@pytest.mark.parametrize('connectivity', [4, 8])
+def test_update_matches_rebuild(connectivity):
+	rng = np.random.RandomState(1)
+	for _ in range(40):
+		n = rng.randint(6, 25)
+		size = rng.randint(1, 8)
+		grid = (rng.random_sample((n, n)) < 0.3).astype(np.int32)
+		hpa = HierarchicalPlanner(grid, size, connectivity)
+		for _ in range(3):
+			hpa.plan(rng.randint(0, n, 2).tolist(), [rng.randint(0, n, 2).tolist()]) # Fills the edge cache.
+			changed = rng.randint(0, n, (rng.randint(1, 8), 2))
+			for r, c in changed:
+				grid[r, c] = 1 - grid[r, c]
+			hpa.update(grid, changed.tolist())
+			fresh = HierarchicalPlanner(grid, size, connectivity)
+			assert {k: sorted(v) for k, v in hpa.inter.items()} == {k: sorted(v) for k, v in fresh.inter.items()}
+			for cluster, edges in hpa.intra.items():
+				assert edges == fresh.cluster_edges(cluster)
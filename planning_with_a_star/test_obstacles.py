@@ -0,0 +1,67 @@
+import numpy as np
+
+from obstacles import Circle, Box, circle_array, box_array, segments_hit_circles, segments_hit_boxes
+
+def sample(p0, p1, n = 2001):
+	t = np.linspace(0.0, 1.0, n)[:, None]
+	return p0 + t * (p1 - p0)
+
+def random_segments(rng, n):
+	p0 = rng.uniform(-10, 10, (n, 2))
+	p1 = p0 + rng.uniform(-6, 6, (n, 2)) * (rng.random_sample((n, 1)) < 0.9) # Some zero length segments.
+	return p0, p1
+
+def test_arrays():
+	obstacles = [Circle(1, 2, 3), Box(0, 0, 1, 1), Circle(4, 5, 6)]
+	assert circle_array(obstacles).tolist() == [[1, 2, 3], [4, 5, 6]]
+	assert box_array(obstacles).tolist() == [[0, 0, 1, 1]]
+	assert circle_array([]).shape == (0, 3) and box_array([]).shape == (0, 4)
+
+def test_segments_hit_circles():
+	rng = np.random.RandomState(0)
+	circles = circle_array([Circle(x, y, r) for x, y, r in rng.uniform([-8, -8, 0.5], [8, 8, 3], (4, 3))])
+	p0, p1 = random_segments(rng, 2000)
+	hit = segments_hit_circles(p0, p1, circles)
+	checked = 0
+	for a, b, h in zip(p0, p1, hit):
+		pts = sample(a, b)
+		# Signed clearance of the closest sampled point. Dense sampling can only overestimate it, by at most half a sample spacing.
+		clearance = np.min(np.linalg.norm(pts[:, None] - circles[:, :2], axis=-1) - circles[:, 2])
+		if abs(clearance) < 1e-2:
+			continue
+		assert h == (clearance < 0)
+		checked += 1
+	assert checked > 1900
+	assert hit.any() and not hit.all()
+
+def test_segments_hit_boxes():
+	rng = np.random.RandomState(1)
+	corners = rng.uniform(-8, 8, (4, 2))
+	boxes = np.hstack([corners, corners + rng.uniform(0, 4, (4, 2))])
+	boxes[0, 2] = boxes[0, 0] # A degenerate (zero width) box.
+	p0, p1 = random_segments(rng, 2000)
+	p1[:100, 0] = p0[:100, 0] # Axis parallel segments.
+	p1[100:200, 1] = p0[100:200, 1]
+	hit = segments_hit_boxes(p0, p1, boxes)
+	checked = 0
+	for a, b, h in zip(p0, p1, hit):
+		pts = sample(a, b)[:, None]
+		outside = np.maximum(np.maximum(boxes[:, :2] - pts, pts - boxes[:, 2:]), 0.0)
+		gap = np.min(np.linalg.norm(outside, axis=-1))
+		if 0 < gap < 1e-2:
+			continue
+		assert h == (gap == 0)
+		checked += 1
+	assert checked > 1900
+	assert hit.any() and not hit.all()
+
+def test_batch_shapes():
+	# Leading dimensions broadcast, as used by Arm.collision_free for (configurations, links).
+	rng = np.random.RandomState(2)
+	p0 = rng.uniform(-5, 5, (7, 3, 2))
+	p1 = rng.uniform(-5, 5, (7, 3, 2))
+	circles = circle_array([Circle(0, 0, 2)])
+	boxes = box_array([Box(-1, -1, 1, 1), Box(2, 2, 3, 4)])
+	assert segments_hit_circles(p0, p1, circles).shape == (7, 3)
+	flat = segments_hit_boxes(p0.reshape(-1, 2), p1.reshape(-1, 2), boxes)
+	assert np.array_equal(segments_hit_boxes(p0, p1, boxes), flat.reshape(7, 3))
@@ -0,0 +1,119 @@
+import json
+import os
+import numpy as np
+import pytest
+
+from plan_cache import PlanCache
+
+def steps(n, dof = 3, seed = 0):
+	return np.random.RandomState(seed).randint(-1, 2, (n, dof))
+
+def test_round_trip(tmp_path):
+	cache = PlanCache(str(tmp_path))
+	assert cache.get('a') is None
+	cache.put('a', steps(10))
+	out = cache.get('a')
+	assert out.dtype == np.int8
+	assert np.array_equal(out, steps(10))
+	assert (cache.hits, cache.misses) == (1, 1)
+
+def test_persists_across_instances(tmp_path):
+	with PlanCache(str(tmp_path)) as cache:
+		cache.put('a', steps(5, seed = 1))
+		cache.put('b', steps(7, seed = 2))
+	cache = PlanCache(str(tmp_path))
+	assert len(cache) == 2
+	assert np.array_equal(cache.get('b'), steps(7, seed = 2))
+
+def test_lru_limit(tmp_path):
+	cache = PlanCache(str(tmp_path), max_entries = 3)
+	for key in 'abc':
+		cache.put(key, steps(4))
+	cache.get('a') # b is now the least recently used.
+	cache.put('d', steps(4))
+	assert len(cache) == 3
+	assert cache.get('b') is None
+	assert not os.path.exists(cache.path_file('b'))
+	for key in 'acd':
+		assert cache.get(key) is not None
+
+def test_byte_limit(tmp_path):
+	cache = PlanCache(str(tmp_path))
+	cache.put('a', steps(100))
+	cache.max_bytes = cache.index['a']['bytes'] * 2
+	cache.put('b', steps(100))
+	cache.put('c', steps(100))
+	assert sorted(cache.index) == ['b', 'c']
+
+def test_hits_do_not_write_index(tmp_path):
+	cache = PlanCache(str(tmp_path))
+	cache.put('a', steps(4))
+	cache.put('b', steps(4))
+	mtime = os.stat(cache.index_path).st_mtime_ns
+	for _ in range(5):
+		cache.get('a')
+	assert os.stat(cache.index_path).st_mtime_ns == mtime
+
+	# The recency from the hits is written on close, and survives into the next instance.
+	cache.close()
+	with open(cache.index_path) as f:
+		entries = json.load(f)['entries']
+	assert entries['a']['used'] > entries['b']['used']
+	cache = PlanCache(str(tmp_path), max_entries = 2)
+	cache.put('c', steps(4))
+	assert sorted(cache.index) == ['a', 'c']
+
+def test_corrupt_entry_is_dropped(tmp_path):
+	cache = PlanCache(str(tmp_path))
+	cache.put('a', steps(4))
+	with open(cache.path_file('a'), 'w') as f:
+		f.write('not a npy file')
+	assert cache.get('a') is None
+	assert len(cache) == 0
+
+def make_planner(cache):
+	from numpy import pi
+	from arm import Arm
+	from arm_astar import ArmAStar
+	from link import Link, FixedLink
+	arm = Arm([
+		FixedLink(length = 5, angle = pi/2),
+		FixedLink(length = 0, angle = -pi/2),
+		Link(length = 3, min_angle = -1e4, max_angle = 1e4, angle = pi/2),
+		FixedLink(length = 0, angle = -pi/2),
+		Link(length = 3, min_angle = -1e4, max_angle = 1e4, angle = pi/2),
+	])
+	return ArmAStar(arm, plan_cache = cache)
+
+START = [0.0, 0.0]
+GOAL = [-2.0, 4.0]
+
+def test_plan_return_stats(tmp_path):
+	planner = make_planner(PlanCache(str(tmp_path)))
+	miss, miss_stats = planner.plan(START, GOAL, return_stats = True)
+	assert miss_stats is planner.stats and miss_stats.found and miss_stats.expanded > 0
+	hit, hit_stats = planner.plan(START, GOAL, return_stats = True)
+	assert planner.plan_cache.hits == 1
+	assert hit_stats is planner.stats and hit_stats.found and hit_stats.expanded == 0
+	assert hit_stats.path_cost == pytest.approx(miss_stats.path_cost)
+	assert [n.key for n in hit] == [n.key for n in miss]
+
+def test_plan_as_array(tmp_path):
+	planner = make_planner(PlanCache(str(tmp_path)))
+	miss = planner.plan(START, GOAL, as_array = True)
+	assert isinstance(miss, np.ndarray) and miss.shape[1] == 2
+	hit = planner.plan(START, GOAL, as_array = True)
+	assert planner.plan_cache.hits == 1
+	assert isinstance(hit, np.ndarray) and np.allclose(hit, miss)
+
+	hit, stats = planner.plan(START, GOAL, as_array = True, return_stats = True)
+	assert np.allclose(hit, miss) and stats.found and len(hit) == stats.path_length
+
+def test_plan_without_cache_matches():
+	planner = make_planner(None)
+	path, stats = planner.plan(START, GOAL, as_array = True, return_stats = True)
+	assert isinstance(path, np.ndarray) and stats.found and len(path) == stats.path_length
+
+	# An unreachable goal still returns the requested types.
+	path, stats = planner.plan(START, [20.0, 20.0], as_array = True, return_stats = True, max_expansions = 50)
+	assert len(path) == 0 and not stats.found